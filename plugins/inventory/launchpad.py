@@ -0,0 +1,172 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+name: launchpad
+
+short_description: Launchpad PPA inventory source
+version_added: "1.1.0"
+
+description: Build an inventory from the PPAs of one or more Launchpad projects. Each PPA is a host, named
+             <project>/<ppa> without the leading ~, with its details in the launchpad_ppa host var and its source
+             packages in launchpad_sources (and optionally its recent build records in launchpad_builds). PPAs are
+             grouped by project, and the constructed options can be used to build more groups. The PPAs of each
+             project are fetched concurrently, and the results can be kept in an inventory cache plugin so they are
+             only fetched once per cache_timeout. The file must end in launchpad.yml or launchpad.yaml.
+
+extends_documentation_fragment:
+    - inventory_cache
+    - constructed
+
+options:
+    plugin:
+        description: The name of this plugin, it should always be set to tuxinvader.launchpad.launchpad
+        required: true
+        choices: [ tuxinvader.launchpad.launchpad ]
+        type: str
+
+    projects:
+        description: The projects whose PPAs are added to the inventory, eg ~tuxinvader
+        required: true
+        type: list
+        elements: str
+
+    ppas:
+        description: The names of the PPAs to add, or '*' for every active PPA of each project
+        required: false
+        default: [ '*' ]
+        type: list
+        elements: str
+
+    source_filter:
+        description: The status of the source packages returned in launchpad_sources, one of Pending, Published,
+                     Superseded, Deleted, Obsolete or '*' for all of them
+        required: false
+        default: Published
+        type: str
+
+    return_mode:
+        description: What to return about the sources of each PPA, one of none, count, summary or full. See the
+                     ppa_info module
+        required: false
+        default: full
+        choices: [ none, count, summary, full ]
+        type: str
+
+    build_time_frame:
+        description: Add the build records created in the last this many minutes to launchpad_builds. Builds are
+                     not fetched if this isn't set
+        required: false
+        default: None
+        type: int
+
+    workers:
+        description: The number of PPAs to fetch concurrently
+        required: false
+        default: 4
+        type: int
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+# ppas.launchpad.yml
+plugin: tuxinvader.launchpad.launchpad
+projects:
+  - ~tuxinvader
+build_time_frame: 1440
+workers: 8
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: ~/.cache/tuxinvader.launchpad/inventory
+cache_timeout: 3600
+keyed_groups:
+  - key: launchpad_ppa.status
+    prefix: status
+groups:
+  has_failed_builds: launchpad_builds | default([]) | selectattr('buildstate', 'equalto', 'Failed to build') | list | length > 0
+'''
+
+from ansible.errors import AnsibleError
+from ansible.plugins.inventory import BaseInventoryPlugin, Constructable, Cacheable
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.store import json_default
+import json
+import os
+
+try:
+    from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+    HAS_LAUNCHPADLIB = True
+except ImportError:
+    HAS_LAUNCHPADLIB = False
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'tuxinvader.launchpad.launchpad'
+
+    def verify_file(self, path):
+        if super(InventoryModule, self).verify_file(path):
+            return path.endswith(('launchpad.yml', 'launchpad.yaml'))
+        return False
+
+    def _fetch(self):
+        # Dates are turned into strings here, so the results are the same whether or not they came from the cache
+        auth = False
+        if os.environ.get('LP_ACCESS_TOKEN') is not None:
+            auth = True
+        launchpad = LPHandler(auth)
+        results = {}
+        for project in self.get_option('projects'):
+            try:
+                lp_result = launchpad.get_ppas_info(project, self.get_option('ppas'), self.get_option('source_filter'),
+                                                    self.get_option('workers'), self.get_option('return_mode'),
+                                                    build_time_frame=self.get_option('build_time_frame'))
+            except Exception as e:
+                raise AnsibleError("Failed to fetch the PPAs of %s: %s" % (project, e))
+            results[project] = json.loads(json.dumps(lp_result['ppas'], default=json_default))
+        return results
+
+    def _populate(self, results):
+        for project, ppas in results.items():
+            group = self.inventory.add_group(self._sanitize_group_name(project.lstrip("~")))
+            for name, ppa in ppas.items():
+                host = "%s/%s" % (project.lstrip("~"), name)
+                self.inventory.add_host(host, group=group)
+                self.inventory.set_variable(host, 'ansible_connection', 'local')
+                self.inventory.set_variable(host, 'launchpad_project', project)
+                self.inventory.set_variable(host, 'launchpad_ppa', ppa['details'])
+                self.inventory.set_variable(host, 'launchpad_sources', ppa['sources'])
+                for key in ['source_count', 'summary', 'builds']:
+                    if key in ppa:
+                        self.inventory.set_variable(host, 'launchpad_' + key, ppa[key])
+
+                hostvars = self.inventory.get_host(host).get_vars()
+                strict = self.get_option('strict')
+                self._set_composite_vars(self.get_option('compose'), hostvars, host, strict=strict)
+                self._add_host_to_composed_groups(self.get_option('groups'), hostvars, host, strict=strict)
+                self._add_host_to_keyed_groups(self.get_option('keyed_groups'), hostvars, host, strict=strict)
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path, cache)
+        if not HAS_LAUNCHPADLIB:
+            raise AnsibleError("The launchpad inventory plugin requires launchpadlib")
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        use_cache = self.get_option('cache') and cache
+        update_cache = self.get_option('cache') and not cache
+
+        results = None
+        if use_cache:
+            try:
+                results = self._cache[cache_key]
+            except KeyError:
+                update_cache = True
+        if results is None:
+            results = self._fetch()
+        if update_cache:
+            self._cache[cache_key] = results
+
+        self._populate(results)
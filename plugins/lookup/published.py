@@ -0,0 +1,187 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+name: published
+
+short_description: Look up the published versions of source packages in Launchpad PPAs
+version_added: "1.1.0"
+
+description: Returns the published versions of each source package named in the terms across one or more PPAs,
+             newest first within each PPA. If version is set, it returns true or false for each source package
+             instead, depending on whether that version is published in any of the PPAs. Each PPA listing is saved
+             in cache_dir for ttl seconds, so every task, host and worker process of a play (and later plays) reuses
+             it, and a loop over many items costs one listing per PPA. The file of a PPA is locked while it's listed,
+             so lookups of the same PPA made at the same time, from any process, wait for a single listing. The
+             listings of several PPAs are fetched concurrently.
+
+options:
+    _terms:
+        description: The names of the source packages
+        required: true
+        type: list
+        elements: str
+
+    ppa:
+        description: The PPA, or a list of PPAs, as ~owner/name
+        required: true
+        type: list
+        elements: str
+
+    version:
+        description: Return whether this version of each source package is published, rather than the versions
+        required: false
+        type: str
+
+    status:
+        description: The publication status to look for, one of Pending, Published, Superseded, Deleted, Obsolete
+                     or '*' for any of them
+        required: false
+        default: Published
+        type: str
+
+    ttl:
+        description: The number of seconds a PPA listing is reused for
+        required: false
+        default: 300
+        type: int
+
+    cache_dir:
+        description: The directory the PPA listings are saved in
+        required: false
+        default: ~/.cache/tuxinvader.launchpad/published
+        type: path
+
+    workers:
+        description: The number of PPAs to list concurrently
+        required: false
+        default: 4
+        type: int
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+- name: Is 5.19.14 already published in any of the flavour PPAs?
+  debug:
+    msg: "{{ lookup('tuxinvader.launchpad.published', 'linux-generic-5.19', version='5.19.14',
+                    ppa=['~tuxinvader/jammy-mainline', '~tuxinvader/focal-mainline']) }}"
+
+- name: Build the kernels which aren't published yet
+  debug:
+    msg: "{{ item }} needs building"
+  loop: "{{ kernels }}"
+  when: not lookup('tuxinvader.launchpad.published', item.name, version=item.version, ppa='~tuxinvader/lts-mainline')
+'''
+
+RETURN = r'''
+_raw:
+    description: For each source package, the list of its versions (newest first), or whether version is published
+                 if version is set
+    type: list
+'''
+
+from ansible.errors import AnsibleError
+from ansible.plugins.lookup import LookupBase
+import hashlib
+import os
+import threading
+import time
+
+try:
+    from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+    from ansible_collections.tuxinvader.launchpad.plugins.module_utils.store import JsonStore
+    HAS_LAUNCHPADLIB = True
+except ImportError:
+    HAS_LAUNCHPADLIB = False
+
+# Ansible runs lookups in its worker processes, so the listings are shared through files in the cache directory.
+# The handler, and a copy of the listings already read, are kept for the life of each process.
+_launchpad = None
+_memo = {}
+_lock = threading.Lock()
+
+
+def _handler():
+    global _launchpad
+    with _lock:
+        if _launchpad is None:
+            _launchpad = LPHandler(os.environ.get('LP_ACCESS_TOKEN') is not None)
+        return _launchpad
+
+
+def _store(cache_dir, key):
+    name = hashlib.sha1(("%s|%s" % key).encode()).hexdigest()
+    return JsonStore(os.path.join(os.path.expanduser(cache_dir), name + ".json"))
+
+
+def _fresh(entry, ttl):
+    if entry is not None and time.time() - entry['time'] < ttl:
+        return entry['versions']
+    return None
+
+
+def _cached(cache_dir, key, ttl):
+    versions = _fresh(_memo.get(key), ttl)
+    if versions is None:
+        entry = _store(cache_dir, key).load()
+        versions = _fresh(entry or None, ttl)
+        if versions is not None:
+            _memo[key] = entry
+    return versions
+
+
+def _listing(api_root, launchpad, ppa, status, ttl, cache_dir):
+    # The PPA's cache file is locked while it's listed, so a second lookup of the same PPA, in this process or any
+    # other, waits for the first listing instead of making its own
+    key = (ppa, status)
+    versions = _cached(cache_dir, key, ttl)
+    if versions is not None:
+        return versions
+    with _store(cache_dir, key).update() as entry:
+        versions = _fresh(entry or None, ttl)
+        if versions is None:
+            versions = launchpad.get_published_versions(ppa, status, api_root)
+            entry.update({'ppa': ppa, 'status': status, 'time': time.time(), 'versions': versions})
+        _memo[key] = dict(entry)
+    return versions
+
+
+class LookupModule(LookupBase):
+
+    def run(self, terms, variables=None, **kwargs):
+        if not HAS_LAUNCHPADLIB:
+            raise AnsibleError("The published lookup requires launchpadlib")
+        self.set_options(var_options=variables, direct=kwargs)
+        ppas = self.get_option('ppa')
+        version = self.get_option('version')
+        status = self.get_option('status')
+        ttl = self.get_option('ttl')
+        cache_dir = self.get_option('cache_dir')
+
+        # Only the PPAs missing from the cache are listed, on the handler's own connection if there is just one,
+        # so a cache hit makes no requests at all
+        launchpad = _handler()
+        stale = [ppa for ppa in dict.fromkeys(ppas) if _cached(cache_dir, (ppa, status), ttl) is None]
+        try:
+            if len(stale) == 1:
+                _listing(None, launchpad, stale[0], status, ttl, cache_dir)
+            elif len(stale) > 1:
+                launchpad.map_concurrent(lambda api_root, ppa: _listing(api_root, launchpad, ppa, status, ttl,
+                                                                        cache_dir),
+                                         stale, self.get_option('workers'))
+            listings = [_listing(None, launchpad, ppa, status, ttl, cache_dir) for ppa in ppas]
+        except Exception as e:
+            raise AnsibleError("Failed to list the published sources: %s" % e)
+
+        results = []
+        for term in terms:
+            versions = []
+            for listing in listings:
+                for source_version in listing.get(term, []):
+                    if source_version not in versions:
+                        versions.append(source_version)
+            results.append(versions if version is None else version in versions)
+        return results
@@ -0,0 +1,169 @@
+from __future__ import (absolute_import, division, print_function)
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+import codecs
+import hashlib
+import os
+import re
+import tempfile
+import zlib
+
+LOG_CACHE = '~/.cache/tuxinvader.launchpad/buildlogs'
+DEFAULT_PATTERNS = [
+    r'\berror:',
+    r'^E: ',
+    r'make(\[\d+\])?: \*\*\* .* Error \d+',
+    r'dpkg-buildpackage: error',
+    r'dpkg-source: error',
+    r'unmet build dependencies',
+    r'No space left on device',
+]
+CHUNK_SIZE = 65536
+MAX_LINE = 4096
+
+
+def _chunks(stream):
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _decompress(chunks):
+    # Logs are usually gzipped. Each call to decompress() is capped at a few chunks of output, so a highly
+    # compressible log can't blow up memory, and the rest of the input is carried in unconsumed_tail.
+    decompressor = None
+    for chunk in chunks:
+        if decompressor is None:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if chunk[:2] == b'\x1f\x8b' else False
+        if decompressor is False:
+            yield chunk
+            continue
+        data = decompressor.decompress(chunk, CHUNK_SIZE * 4)
+        while True:
+            if data:
+                yield data
+            if not decompressor.unconsumed_tail:
+                break
+            data = decompressor.decompress(decompressor.unconsumed_tail, CHUNK_SIZE * 4)
+    if decompressor:
+        data = decompressor.flush()
+        if data:
+            yield data
+
+
+def _lines(blocks):
+    # Split decoded text into lines without holding more than one block and one partial line. A line longer than
+    # MAX_LINE is cut, so a log without newlines can't grow the buffer either.
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    partial = ''
+    for block in blocks:
+        lines = (partial + decoder.decode(block)).split('\n')
+        partial = lines.pop()
+        for line in lines:
+            yield line.rstrip('\r')[:MAX_LINE]
+        if len(partial) > MAX_LINE:
+            yield partial[:MAX_LINE]
+            partial = ''
+    partial += decoder.decode(b'', final=True)
+    if partial:
+        yield partial.rstrip('\r')[:MAX_LINE]
+
+
+def scan_lines(lines, patterns, context=3, max_matches=20):
+    # Returns the lines matching any of the compiled patterns, with up to context lines either side. Only the last
+    # context lines are kept while scanning, and at most max_matches matches, so memory is bounded however long
+    # the log is. Matches past max_matches are still counted.
+    before = deque(maxlen=context)
+    following = []
+    matches = []
+    count = 0
+    number = 0
+    for number, line in enumerate(lines, 1):
+        for match in following:
+            match['after'].append(line)
+        following = [match for match in following if len(match['after']) < context]
+        for pattern in patterns:
+            if pattern.search(line):
+                count += 1
+                if len(matches) < max_matches:
+                    match = {'line_number': number, 'pattern': pattern.pattern, 'line': line, 'before': list(before),
+                             'after': []}
+                    matches.append(match)
+                    if context > 0:
+                        following.append(match)
+                break
+        before.append(line)
+    return {'lines': number, 'match_count': count, 'matches': matches, 'truncated': count > len(matches)}
+
+
+class BuildLogScanner(object):
+
+    # Streams build logs over HTTP, decompressing and scanning them as they arrive. With a cache directory the
+    # raw log is saved as it streams, under a name keyed by the build id (and a hash of the log url, so a
+    # retried build's new log isn't mistaken for the old one), and later scans read it from disk instead.
+    def __init__(self, cache_dir=LOG_CACHE, timeout=60):
+        self.cache_dir = None
+        if cache_dir is not None:
+            self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir, exist_ok=True)
+        self.timeout = timeout
+
+    def _cache_path(self, build_id, url):
+        return os.path.join(self.cache_dir, "%s-%s.log" % (build_id, hashlib.sha1(url.encode()).hexdigest()[:12]))
+
+    def _download(self, url, path):
+        # Yield the raw chunks of the log, saving them to path as they go. The file is only renamed into place
+        # once the whole log has been read, so an interrupted download never leaves a partial log in the cache.
+        tmp = None
+        try:
+            with urlopen(url, timeout=self.timeout) as response:
+                if path is None:
+                    for chunk in _chunks(response):
+                        yield chunk
+                    return
+                fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=self.cache_dir)
+                with os.fdopen(fd, "wb") as cache_file:
+                    for chunk in _chunks(response):
+                        cache_file.write(chunk)
+                        yield chunk
+                os.replace(tmp, path)
+        finally:
+            if tmp is not None and os.path.exists(tmp):
+                os.unlink(tmp)
+
+    def _read(self, path):
+        with open(path, "rb") as cache_file:
+            for chunk in _chunks(cache_file):
+                yield chunk
+
+    def scan(self, build, patterns, context=3, max_matches=20):
+        entry = dict(build)
+        entry.update({'cached': False, 'lines': 0, 'match_count': 0, 'matches': [], 'truncated': False,
+                      'error': None})
+        url = build.get('build_log_url')
+        if url is None:
+            entry['error'] = "The build has no log"
+            return entry
+        path = None if self.cache_dir is None else self._cache_path(build['build_id'], url)
+        try:
+            if path is not None and os.path.exists(path):
+                entry['cached'] = True
+                chunks = self._read(path)
+            else:
+                chunks = self._download(url, path)
+            entry.update(scan_lines(_lines(_decompress(chunks)), patterns, context, max_matches))
+        except Exception as e:
+            entry['error'] = str(e)
+        return entry
+
+    def scan_all(self, builds, patterns, ignore_case=False, context=3, max_matches=20, workers=4):
+        flags = re.IGNORECASE if ignore_case else 0
+        compiled = [re.compile(pattern, flags) for pattern in patterns]
+        if len(builds) == 0:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(builds)))) as executor:
+            return list(executor.map(lambda build: self.scan(build, compiled, context, max_matches), builds))
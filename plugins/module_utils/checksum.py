@@ -0,0 +1,123 @@
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.store import JsonStore
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import mmap
+import os
+import threading
+
+HASH_CACHE = '~/.cache/tuxinvader.launchpad/hashes.json'
+HASH_SLICE = 64 * 1024 * 1024
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+class HashCache(object):
+
+    # Hashes are keyed on (path, mtime, size), so a file which is rewritten is hashed again. Without a path
+    # the cache only lives as long as the object. The file is only read once a hash is looked up.
+    def __init__(self, path=None):
+        self._store = None
+        self._hashes = {}
+        self._dirty = {}
+        if path is not None:
+            self._store = JsonStore(path)
+            self._hashes = None
+
+    def _loaded(self):
+        if self._hashes is None:
+            self._hashes = self._store.load()
+        return self._hashes
+
+    def _key(self, path):
+        stat = os.stat(path)
+        return os.path.abspath(path), "%d:%d" % (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path):
+        name, stamp = self._key(path)
+        entry = self._loaded().get(name)
+        if entry is not None and entry.get('stamp') == stamp:
+            return entry['sha256']
+        return None
+
+    def put(self, path, sha256):
+        name, stamp = self._key(path)
+        self._loaded()[name] = self._dirty[name] = {'stamp': stamp, 'sha256': sha256}
+
+    def save(self):
+        if self._store is not None and self._dirty:
+            with self._store.update() as data:
+                data.update(self._dirty)
+            self._dirty = {}
+
+
+def sha256_file(path, cancel=None):
+    digest = hashlib.sha256()
+    if os.path.getsize(path) == 0:
+        return digest.hexdigest()
+    # Map the file rather than reading it, hashlib works straight off the mapped pages. Hash in slices so that
+    # a cancelled verification doesn't have to finish a multi-GB tarball first.
+    with open(path, "rb") as ifile:
+        with mmap.mmap(ifile.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for offset in range(0, len(view), HASH_SLICE):
+                    if cancel is not None and cancel.is_set():
+                        return None
+                    digest.update(view[offset:offset + HASH_SLICE])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+def verify_files(directory, files, workers=4, cache=None):
+    # Check existence and sizes first as they're cheap, then hash everything in parallel and bail out on the
+    # first mismatch.
+    result = {'verified': [], 'cached': []}
+    if cache is None:
+        cache = HashCache()
+
+    pending = []
+    for name, entry in files.items():
+        path = os.path.join(directory, name)
+        if os.path.exists(path) is False:
+            raise ChecksumMismatch("Failed to find %s referenced by the changes file" % path)
+        size = os.path.getsize(path)
+        if entry.get('size') is not None and size != entry['size']:
+            raise ChecksumMismatch("Size mismatch for %s: expected %d bytes, found %d" % (path, entry['size'], size))
+        if entry.get('sha256') is None:
+            result['verified'].append(name)
+            continue
+        sha256 = cache.get(path)
+        if sha256 is not None:
+            if sha256 != entry['sha256']:
+                raise ChecksumMismatch("Checksum mismatch for %s: expected %s, found %s" % (path, entry['sha256'], sha256))
+            result['cached'].append(name)
+            result['verified'].append(name)
+        else:
+            pending.append((name, path, entry['sha256']))
+
+    cancel = threading.Event()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {}
+        for name, path, expected in pending:
+            futures[executor.submit(sha256_file, path, cancel)] = (name, path, expected)
+        try:
+            for future in as_completed(futures):
+                name, path, expected = futures[future]
+                sha256 = future.result()
+                cache.put(path, sha256)
+                if sha256 != expected:
+                    raise ChecksumMismatch("Checksum mismatch for %s: expected %s, found %s" % (path, expected, sha256))
+                result['verified'].append(name)
+        except BaseException:
+            cancel.set()
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            cache.save()
+
+    return result
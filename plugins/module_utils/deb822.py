@@ -0,0 +1,178 @@
+from __future__ import (absolute_import, division, print_function)
+import os
+import threading
+
+PGP_SIGNED_MESSAGE = "-----BEGIN PGP SIGNED MESSAGE-----"
+PGP_SIGNATURE = "-----BEGIN PGP SIGNATURE-----"
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class ControlFile(object):
+
+    def __init__(self, path, fields, signed=False):
+        self.path = path
+        self.fields = fields
+        self.signed = signed
+        self.source = self._first_word('Source')
+        self.version = self._first_word('Version')
+        self.distribution = self._first_word('Distribution')
+        self.files = self._build_files()
+
+    def _first_word(self, name):
+        value = self.fields.get(name)
+        if value is None or len(value) == 0 or value[0] == "":
+            return None
+        return value[0].split()[0]
+
+    def _build_files(self):
+        # Files is "md5 size name" in a .dsc, and "md5 size section priority name" in a .changes, the
+        # Checksums-* fields are always "sum size name". Names are kept in the order of their first mention.
+        files = {}
+        for field, key in [('Files', 'md5'), ('Checksums-Sha1', 'sha1'), ('Checksums-Sha256', 'sha256')]:
+            for line in self.fields.get(field, [])[1:]:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                entry = files.setdefault(parts[-1], {'size': int(parts[1]), 'md5': None, 'sha1': None, 'sha256': None})
+                if entry['size'] != int(parts[1]):
+                    raise Exception("Conflicting sizes for %s in %s" % (parts[-1], self.path))
+                entry[key] = parts[0]
+        return files
+
+    def to_dict(self):
+        return {'path': self.path, 'source': self.source, 'version': self.version,
+                'distribution': self.distribution, 'signed': self.signed, 'files': self.files}
+
+
+def _unarmor(ifile):
+    # Yield the lines of the first paragraph, skipping the PGP armor headers and signature, and undoing
+    # the dash escaping of the clear-signed text.
+    state = 'start'
+    for line in ifile:
+        line = line.rstrip("\r\n")
+        if state == 'start':
+            if line.strip() == "":
+                continue
+            if line == PGP_SIGNED_MESSAGE:
+                state = 'armor'
+                continue
+            state = 'body'
+        elif state == 'armor':
+            if line.strip() == "":
+                state = 'signed'
+            continue
+        if line == PGP_SIGNATURE:
+            return
+        if state == 'signed' and line.startswith("- "):
+            line = line[2:]
+        if line.strip() == "":
+            return
+        yield state == 'signed', line
+
+
+def parse_deb822(path):
+    fields = {}
+    field = None
+    signed = False
+    with open(path, "r", encoding="utf-8", errors="replace") as ifile:
+        for signed, line in _unarmor(ifile):
+            if line.startswith("#"):
+                continue
+            if line.startswith((" ", "\t")):
+                if field is None:
+                    raise Exception("Continuation line without a field in %s: %s" % (path, line))
+                value = line.strip()
+                fields[field].append("" if value == "." else value)
+            elif ":" in line:
+                field, value = line.split(":", 1)
+                fields[field] = [value.strip()]
+            else:
+                raise Exception("Malformed line in %s: %s" % (path, line))
+    return ControlFile(path, fields, signed)
+
+
+def read_control(path):
+    # Parsed files are cached for the life of the process, keyed on mtime and size so edits are picked up.
+    if os.path.exists(path) is False:
+        raise Exception("Failed to find control file for processing: %s" % path)
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        control = _cache.get(key)
+    if control is None:
+        control = parse_deb822(path)
+        with _cache_lock:
+            _cache[key] = control
+    return control
+
+
+def _split_version(version):
+    version = str(version)
+    epoch = 0
+    if ":" in version:
+        epoch, version = version.split(":", 1)
+        epoch = int(epoch) if epoch.isdigit() else 0
+    revision = "0"
+    if "-" in version:
+        version, revision = version.rsplit("-", 1)
+    return epoch, version, revision
+
+
+def _order(char):
+    # dpkg's ordering of the non-digit parts: ~ sorts before anything, even the end of the string (None), and
+    # letters sort before everything else
+    if char is None:
+        return 0
+    if char == "~":
+        return -1
+    if char.isalpha():
+        return ord(char)
+    return ord(char) + 256
+
+
+def _compare_part(a, b):
+    while a or b:
+        i = j = 0
+        while i < len(a) and not a[i].isdigit():
+            i += 1
+        while j < len(b) and not b[j].isdigit():
+            j += 1
+        for k in range(max(i, j)):
+            x = _order(a[k] if k < i else None)
+            y = _order(b[k] if k < j else None)
+            if x != y:
+                return -1 if x < y else 1
+        a, b = a[i:], b[j:]
+        i = j = 0
+        while i < len(a) and a[i].isdigit():
+            i += 1
+        while j < len(b) and b[j].isdigit():
+            j += 1
+        x, y = int(a[:i] or 0), int(b[:j] or 0)
+        if x != y:
+            return -1 if x < y else 1
+        a, b = a[i:], b[j:]
+    return 0
+
+
+def compare_versions(a, b):
+    # Compare two Debian versions the way dpkg does, returning -1, 0 or 1
+    a, b = _split_version(a), _split_version(b)
+    if a[0] != b[0]:
+        return -1 if a[0] < b[0] else 1
+    return _compare_part(a[1], b[1]) or _compare_part(a[2], b[2])
+
+
+class VersionKey(object):
+
+    # A sort key for Debian versions, so they can be used with sorted() and heapq
+    def __init__(self, version):
+        self.version = version
+
+    def __lt__(self, other):
+        return compare_versions(self.version, other.version) < 0
+
+    def __eq__(self, other):
+        return compare_versions(self.version, other.version) == 0
@@ -1,49 +1,264 @@
 from __future__ import (absolute_import, division, print_function)
-from ftplib import FTP
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.checksum import HashCache, HASH_CACHE, verify_files
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.deb822 import read_control
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ftplib import FTP, all_errors, error_perm
 import os
+import threading
+import time
 
 LP_APP_NAME = 'ansible'
+LP_FTP_HOST = 'ppa.launchpad.net'
+
+
+class TokenBucket(object):
+
+    # Shared by every transfer made through a Dput instance, so the limit applies to the total rate of a batch
+    # rather than to each connection.
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class FTPSession(object):
+
+    def __init__(self, host, port, ppa, timeout=None):
+        self.host = host
+        self.port = port
+        self.ppa = ppa
+        self.timeout = timeout
+        self.ftp = None
+
+    def connect(self):
+        self.abort()
+        self.ftp = FTP() if self.timeout is None else FTP(timeout=self.timeout)
+        self.ftp.connect(self.host, self.port)
+        self.ftp.login()
+        self.ftp.cwd(self.ppa)
+        self.ftp.set_pasv(True)
+        return self.ftp
+
+    def abort(self):
+        if self.ftp is not None:
+            self.ftp.close()
+            self.ftp = None
+
+    def close(self):
+        if self.ftp is not None:
+            try:
+                self.ftp.quit()
+            except all_errors:
+                self.ftp.close()
+            self.ftp = None
 
 
 class Dput(object):
 
-    def __init__(self):
+    def __init__(self, host=LP_FTP_HOST, port=21, timeout=None, retries=3, verify=True, workers=4, hash_cache=HASH_CACHE,
+                 block_size=8192, bandwidth_limit=None):
         self.init = True
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.retries = retries
+        self.verify = verify
+        self.workers = workers
+        self.hash_cache = HashCache(hash_cache)
+        self.block_size = block_size
+        self.bucket = None
+        if bandwidth_limit:
+            self.bucket = TokenBucket(bandwidth_limit, max(bandwidth_limit, block_size))
 
-    def upload(self, source_changes, ppa):
-
+    def read_changes(self, source_changes):
         if os.path.exists(source_changes) is False:
             raise Exception("Failed to find Changes file for processing")
+        return read_control(source_changes)
+
+    def _prepare(self, source_changes, existing=None):
+        changes = self.read_changes(source_changes)
 
         path = os.path.dirname(source_changes)
         files = [os.path.basename(source_changes)]
-        result = {'count': 0, 'uploads': []}
-
-        ftp = FTP('ppa.launchpad.net')
-        ftp.login()
-        ftp.cwd(ppa)
-        ftp.set_pasv(True)
-
-        upload = False
-        with open(source_changes, "r") as ifile:
-            for line in ifile:
-                if line.startswith("Checksums-Sha1:"):
-                    upload = True
+        result = {'count': 0, 'uploads': [], 'resumed': [], 'skipped': [], 'metrics': []}
+
+        # Every file listed in the signed changes file has to be sent, Launchpad rejects the upload if one is
+        # missing. Only the files the .dsc references but the changes file leaves out (eg the orig tarball of a
+        # -sd build) can be resolved from the archive, so given the PPA's files we check those are there.
+        files.extend(changes.files)
+        if existing is not None:
+            self._check_existing(source_changes, path, changes, existing, result)
+
+        if self.verify:
+            result['verified'] = verify_files(path, dict((name, changes.files[name]) for name in files[1:]),
+                                              self.workers, self.hash_cache)['verified']
+
+        return path, files, result
+
+    def _check_existing(self, source_changes, path, changes, existing, result):
+        held = [name for name, entry in changes.files.items()
+                if entry['sha256'] is not None and existing.get(name) == entry['sha256']]
+        if len(held) > 0:
+            raise Exception("%s lists %s, which the PPA already holds. Build the source with -sd to leave them out "
+                            "of the changes file" % (os.path.basename(source_changes), ", ".join(held)))
+        for dsc in [name for name in changes.files if name.endswith(".dsc")]:
+            for name, entry in read_control(os.path.join(path, dsc)).files.items():
+                if name in changes.files:
                     continue
-                if line.startswith("Checksums-Sha256:"):
-                    upload = False
-                    break
-                if upload:
-                    files.append(line.split()[-1])
+                if name not in existing:
+                    raise Exception("%s references %s, which is neither in the changes file nor held by the PPA" % (
+                        dsc, name))
+                if entry['sha256'] is not None and existing[name] != entry['sha256']:
+                    raise Exception("%s references %s, which the PPA holds with a different sha256" % (dsc, name))
+                result['skipped'].append(name)
 
+    def _transfer(self, session, path, files, result):
         for ufile in files:
-            print("uploading %s to %s" % (path + "/" + ufile, ufile))
             result['uploads'].append(ufile)
-            self._stor(ftp, ufile, path + "/" + ufile)
-
+            metrics = self._send(session, ufile, os.path.join(path, ufile))
+            result['metrics'].append(metrics)
+            if metrics['offset'] > 0:
+                result['resumed'].append(ufile)
         result['count'] = len(files)
         return result
 
-    def _stor(self, ftp, filename, path):
-        fh = open(path, 'rb')
-        ftp.storbinary("STOR "+filename, fh)
+    def upload(self, source_changes, ppa, existing=None):
+        path, files, result = self._prepare(source_changes, existing)
+
+        session = FTPSession(self.host, self.port, ppa, self.timeout)
+        try:
+            return self._transfer(session, path, files, result)
+        finally:
+            session.close()
+
+    def upload_batch(self, items, existing=None, progress=None):
+        # items is a list of (source_changes, ppa). Each worker keeps one session open per target PPA and reuses
+        # it for every changes file it picks up for that target, so we only log in once per worker and target.
+        # Failures are reported per changes file rather than abandoning the whole batch, and progress (if set) is
+        # called with the result of each changes file as soon as it completes.
+        if existing is None:
+            existing = {}
+        result = {'count': 0, 'uploads': [], 'resumed': [], 'skipped': [], 'metrics': [], 'changes': [], 'failed': 0}
+        local = threading.local()
+        sessions = []
+        sessions_lock = threading.Lock()
+
+        def _session(ppa):
+            if getattr(local, 'sessions', None) is None:
+                local.sessions = {}
+            if ppa not in local.sessions:
+                local.sessions[ppa] = FTPSession(self.host, self.port, ppa, self.timeout)
+                with sessions_lock:
+                    sessions.append(local.sessions[ppa])
+            return local.sessions[ppa]
+
+        def _upload(item):
+            source_changes, ppa = item
+            entry = {'source_changes': source_changes, 'ppa': ppa, 'failed': False, 'msg': None}
+            try:
+                path, files, upload = self._prepare(source_changes, existing.get(item))
+                entry.update(upload)
+                self._transfer(_session(ppa), path, files, entry)
+            except Exception as e:
+                entry['failed'] = True
+                entry['msg'] = str(e)
+            return entry
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+                futures = [executor.submit(_upload, item) for item in items]
+                for future in as_completed(futures):
+                    if progress is not None:
+                        progress(future.result())
+                for future in futures:
+                    entry = future.result()
+                    result['changes'].append(entry)
+                    if entry['failed']:
+                        result['failed'] += 1
+                        continue
+                    for key in ['uploads', 'resumed', 'skipped', 'metrics']:
+                        result[key].extend(entry[key])
+                    result['count'] += entry['count']
+        finally:
+            for session in sessions:
+                session.close()
+
+        return result
+
+    def _send(self, session, filename, path):
+        if os.path.exists(path) is False:
+            raise Exception("Failed to find %s for upload" % path)
+
+        # Retry transient failures on a fresh connection, each attempt picks up from whatever
+        # the server already holds so a dropped link only costs the missing bytes.
+        attempt = 0
+        started = time.monotonic()
+        metrics = {'file': filename, 'size': os.path.getsize(path), 'bytes': 0, 'offset': 0, 'attempts': 0}
+        while True:
+            try:
+                metrics['attempts'] += 1
+                if session.ftp is None:
+                    session.connect()
+                self._stor(session.ftp, filename, path, metrics)
+                metrics['duration'] = round(time.monotonic() - started, 3)
+                metrics['mb_per_sec'] = round(metrics['bytes'] / 1000000.0 / metrics['duration'], 3) \
+                    if metrics['duration'] > 0 else 0.0
+                return metrics
+            except error_perm:
+                raise
+            except all_errors as e:
+                session.abort()
+                attempt += 1
+                if attempt > self.retries:
+                    raise Exception("Upload of %s failed after %d attempts: %s" % (filename, attempt, e))
+
+    def _remote_size(self, ftp, filename):
+        try:
+            ftp.voidcmd("TYPE I")
+            return ftp.size(filename)
+        except error_perm:
+            return None
+
+    def _stor(self, ftp, filename, path, metrics):
+        local_size = os.path.getsize(path)
+        offset = self._remote_size(ftp, filename)
+        if offset is None or offset > local_size:
+            offset = 0
+        metrics['offset'] = offset
+        if offset == local_size and offset > 0:
+            return offset
+
+        def _sent(block):
+            metrics['bytes'] += len(block)
+            if self.bucket is not None:
+                self.bucket.consume(len(block))
+
+        with open(path, 'rb') as fh:
+            if offset == 0:
+                ftp.storbinary("STOR " + filename, fh, self.block_size, _sent)
+            else:
+                fh.seek(offset)
+                try:
+                    ftp.storbinary("STOR " + filename, fh, self.block_size, _sent, rest=offset)
+                except error_perm:
+                    # Server refused REST, fall back to appending the remainder
+                    fh.seek(offset)
+                    ftp.storbinary("APPE " + filename, fh, self.block_size, _sent)
+
+        remote_size = self._remote_size(ftp, filename)
+        if remote_size is not None and remote_size != local_size:
+            raise Exception("Size mismatch after uploading %s: local %d bytes, remote %d bytes" % (
+                filename, local_size, remote_size))
+        return offset
@@ -0,0 +1,68 @@
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.store import JsonStore
+from datetime import datetime, timedelta, timezone
+
+FEED_STATE = '~/.cache/tuxinvader.launchpad/changes.json'
+
+
+def _timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class ChangeFeed(object):
+
+    # The state holds a high-water mark for each PPA (the newest date_created seen) and the etag of every
+    # publication created within the revalidation window before it. Each poll lists only the publications
+    # created since the start of that window: new links are reported as added, and changed etags (eg a
+    # Pending publication becoming Published) as updated. Status changes to older publications are not seen.
+    def __init__(self, path=FEED_STATE):
+        self._store = JsonStore(path)
+        self.path = self._store.path
+
+    def reset(self, project, ppa):
+        with self._store.update() as data:
+            data.pop("%s/%s" % (project, ppa), None)
+
+    def poll(self, launchpad, project, ppa, revalidate=3600, baseline=True):
+        key = "%s/%s" % (project, ppa)
+        window = timedelta(seconds=revalidate)
+        state = self._store.load().get(key)
+        first_run = state is None
+        if first_run:
+            state = {'ppa_link': None, 'high_water': None, 'etags': {}}
+            since = datetime.now(tz=timezone.utc) - window if baseline else None
+        else:
+            since = _timestamp(state['high_water']) - window
+
+        listing = launchpad.get_sources_since(project, ppa, since, state['ppa_link'])
+        result = {'added': [], 'updated': [], 'first_run': first_run, 'since': None if since is None else since.isoformat()}
+        high_water = None if state['high_water'] is None else _timestamp(state['high_water'])
+        etags = {}
+        for source in listing['sources']:
+            created = _timestamp(source['date_created'])
+            if high_water is None or created > high_water:
+                high_water = created
+            seen = state['etags'].get(source['self_link'])
+            if seen is None:
+                result['added'].append(source)
+            elif seen[0] != source['http_etag']:
+                result['updated'].append(source)
+            etags[source['self_link']] = [source['http_etag'], created.isoformat()]
+
+        # Keep the etags of publications which are still inside the window but weren't returned this time
+        for link, seen in state['etags'].items():
+            if link not in etags and since is not None and _timestamp(seen[1]) >= since:
+                etags[link] = seen
+
+        if first_run and baseline:
+            result['added'] = []
+        if high_water is None:
+            high_water = since if since is not None else datetime.now(tz=timezone.utc)
+
+        with self._store.update() as data:
+            data[key] = {'ppa_link': listing['ppa_link'], 'high_water': high_water.isoformat(), 'etags': etags,
+                         'polled': datetime.now(tz=timezone.utc).isoformat()}
+        result['high_water'] = high_water.isoformat()
+        return result
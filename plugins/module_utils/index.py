@@ -0,0 +1,192 @@
+from __future__ import (absolute_import, division, print_function)
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+import os
+import sqlite3
+import time
+
+INDEX_DB = '~/.cache/tuxinvader.launchpad/index.db'
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS ppas (
+        ppa TEXT PRIMARY KEY, project TEXT, name TEXT, link TEXT,
+        sources_high_water TEXT, builds_high_water TEXT, synced TEXT)''',
+    '''CREATE TABLE IF NOT EXISTS sources (
+        link TEXT PRIMARY KEY, ppa TEXT, name TEXT, version TEXT, series TEXT, component TEXT, pocket TEXT,
+        status TEXT, date_created TEXT, date_published TEXT, date_superseded TEXT, date_removed TEXT)''',
+    '''CREATE TABLE IF NOT EXISTS builds (
+        link TEXT PRIMARY KEY, ppa TEXT, source_name TEXT, source_version TEXT, series TEXT, arch_tag TEXT,
+        buildstate TEXT, datecreated TEXT, date_started TEXT, datebuilt TEXT, duration TEXT, build_log_url TEXT,
+        title TEXT)''',
+    'CREATE INDEX IF NOT EXISTS sources_name ON sources (name, version)',
+    'CREATE INDEX IF NOT EXISTS sources_ppa ON sources (ppa, status)',
+    'CREATE INDEX IF NOT EXISTS sources_series ON sources (series)',
+    'CREATE INDEX IF NOT EXISTS sources_status ON sources (status)',
+    'CREATE INDEX IF NOT EXISTS sources_created ON sources (date_created)',
+    'CREATE INDEX IF NOT EXISTS sources_published ON sources (date_published)',
+    'CREATE INDEX IF NOT EXISTS builds_source ON builds (source_name, source_version)',
+    'CREATE INDEX IF NOT EXISTS builds_ppa ON builds (ppa, buildstate)',
+    'CREATE INDEX IF NOT EXISTS builds_series ON builds (series, arch_tag)',
+    'CREATE INDEX IF NOT EXISTS builds_state ON builds (buildstate)',
+    'CREATE INDEX IF NOT EXISTS builds_created ON builds (datecreated)',
+    'CREATE INDEX IF NOT EXISTS builds_built ON builds (datebuilt)',
+]
+
+SOURCE_COLUMNS = ['link', 'ppa', 'name', 'version', 'series', 'component', 'pocket', 'status', 'date_created',
+                  'date_published', 'date_superseded', 'date_removed']
+BUILD_COLUMNS = ['link', 'ppa', 'source_name', 'source_version', 'series', 'arch_tag', 'buildstate', 'datecreated',
+                 'date_started', 'datebuilt', 'duration', 'build_log_url', 'title']
+
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).isoformat()
+    return str(value)
+
+
+def _link_part(link, position):
+    if link is None:
+        return None
+    parts = str(link).rstrip("/").split("/")
+    return parts[position] if len(parts) >= -position else None
+
+
+class PPAIndex(object):
+
+    # A local SQLite mirror of the source publications and build records of PPAs. Dates are stored as UTC ISO 8601
+    # strings, so they sort and compare as text. Each worker syncing a PPA writes through its own connection, a
+    # batch at a time, and WAL mode lets queries run while a sync is in progress. A read only index is opened as
+    # it is, without creating the database or its schema, and can only be queried.
+    def __init__(self, path=INDEX_DB, readonly=False):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.readonly = readonly
+        if readonly:
+            return
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        conn = self.connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+        finally:
+            conn.close()
+
+    def connect(self, readonly=False):
+        if readonly or self.readonly:
+            conn = sqlite3.connect("file:%s?mode=ro" % quote(self.path), uri=True, timeout=60)
+        else:
+            conn = sqlite3.connect(self.path, timeout=60)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def high_water(self, ppa):
+        conn = self.connect()
+        try:
+            row = conn.execute("SELECT sources_high_water, builds_high_water FROM ppas WHERE ppa = ?",
+                               (ppa,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None, None
+        return tuple(None if value is None else datetime.fromisoformat(value) for value in row)
+
+    def _source_row(self, ppa, source):
+        return (source.self_link, ppa, source.source_package_name, source.source_package_version,
+                _link_part(source.distro_series_link, -1), source.component_name, source.pocket, source.status,
+                _text(source.date_created), _text(source.date_published), _text(source.date_superseded),
+                _text(source.date_removed))
+
+    def _build_row(self, ppa, build):
+        return (build.self_link, ppa, build.source_package_name, build.source_package_version,
+                _link_part(getattr(build, 'distro_arch_series_link', None), -2), build.arch_tag, build.buildstate,
+                _text(build.datecreated), _text(build.date_started), _text(build.datebuilt), _text(build.duration),
+                build.build_log_url, build.title)
+
+    def _write(self, conn, table, columns, rows):
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO %s (%s) VALUES (%s)" % (
+                table, ", ".join(columns), ", ".join("?" * len(columns))), rows)
+
+    def _sync_table(self, conn, records, table, columns, row, date_column, batch_size):
+        # Rows are written in a transaction per batch, and the newest date seen is returned as the high-water mark
+        count = 0
+        newest = None
+        batch = []
+        for record in records:
+            batch.append(row(record))
+            created = getattr(record, date_column)
+            if created is not None and (newest is None or created > newest):
+                newest = created
+            if len(batch) >= batch_size:
+                self._write(conn, table, columns, batch)
+                count += len(batch)
+                batch = []
+        if len(batch) > 0:
+            self._write(conn, table, columns, batch)
+            count += len(batch)
+        return count, newest
+
+    def sync(self, launchpad, project, names, builds=True, full=False, revalidate=86400, batch_size=500, workers=4):
+        # Each sync lists only the records created since the last high-water mark, less the revalidation window, so
+        # recent status changes are picked up. A full sync lists everything again.
+        result = {'ppas': {}, 'sources': 0, 'builds': 0}
+        start = time.time()
+        window = timedelta(seconds=revalidate)
+        links = launchpad.get_ppa_links(project, names)
+
+        def _sync(api_root, item):
+            name, link = item
+            ppa = "%s/%s" % (project, name)
+            sources_since, builds_since = (None, None) if full else self.high_water(ppa)
+            sources_since = None if sources_since is None else sources_since - window
+            builds_since = None if builds_since is None else builds_since - window
+            entry = {'sources_since': _text(sources_since), 'builds_since': None, 'sources': 0, 'builds': 0}
+            conn = self.connect()
+            try:
+                entry['sources'], sources_high = self._sync_table(
+                    conn, launchpad.iter_sources_since(api_root, link, sources_since), 'sources', SOURCE_COLUMNS,
+                    lambda source: self._source_row(ppa, source), 'date_created', batch_size)
+                builds_high = None
+                if builds:
+                    entry['builds_since'] = _text(builds_since)
+                    entry['builds'], builds_high = self._sync_table(
+                        conn, launchpad.iter_builds_since(api_root, link, builds_since), 'builds', BUILD_COLUMNS,
+                        lambda build: self._build_row(ppa, build), 'datecreated', batch_size)
+                with conn:
+                    previous = conn.execute("SELECT sources_high_water, builds_high_water FROM ppas WHERE ppa = ?",
+                                            (ppa,)).fetchone()
+                    conn.execute("INSERT OR REPLACE INTO ppas VALUES (?, ?, ?, ?, ?, ?, ?)", (
+                        ppa, project, name, link,
+                        _text(sources_high) if sources_high is not None else (previous[0] if previous else None),
+                        _text(builds_high) if builds_high is not None else (previous[1] if previous else None),
+                        datetime.now(tz=timezone.utc).isoformat()))
+            finally:
+                conn.close()
+            return entry
+
+        items = list(links.items())
+        for item, entry in zip(items, launchpad.map_concurrent(_sync, items, workers)):
+            result['ppas'][item[0]] = entry
+            result['sources'] += entry['sources']
+            result['builds'] += entry['builds']
+        result['elapsed'] = round(time.time() - start, 3)
+        return result
+
+    def query(self, sql, params=None, limit=1000):
+        # Queries run on a read only connection, so they can't change the index
+        start = time.time()
+        conn = self.connect(readonly=True)
+        try:
+            cursor = conn.execute(sql, params or [])
+            columns = [] if cursor.description is None else [column[0] for column in cursor.description]
+            rows = cursor.fetchmany(limit) if limit is not None and limit > 0 else cursor.fetchall()
+            truncated = limit is not None and limit > 0 and cursor.fetchone() is not None
+        finally:
+            conn.close()
+        return {'columns': columns, 'rows': [dict(row) for row in rows], 'count': len(rows),
+                'truncated': truncated, 'elapsed_ms': round((time.time() - start) * 1000, 3)}
@@ -0,0 +1,68 @@
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.store import JsonStore
+from datetime import datetime, timezone
+import os
+import re
+
+JOB_DIR = '~/.cache/tuxinvader.launchpad/jobs'
+JOB_RUNNING = 'running'
+JOB_FINISHED = 'finished'
+JOB_FAILED = 'failed'
+
+
+class JobStatus(object):
+
+    # A job status file records the work planned for a long running task and every item completed so far. It is
+    # rewritten atomically after each item, so it can be read while the task runs (eg under async), and a task
+    # re-run with the same job id skips the items already completed.
+    def __init__(self, job_id, directory=JOB_DIR):
+        if re.match(r"^[A-Za-z0-9_.-]+$", job_id) is None:
+            raise Exception("job_id may only contain letters, numbers, dots, dashes and underscores")
+        self.id = job_id
+        self._store = JsonStore(os.path.join(os.path.expanduser(directory), job_id + ".json"))
+        self.path = self._store.path
+        self._status = self._store.load()
+
+    def _now(self):
+        return datetime.now(tz=timezone.utc).isoformat()
+
+    def _save(self, **changes):
+        with self._store.update() as data:
+            data.update(changes)
+            data['updated'] = self._now()
+            self._status = dict(data)
+
+    def begin(self, task, plan=None):
+        # Returns the plan stored by the first run of the job, so a resumed job works through the same items
+        # even if the target has changed in the meantime.
+        if self._status.get('task') not in [None, task]:
+            raise Exception("Job %s was started by %s, not %s" % (self.id, self._status['task'], task))
+        if self._status.get('plan') is not None:
+            plan = self._status['plan']
+        self._save(id=self.id, task=task, state=JOB_RUNNING, plan=plan,
+                   total=None if plan is None else len(plan), started=self._status.get('started', self._now()),
+                   runs=self._status.get('runs', 0) + 1, completed=self._status.get('completed', {}), msg=None)
+        return plan
+
+    def is_done(self, key):
+        return key in self._status.get('completed', {})
+
+    def result(self, key):
+        return self._status.get('completed', {}).get(key)
+
+    def results(self):
+        return list(self._status.get('completed', {}).values())
+
+    def complete(self, key, value):
+        with self._store.update() as data:
+            data.setdefault('completed', {})[key] = value
+            data['updated'] = self._now()
+            self._status = dict(data)
+
+    def finish(self, state=JOB_FINISHED, msg=None):
+        self._save(state=state, msg=msg, finished=self._now())
+
+    def summary(self):
+        return {'id': self.id, 'path': self.path, 'state': self._status.get('state'),
+                'runs': self._status.get('runs', 0), 'total': self._status.get('total'),
+                'completed': len(self._status.get('completed', {}))}
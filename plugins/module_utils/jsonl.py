@@ -0,0 +1,62 @@
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.store import json_default
+import gzip
+import json
+import os
+import tempfile
+
+
+class JsonLinesWriter(object):
+
+    # Write entries to a JSON Lines file as they arrive, so a listing of any size can be saved without holding it
+    # in memory. It has an append() method, so it can be passed anywhere a result list is filled in. The file is
+    # gzip compressed if the path ends in .gz, and it's written to a temporary file and renamed into place when
+    # closed, so a failed listing never leaves a partial file behind.
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.compressed = self.path.endswith(".gz")
+        self.count = 0
+        self._tmp = None
+        self._file = None
+
+    def __enter__(self):
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        fd, self._tmp = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+        if self.compressed:
+            os.close(fd)
+            self._file = gzip.open(self._tmp, "wt", encoding="utf-8")
+        else:
+            self._file = os.fdopen(fd, "w", encoding="utf-8")
+        return self
+
+    def append(self, entry):
+        self._file.write(json.dumps(entry, sort_keys=True, default=json_default))
+        self._file.write("\n")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._file.close()
+            if exc_type is None:
+                os.chmod(self._tmp, 0o644)
+                os.replace(self._tmp, self.path)
+        finally:
+            if os.path.exists(self._tmp):
+                os.unlink(self._tmp)
+        return False
+
+    def summary(self):
+        return {'dest': self.path, 'count': self.count, 'compressed': self.compressed}
+
+
+def run_info(dest, fetch):
+    # fetch(sink) fills in and returns a result, appending its entries to sink if it isn't None. With dest set,
+    # the entries are streamed to a JSON Lines file as they are read and only the counts are returned.
+    if dest is None:
+        return fetch(None)
+    with JsonLinesWriter(dest) as writer:
+        result = fetch(writer)
+    result['dest'] = writer.summary()
+    return result
@@ -0,0 +1,69 @@
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.store import JsonStore
+from datetime import datetime, timedelta, timezone
+import hashlib
+
+LEDGER_UPLOADED = 'uploaded'
+LEDGER_ACCEPTED = 'accepted'
+LEDGER_MISSING = 'missing'
+
+
+class UploadLedger(object):
+
+    # Entries which are 'uploaded' or 'accepted' are not sent again. An 'uploaded' entry which reconciliation
+    # can't find in the archive is marked 'missing' so that the next run sends it again.
+    skip_states = [LEDGER_UPLOADED, LEDGER_ACCEPTED]
+
+    def __init__(self, path):
+        self._store = JsonStore(path)
+        self.path = self._store.path
+
+    def key(self, source_changes, ppa):
+        digest = hashlib.sha256()
+        with open(source_changes, "rb") as ifile:
+            for chunk in iter(lambda: ifile.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return "%s@%s" % (digest.hexdigest(), ppa)
+
+    def get(self, key):
+        return self._store.load().get(key)
+
+    def entries(self, ppa=None, status=None):
+        entries = {}
+        for key, entry in self._store.load().items():
+            if ppa is not None and entry.get('ppa') != ppa:
+                continue
+            if status is not None and entry.get('status') != status:
+                continue
+            entries[key] = entry
+        return entries
+
+    def record(self, key, status, **info):
+        with self._store.update() as data:
+            entry = data.get(key, {})
+            entry.update(info)
+            entry['status'] = status
+            entry['updated'] = datetime.now(tz=timezone.utc).isoformat()
+            data[key] = entry
+        return entry
+
+    def reconcile(self, launchpad, ppa=None, keys=None, exclude=None, grace=3600):
+        # Check unconfirmed uploads against the archive. Anything Launchpad has published (or has pending) was
+        # accepted, anything it doesn't know about was rejected or lost and should be sent again. Recent uploads
+        # are left alone for a grace period, as Launchpad only processes the upload queue every few minutes.
+        result = {}
+        cutoff = datetime.now(tz=timezone.utc) - timedelta(seconds=grace)
+        for key, entry in self.entries(ppa=ppa, status=LEDGER_UPLOADED).items():
+            if keys is not None and key not in keys:
+                continue
+            if exclude is not None and key in exclude:
+                continue
+            if datetime.fromisoformat(entry['updated']) > cutoff:
+                continue
+            ppa_path = entry['ppa'].split('/')
+            status = launchpad.get_source_status(ppa_path[0], ppa_path[-1], entry['source'], entry['version'])
+            if status is None:
+                result[key] = self.record(key, LEDGER_MISSING)['status']
+            else:
+                result[key] = self.record(key, LEDGER_ACCEPTED, archive_status=status)['status']
+        return result
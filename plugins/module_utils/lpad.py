@@ -2,12 +2,27 @@ from __future__ import (absolute_import, division, print_function)
 from ansible.module_utils.common.text.converters import to_text
 from launchpadlib.credentials import Credentials, CredentialStore, AuthorizeRequestTokenWithURL, AccessToken
 from launchpadlib.launchpad import Launchpad
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.deb822 import VersionKey
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from itertools import islice
+from urllib.parse import unquote
+import heapq
 import os
 import json
 import re
+import threading
+import time
 
 LP_APP_NAME = 'ansible'
+BUILD_SUCCESS = 'Successfully built'
+BUILD_TERMINAL = [BUILD_SUCCESS, 'Failed to build', 'Dependency wait', 'Chroot problem',
+                  'Build for superseded Source', 'Failed to upload', 'Cancelled build']
+SOURCE_STATUSES = ['Pending', 'Published', 'Superseded', 'Deleted', 'Obsolete']
+RETURN_MODES = ['none', 'count', 'summary', 'full']
+BINARY_FIELDS = ['binary_package_name', 'binary_package_version', 'arch_tag', 'distro_series', 'status',
+                 'component_name', 'pocket', 'date_created', 'date_published']
+BINARY_PAGE = 75
 
 
 class LPHandler(object):
@@ -21,6 +36,8 @@ class LPHandler(object):
     def __init__(self, authorize=False, consumer=LP_APP_NAME):
         self._consumer = consumer
         self._authorize = authorize
+        self._roots = []
+        self._roots_lock = threading.Lock()
         if authorize:
             if os.environ.get('LP_ACCESS_TOKEN') is None:
                 raise Exception(
@@ -31,15 +48,50 @@ class LPHandler(object):
             self._credStore = EnvCredentialStore(consumer)
             self._credentials = self._credStore.load(consumer)
 
-    def _login(self):
+    def _new_root(self):
         if self._authorize:
             ae = AuthorizeRequestTokenWithURL(
                 service_root='production', consumer_name=self._consumer)
-            self.api_root = Launchpad.login_with(application_name=self._consumer, service_root='production',
-                                                 credential_store=self._credStore, authorization_engine=ae, version='devel')
-        else:
-            self.api_root = Launchpad.login_anonymously(
-                self._consumer, 'production', version='devel')
+            return Launchpad.login_with(application_name=self._consumer, service_root='production',
+                                        credential_store=self._credStore, authorization_engine=ae, version='devel')
+        return Launchpad.login_anonymously(
+            self._consumer, 'production', version='devel')
+
+    def _login(self):
+        self.api_root = self._new_root()
+
+    def _acquire_root(self):
+        # launchpadlib connections aren't thread safe, so each worker borrows one from the handler's pool for the
+        # length of its task, and only logs in when every root in the pool is in use. The pool lives as long as
+        # the handler, so repeated fan-outs (eg the polls of wait_for_builds) reuse the same logins.
+        with self._roots_lock:
+            if len(self._roots) > 0:
+                return self._roots.pop()
+        return self._new_root()
+
+    def _release_root(self, api_root):
+        with self._roots_lock:
+            self._roots.append(api_root)
+
+    def map_concurrent(self, func, items, workers=4, executor=None):
+        # Run func(api_root, item) for every item over a pool of threads, each with a connection of its own.
+        # Objects must be passed between threads as links and loaded again with api_root.load(). Results keep
+        # the order of items. A caller fanning out many batches can pass its own executor, so the threads are
+        # started once rather than for every batch.
+        if len(items) == 0:
+            return []
+
+        def _run(item):
+            api_root = self._acquire_root()
+            try:
+                return func(api_root, item)
+            finally:
+                self._release_root(api_root)
+
+        if executor is not None:
+            return list(executor.map(_run, items))
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as executor:
+            return list(executor.map(_run, items))
 
     def start_interactive_login(self):
         self._credStore = EnvCredentialStore(self._consumer)
@@ -59,14 +111,56 @@ class LPHandler(object):
         result['LP_ACCESS_SECRET'] = self._credentials.access_token.secret
         return result
 
-    def get_user_info(self, name):
-        result = {'details': {}}
+    def _get_person(self, api_root, name):
+        # people[name] fetches the account directly, and raises KeyError if there is no such user
+        try:
+            return api_root.people[name.lstrip("~")]
+        except KeyError:
+            return None
+
+    def _search_people(self, api_root, name, limit):
+        matches = []
+        for person in api_root.people.find(text=name):
+            if len(matches) >= limit:
+                break
+            matches.append(self._build_entry_result(person))
+        return matches
+
+    def get_user_info(self, name, search=False, search_limit=25):
+        # Exact usernames are resolved directly. The fuzzy full text search is only used when asked for, and then
+        # only if the direct lookup fails, returning each match separately rather than merging them.
+        result = {'details': {}, 'found': False, 'matches': []}
+        if self.api_root is None:
+            self._login()
+        person = self._get_person(self.api_root, name)
+        if person is not None:
+            result['details'] = self._build_entry_result(person)
+            result['found'] = True
+        elif search:
+            result['matches'] = self._search_people(self.api_root, name, search_limit)
+        return result
+
+    def get_users_info(self, names, search=False, search_limit=25, workers=4):
+        result = {'users': {}, 'missing': [], 'matches': {}}
         if self.api_root is None:
             self._login()
-        people = self.api_root.people
-        for person in people.find(text=name):
-            for att in person.lp_attributes:
-                result['details'][att] = person.lp_get_parameter(att)
+
+        def _lookup(api_root, name):
+            person = self._get_person(api_root, name)
+            if person is not None:
+                return self._build_entry_result(person), []
+            if search:
+                return None, self._search_people(api_root, name, search_limit)
+            return None, []
+
+        names = list(dict.fromkeys(names))
+        for name, (details, matches) in zip(names, self.map_concurrent(_lookup, names, workers)):
+            if details is None:
+                result['missing'].append(name)
+                if search:
+                    result['matches'][name] = matches
+            else:
+                result['users'][name] = details
         return result
 
     def _get_project(self, name):
@@ -81,9 +175,17 @@ class LPHandler(object):
             raise LaunchPadLookupError("PPA '" + name + "' not found")
         return ppa[0]
 
+    def _source_regex(self, source_name, match):
+        if match.lower() == "starts_with":
+            return r"^%s.*" % source_name
+        elif match.lower() == "ends_with":
+            return r".*%s$" % source_name
+        elif match.lower() == "contains":
+            return r".*%s.*" % source_name
+        return r"%s" % source_name
+
     def _get_sources(self, ppa, source_name, match, status=None):
         sources = None
-        regex = ""
 
         if source_name is not None:
             if match.lower() == "exact":
@@ -92,14 +194,7 @@ class LPHandler(object):
             else:
                 sources = ppa.getPublishedSources(
                 ) if status is None else ppa.getPublishedSources(status=status)
-                if match.lower() == "starts_with":
-                    regex = r"^%s.*" % source_name
-                elif match.lower() == "ends_with":
-                    regex = r".*%s$" % source_name
-                elif match.lower() == "contains":
-                    regex = r".*%s.*" % source_name
-                else:
-                    regex = r"%s" % source_name
+                regex = self._source_regex(source_name, match)
                 filtered = []
                 for source in sources:
                     regex_result = re.search(regex, source.source_package_name)
@@ -112,8 +207,51 @@ class LPHandler(object):
 
         return sources
 
-    def _build_project_result(self, project, ppa_filter):
-        result = {'details': {}, 'ppas': []}
+    def _iter_sources(self, ppa, source_name=None, match="exact", status=None, order_by_date=False):
+        # Like _get_sources, but yields the matching sources as the pages arrive, so a caller which stops early
+        # doesn't fetch the rest of the listing. With order_by_date Launchpad returns the newest first.
+        params = {}
+        if status is not None:
+            params['status'] = status
+        if order_by_date:
+            params['order_by_date'] = True
+        regex = None
+        if source_name is not None:
+            if match.lower() == "exact":
+                params['source_name'] = source_name
+                params['exact_match'] = True
+            else:
+                regex = self._source_regex(source_name, match)
+        for source in ppa.getPublishedSources(**params):
+            if regex is None or re.search(regex, source.source_package_name) is not None:
+                yield source
+
+    def _select_sources(self, ppa, source_name=None, match="exact", status=None, limit=None, order=None):
+        # Return at most limit sources. Ordering by date is done by Launchpad, so we stop fetching pages once we
+        # have limit sources. Ordering by version has to see every match, but only the best limit are kept, in a
+        # bounded heap.
+        if order not in [None, 'date', 'version']:
+            raise Exception("order should be one of date or version")
+        if limit is not None and limit < 1:
+            limit = None
+        sources = self._iter_sources(ppa, source_name, match, status, order == 'date')
+        if order != 'version':
+            return list(sources if limit is None else islice(sources, limit))
+
+        heap = []
+        for seq, source in enumerate(sources):
+            item = (VersionKey(source.source_package_version), -seq, source)
+            if limit is None or len(heap) < limit:
+                heapq.heappush(heap, item)
+            elif heap[0][0] < item[0]:
+                heapq.heapreplace(heap, item)
+        return [item[2] for item in sorted(heap, key=lambda item: item[:2], reverse=True)]
+
+    def _build_project_result(self, project, ppa_filter, expand_ppas=False):
+        # The status filter is applied to the listing before anything else is read, and only the names of the
+        # matching PPAs are returned unless expand_ppas is set. The entries of the listing already hold every
+        # attribute of each PPA, so expanding them costs no more requests.
+        result = {'details': {}, 'ppa_names': [], 'ppas': []}
 
         ppa_filter = ppa_filter.capitalize()
         ppa_list = ['*', 'Active', 'Deleted']
@@ -123,12 +261,12 @@ class LPHandler(object):
 
         for att in project.lp_attributes:
             result['details'][att] = project.lp_get_parameter(att)
+
         for ppa in project.ppas:
-            ppa_atts = {}
             if ppa_filter == '*' or ppa_filter == ppa.status:
-                for att in ppa.lp_attributes:
-                    ppa_atts[att] = ppa.lp_get_parameter(att)
-                result['ppas'].append(ppa_atts)
+                result['ppa_names'].append(ppa.name)
+                if expand_ppas:
+                    result['ppas'].append(self._build_entry_result(ppa))
         return result
 
     def _build_entry_result(self, source_package):
@@ -137,30 +275,108 @@ class LPHandler(object):
             source_atts[att] = source_package.lp_get_parameter(att)
         return source_atts
 
-    def _build_ppa_result(self, ppa, status_filter):
+    def _count_sources(self, ppa, status=None, distro_series=None, source_name=None, exact_match=False):
+        # total_size comes with the first page of a collection (or from its total_size_link when the collection is
+        # large), so this never pages through the listing
+        params = {}
+        if status is not None:
+            params['status'] = status
+        if distro_series is not None:
+            params['distro_series'] = distro_series
+        if source_name is not None:
+            params['source_name'] = source_name
+            params['exact_match'] = exact_match
+        return ppa.getPublishedSources(**params).total_size
+
+    def _summarize_ppa(self, ppa, status_filter, source_name=None, exact_match=False):
+        # Per status and per series counts from total_size alone. Only the distribution's active series are
+        # counted one by one, anything published to older series is counted under "other".
+        status = None if status_filter == '*' else status_filter
+        summary = {'total': self._count_sources(ppa, status, None, source_name, exact_match), 'status': {},
+                   'series': {}}
+        for source_status in (SOURCE_STATUSES if status is None else [status]):
+            summary['status'][source_status] = self._count_sources(ppa, source_status, None, source_name,
+                                                                   exact_match)
+        counted = 0
+        for series in ppa.distribution.series:
+            if series.active:
+                count = self._count_sources(ppa, status, series, source_name, exact_match)
+                if count > 0:
+                    summary['series'][series.name] = count
+                    counted += count
+        if summary['total'] > counted:
+            summary['series']['other'] = summary['total'] - counted
+        return summary
+
+    def _source_series(self, source):
+        # The display name of a publication is "<name> <version> in <series>"
+        return source.get('display_name', '').rsplit(" in ", 1)[-1]
+
+    def summarize_sources(self, sources):
+        summary = {'total': len(sources), 'status': {}, 'series': {}}
+        for source in sources:
+            summary['status'][source['status']] = summary['status'].get(source['status'], 0) + 1
+            series = self._source_series(source)
+            summary['series'][series] = summary['series'].get(series, 0) + 1
+        return summary
+
+    def apply_return_mode(self, result, return_mode):
+        # Reduce a result holding an already fetched list of sources to the requested return mode
+        if return_mode == 'count':
+            result['source_count'] = len(result['sources'])
+        elif return_mode == 'summary':
+            result['summary'] = self.summarize_sources(result['sources'])
+        if return_mode != 'full':
+            result['sources'] = []
+        return result
+
+    def _build_ppa_result(self, ppa, status_filter, sink=None, return_mode='full', source_name=None, match="exact",
+                          limit=None, order=None):
+        # Sources are appended to sink if one is given (eg a JsonLinesWriter) rather than to the result. Only the
+        # full return mode lists the sources, count and summary are answered from the size of the collections.
         result = {'details': {}, 'sources': []}
+        sources = result['sources'] if sink is None else sink
         for att in ppa.lp_attributes:
             result['details'][att] = ppa.lp_get_parameter(att)
 
         status_filter = status_filter.capitalize()
-        status_list = ['*', 'Pending', 'Published',
-                       'Superseded', 'Deleted', 'Obsolete']
+        status_list = ['*'] + SOURCE_STATUSES
         if status_filter not in status_list:
             raise Exception("status_filter should be one of %s" %
                             str(status_list))
-
-        if status_filter == '*':
-            for source in ppa.getPublishedSources():
-                result['sources'].append(
-                    self._build_entry_result(source))
-        else:
-            for source in ppa.getPublishedSources(status=status_filter):
-                result['sources'].append(
-                    self._build_entry_result(source))
+        if return_mode not in RETURN_MODES:
+            raise Exception("return should be one of %s" % str(RETURN_MODES))
+
+        # Launchpad matches source names exactly or as a substring, so starts_with and ends_with have to list the
+        # sources and count them here
+        server_match = source_name is None or match.lower() in ["exact", "contains"]
+        exact_match = source_name is not None and match.lower() == "exact"
+        if return_mode in ['count', 'summary'] and not server_match:
+            matched = self._select_sources(ppa, source_name, match, None if status_filter == '*' else status_filter)
+            result['sources'] = [self._build_entry_result(source) for source in matched]
+            self.apply_return_mode(result, return_mode)
+        elif return_mode == 'count':
+            result['source_count'] = self._count_sources(ppa, None if status_filter == '*' else status_filter, None,
+                                                         source_name, exact_match)
+        elif return_mode == 'summary':
+            result['summary'] = self._summarize_ppa(ppa, status_filter, source_name, exact_match)
+        elif return_mode == 'full' and (source_name is not None or limit is not None or order is not None):
+            for source in self._select_sources(ppa, source_name, match, None if status_filter == '*' else status_filter,
+                                               limit, order):
+                sources.append(self._build_entry_result(source))
+        elif return_mode == 'full':
+            if status_filter == '*':
+                for source in ppa.getPublishedSources():
+                    sources.append(
+                        self._build_entry_result(source))
+            else:
+                for source in ppa.getPublishedSources(status=status_filter):
+                    sources.append(
+                        self._build_entry_result(source))
 
         return result
 
-    def get_project_info(self, name, status_filter=None):
+    def get_project_info(self, name, status_filter=None, expand_ppas=False):
         if self.api_root is None:
             self._login()
 
@@ -169,9 +385,10 @@ class LPHandler(object):
         except LaunchPadLookupError as e:
             raise Exception(e.args)
 
-        return self._build_project_result(project, status_filter)
+        return self._build_project_result(project, status_filter, expand_ppas)
 
-    def get_ppa_info(self, project_name, name, status_filter):
+    def get_ppa_info(self, project_name, name, status_filter, sink=None, return_mode='full', source_name=None,
+                     match="exact", limit=None, order=None):
         if self.api_root is None:
             self._login()
 
@@ -181,13 +398,22 @@ class LPHandler(object):
         except LaunchPadLookupError as e:
             raise Exception(e.args)
 
-        return self._build_ppa_result(ppa, status_filter)
+        return self._build_ppa_result(ppa, status_filter, sink, return_mode, source_name, match, limit, order)
 
-    def upsert_ppa(self, project_name, name, ensure, status_filter, displayname=None, description=None):
-        result = {}
-        ppa = None
-        changed = False
+    def _select_ppas(self, project, names):
+        # Returns the links of the named PPAs from one listing of the project's PPAs, keyed by name. A name of '*'
+        # selects every active PPA.
+        ppas = dict((ppa.name, ppa) for ppa in project.ppas)
+        if '*' in names:
+            selected = [name for name in sorted(ppas) if ppas[name].status == "Active"]
+        else:
+            selected = list(dict.fromkeys(names))
+            missing = [name for name in selected if name not in ppas]
+            if len(missing) > 0:
+                raise Exception("PPA '" + "', '".join(missing) + "' not found")
+        return dict((name, ppas[name].self_link) for name in selected)
 
+    def get_ppa_links(self, project_name, names):
         if self.api_root is None:
             self._login()
 
@@ -196,44 +422,164 @@ class LPHandler(object):
         except LaunchPadLookupError as e:
             raise Exception(e.args)
 
+        return self._select_ppas(project, names)
+
+    def iter_sources_since(self, api_root, ppa_link, since=None):
+        # The publications of a PPA created since a point in time (all of them if since is None), page by page
+        params = {}
+        if since is not None:
+            params['created_since_date'] = since.isoformat()
+        return api_root.load(ppa_link).getPublishedSources(**params)
+
+    def _builds_since(self, ppa, since=None):
+        # Without a state filter build records are returned newest first, so we stop at the first one created
+        # before since rather than walking the whole history
+        for br in ppa.getBuildRecords():
+            if since is not None and br.datecreated < since:
+                break
+            yield br
+
+    def iter_builds_since(self, api_root, ppa_link, since=None):
+        return self._builds_since(api_root.load(ppa_link), since)
+
+    def get_ppas_info(self, project_name, names, status_filter, workers=4, return_mode='full', source_name=None,
+                      match="exact", limit=None, order=None, build_time_frame=None):
+        # Resolve the project and list its PPAs once, then fetch the details and sources of each requested PPA
+        # concurrently, so the wall time follows the largest PPA rather than the number of PPAs. A name of '*'
+        # selects every active PPA of the project. With build_time_frame (in minutes) the recent build records
+        # of each PPA are fetched as well.
+        result = {'ppas': {}}
+
+        if self.api_root is None:
+            self._login()
+
         try:
-            ppa = self._get_ppa(project, name)
-        except LaunchPadLookupError:
-            pass
+            project = self._get_project(project_name)
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
+
+        selected = self._select_ppas(project, names)
+
+        def _fetch(api_root, link):
+            ppa = api_root.load(link)
+            entry = self._build_ppa_result(ppa, status_filter, None, return_mode, source_name, match, limit, order)
+            if build_time_frame is not None:
+                since = datetime.now(tz=timezone.utc) - timedelta(minutes=build_time_frame)
+                entry['builds'] = [self._build_entry_result(br) for br in self._builds_since(ppa, since)]
+            return entry
+
+        links = list(selected.values())
+        for name, entry in zip(selected, self.map_concurrent(_fetch, links, workers)):
+            result['ppas'][name] = entry
+        return result
 
+    def _apply_ppa(self, project, ppa, name, ensure, displayname, description):
+        # Bring one PPA in line with the desired state, returning the PPA (None if absent) and whether it changed.
+        # createPPA returns the new archive, so there's no need to look the PPA up again afterwards.
+        changed = False
         if ppa is not None:
             if ppa.status == "Active" and ensure.lower() == "absent":
-                changed = True
                 ppa.lp_delete()
-            else:
-                if ppa.displayname != displayname:
-                    ppa.displayname = displayname
-                    changed = True
-                if ppa.description != description:
-                    ppa.description = description
-                    changed = True
-                if changed:
-                    ppa.lp_save()
-
-        else:
-            if ensure.lower() == "present":
+                return None, True
+            if ensure.lower() == "absent":
+                return ppa, False
+            if ppa.displayname != displayname:
+                ppa.displayname = displayname
                 changed = True
-                project.createPPA(
-                    name=name, displayname=displayname, description=description)
+            if ppa.description != description:
+                ppa.description = description
+                changed = True
+            if changed:
+                ppa.lp_save()
+        elif ensure.lower() == "present":
+            changed = True
+            ppa = project.createPPA(name=name, displayname=displayname, description=description)
+        return ppa, changed
+
+    def upsert_ppa(self, project_name, name, ensure, status_filter, displayname=None, description=None,
+                   return_mode='none'):
+        ppa = None
+
+        if self.api_root is None:
+            self._login()
 
         try:
-            ppa = self._get_ppa(project, name)
+            project = self._get_project(project_name)
         except LaunchPadLookupError as e:
-            if ensure.lower() == "absent":
-                return {'details': {}, 'sources': []}
             raise Exception(e.args)
 
-        result = self._build_ppa_result(ppa, status_filter)
+        try:
+            ppa = self._get_ppa(project, name)
+        except LaunchPadLookupError:
+            pass
+
+        ppa, changed = self._apply_ppa(project, ppa, name, ensure, displayname, description)
+        if ppa is None:
+            return {'details': {}, 'sources': [], 'changed': changed}
+
+        result = self._build_ppa_result(ppa, status_filter, return_mode=return_mode)
         result['changed'] = changed
         return result
 
-    def prune_ppa(self, project_name, name, max_sources, source_name=None, match="exact", prune_by="date"):
-        result = {'pruned': [], 'remaining': [], 'count': 0, 'found': 0}
+    def reconcile_ppas(self, project_name, ppas, status_filter, return_mode='none', workers=4):
+        # Diff the desired PPAs against a single listing of the project's PPAs, then apply the creates, updates
+        # and deletes (and any source listings) concurrently. Only the PPAs which need work are loaded again.
+        result = {'ppas': {}, 'changed': False, 'created': 0, 'updated': 0, 'deleted': 0}
+
+        if self.api_root is None:
+            self._login()
+
+        try:
+            project = self._get_project(project_name)
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
+
+        current = dict((ppa.name, ppa) for ppa in project.ppas)
+        work = []
+        for spec in ppas:
+            ensure = spec.get('ensure', 'present').lower()
+            if ensure not in ['present', 'absent']:
+                raise Exception("Permitted values for 'ensure' are 'present' or 'absent'")
+            ppa = current.get(spec['name'])
+            action = None
+            if ppa is None:
+                if ensure == "present":
+                    action = "create"
+            elif ensure == "absent":
+                if ppa.status == "Active":
+                    action = "delete"
+            elif ppa.displayname != spec['displayname'] or ppa.description != spec['description']:
+                action = "update"
+            if action is not None or return_mode != 'none':
+                work.append((spec, ensure, action, None if ppa is None else ppa.self_link))
+            if action is None:
+                result['ppas'][spec['name']] = {'action': None, 'changed': False, 'sources': [],
+                                                'details': {} if ppa is None else self._build_entry_result(ppa)}
+
+        def _reconcile(api_root, item):
+            spec, ensure, action, link = item
+            ppa = None if link is None else api_root.load(link)
+            changed = False
+            if action is not None:
+                ppa, changed = self._apply_ppa(api_root.load(project.self_link), ppa, spec['name'], ensure,
+                                               spec['displayname'], spec['description'])
+            if ppa is None:
+                return {'action': action, 'changed': changed, 'details': {}, 'sources': []}
+            entry = self._build_ppa_result(ppa, status_filter, return_mode=return_mode)
+            entry['action'] = action
+            entry['changed'] = changed
+            return entry
+
+        for item, entry in zip(work, self.map_concurrent(_reconcile, work, workers)):
+            result['ppas'][item[0]['name']] = entry
+            if entry['changed']:
+                result['changed'] = True
+                result[{'create': 'created', 'update': 'updated', 'delete': 'deleted'}[item[2]]] += 1
+
+        return result
+
+    def prune_ppa(self, project_name, name, max_sources, source_name=None, match="exact", prune_by="date", job=None):
+        result = {'pruned': [], 'remaining': [], 'count': 0, 'found': 0, 'checkpointed': 0}
         if self.api_root is None:
             self._login()
 
@@ -273,12 +619,39 @@ class LPHandler(object):
             for item in sorted(srcKeys):
                 ascpkgs.append(srcItems[item])
 
+        prune = []
         if count > max_sources:
-            for package in ascpkgs[:(count - max_sources)]:
+            prune = ascpkgs[:(count - max_sources)]
+        keep = ascpkgs[len(prune):]
+
+        if job is None:
+            for package in prune:
                 result['pruned'].append(self._build_entry_result(package))
                 result['count'] += 1
                 package.requestDeletion()
-        for package in ascpkgs[(count - max_sources):]:
+        else:
+            # A resumed job works through the plan from its first run, packages it already deleted are no longer
+            # published, so they're reported from the checkpoint rather than the listing.
+            links = job.begin('prune_ppa', [package.self_link for package in prune])
+            published = dict((package.self_link, package) for package in ascpkgs)
+            keep = [package for package in ascpkgs if package.self_link not in links]
+            for link in links:
+                if job.is_done(link):
+                    result['pruned'].append(job.result(link))
+                    result['count'] += 1
+                    result['checkpointed'] += 1
+                    continue
+                package = published.get(link)
+                if package is None:
+                    package = self.api_root.load(link)
+                entry = self._build_entry_result(package)
+                if package.status != 'Deleted':
+                    package.requestDeletion()
+                result['pruned'].append(entry)
+                result['count'] += 1
+                job.complete(link, entry)
+
+        for package in keep:
             result['remaining'].append(self._build_entry_result(package))
 
         return result
@@ -319,6 +692,337 @@ class LPHandler(object):
 
         return result
 
+    def _upstream_version(self, version):
+        upstream = re.sub(r"^[0-9]+:", "", str(version))
+        if "-" in upstream:
+            upstream = upstream.rsplit("-", 1)[0]
+        return upstream
+
+    def get_archive_files(self, project_name, ppa_name, source_name, version):
+        result = {}
+        if self.api_root is None:
+            self._login()
+
+        try:
+            project = self._get_project(project_name)
+            ppa = self._get_ppa(project, ppa_name)
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
+
+        upstream = self._upstream_version(version)
+        for source in ppa.getPublishedSources(source_name=source_name, exact_match=True):
+            if source.status in ['Deleted', 'Obsolete']:
+                continue
+            if self._upstream_version(source.source_package_version) != upstream:
+                continue
+            for entry in source.sourceFileUrls(include_meta=True):
+                result[unquote(entry['url'].split('/')[-1])] = entry['sha256']
+
+        return result
+
+    def get_source_status(self, project_name, ppa_name, source_name, version):
+        if self.api_root is None:
+            self._login()
+
+        try:
+            project = self._get_project(project_name)
+            ppa = self._get_ppa(project, ppa_name)
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
+
+        for source in ppa.getPublishedSources(source_name=source_name, version=version, exact_match=True):
+            if source.status not in ['Deleted', 'Obsolete']:
+                return source.status
+        return None
+
+    def wait_for_publication(self, project_name, ppa_name, source_name, version=None, wait_for="Published",
+                             timeout=1800, interval=5, max_interval=60):
+        result = {'status': None, 'source': {}, 'durations': {}, 'polls': 0, 'elapsed': 0, 'timed_out': False,
+                  'removed': False}
+        if self.api_root is None:
+            self._login()
+
+        wait_for = wait_for.capitalize()
+        targets = {'Pending': ['Pending', 'Published'], 'Published': ['Published']}
+        if wait_for not in targets:
+            raise Exception("wait_for should be one of %s" % str(list(targets.keys())))
+
+        try:
+            project = self._get_project(project_name)
+            ppa = self._get_ppa(project, ppa_name)
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
+
+        # Poll with a single narrow query per tick, quickly at first and then backing off, but dropping back to
+        # the fast interval whenever the publication changes (new state or etag) as the next step often follows
+        # shortly. An upload Launchpad rejects never gets a publication, so it stays "Missing" until the timeout.
+        started = time.monotonic()
+        last = started
+        state = None
+        etag = None
+        delay = interval
+        while True:
+            result['polls'] += 1
+            if version is None:
+                sources = ppa.getPublishedSources(source_name=source_name, exact_match=True, order_by_date=True)
+            else:
+                sources = ppa.getPublishedSources(source_name=source_name, version=version, exact_match=True,
+                                                  order_by_date=True)
+            latest = None
+            for source in sources:
+                latest = source
+                break
+
+            now = time.monotonic()
+            if state is not None:
+                result['durations'][state] = round(result['durations'].get(state, 0) + now - last, 3)
+            last = now
+
+            new_state = "Missing" if latest is None else latest.status
+            new_etag = None if latest is None else latest.http_etag
+            if new_state != state or new_etag != etag:
+                delay = interval
+                if latest is not None:
+                    result['source'] = self._build_entry_result(latest)
+            else:
+                delay = min(delay * 2, max_interval)
+            state = new_state
+            etag = new_etag
+            result['status'] = state
+            result['elapsed'] = round(now - started, 3)
+
+            if state in targets[wait_for]:
+                break
+            if state in ['Deleted', 'Obsolete', 'Superseded']:
+                result['removed'] = True
+                break
+            if now - started >= timeout:
+                result['timed_out'] = True
+                break
+            time.sleep(min(delay, max(0, timeout - (now - started))))
+
+        result['durations'].setdefault(state, 0)
+        return result
+
+    def wait_for_builds(self, project_name, ppa_name, source_name=None, source_version=None, build_ids=None,
+                        fail_fast=False, timeout=7200, interval=30, max_interval=300, workers=4):
+        result = {'builds': [], 'succeeded': 0, 'failures': 0, 'pending': 0, 'polls': 0, 'elapsed': 0,
+                  'timed_out': False}
+        if self.api_root is None:
+            self._login()
+
+        try:
+            project = self._get_project(project_name)
+            ppa = self._get_ppa(project, ppa_name)
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
+
+        # Discover the builds once, after that each poll is one GET per unfinished build, made concurrently
+        links = []
+        if build_ids is not None:
+            for build_id in build_ids:
+                links.append("%s/+build/%s" % (ppa.self_link, build_id))
+        elif source_name is not None:
+            if source_version is None:
+                sources = ppa.getPublishedSources(source_name=source_name, exact_match=True, order_by_date=True)
+            else:
+                sources = ppa.getPublishedSources(source_name=source_name, version=source_version, exact_match=True)
+            for source in sources:
+                if source.status in ['Deleted', 'Obsolete']:
+                    continue
+                for build in source.getBuilds():
+                    if build.self_link not in links:
+                        links.append(build.self_link)
+                if source_version is None:
+                    break
+        else:
+            raise Exception("Either source_name or build_ids must be provided")
+
+        if len(links) == 0:
+            raise Exception("No builds found to wait for")
+
+        def _poll(api_root, link):
+            build = api_root.load(link)
+            return {'arch_tag': build.arch_tag, 'buildstate': build.buildstate, 'title': build.title,
+                    'build_log_url': build.build_log_url, 'upload_log_url': build.upload_log_url,
+                    'web_link': build.web_link, 'self_link': build.self_link,
+                    'duration': None if build.duration is None else str(build.duration),
+                    'datebuilt': None if build.datebuilt is None else str(build.datebuilt)}
+
+        started = time.monotonic()
+        builds = dict((link, None) for link in links)
+        waited = {}
+        delay = interval
+        while True:
+            result['polls'] += 1
+            pending = [link for link in links if builds[link] is None or builds[link]['buildstate'] not in BUILD_TERMINAL]
+            changed = False
+            for record in self.map_concurrent(_poll, pending, workers):
+                link = record['self_link']
+                if builds[link] is None or builds[link]['buildstate'] != record['buildstate']:
+                    changed = True
+                builds[link] = record
+                if record['buildstate'] in BUILD_TERMINAL:
+                    waited[link] = round(time.monotonic() - started, 3)
+
+            now = time.monotonic()
+            states = [builds[link]['buildstate'] for link in links]
+            failures = len([state for state in states if state in BUILD_TERMINAL and state != BUILD_SUCCESS])
+            if len([state for state in states if state not in BUILD_TERMINAL]) == 0:
+                break
+            if fail_fast and failures > 0:
+                break
+            if now - started >= timeout:
+                result['timed_out'] = True
+                break
+            delay = interval if changed else min(delay * 2, max_interval)
+            time.sleep(min(delay, max(0, timeout - (now - started))))
+
+        for link in links:
+            record = builds[link]
+            record['waited'] = waited.get(link)
+            result['builds'].append(record)
+            if record['buildstate'] == BUILD_SUCCESS:
+                result['succeeded'] += 1
+            elif record['buildstate'] in BUILD_TERMINAL:
+                result['failures'] += 1
+            else:
+                result['pending'] += 1
+        result['elapsed'] = round(time.monotonic() - started, 3)
+        return result
+
+    def check_source_packages(self, project_name, ppa_name, packages, skip_existing=False, workers=4):
+        # Batch version of check_source_package. The PPA's publications are listed once into an index keyed by
+        # (name, version), the missing and extra packages are worked out against the index, and the deletions
+        # (and any source file lookups for the uploads) are then made concurrently. Uploads are left to the caller.
+        result = {'packages': [], 'changed': False}
+
+        if self.api_root is None:
+            self._login()
+
+        try:
+            project = self._get_project(project_name)
+            ppa = self._get_ppa(project, ppa_name)
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
+
+        index = {}
+        names = set(package['name'] for package in packages)
+        for source in ppa.getPublishedSources():
+            if source.source_package_name not in names or source.status in ['Deleted', 'Obsolete']:
+                continue
+            key = (source.source_package_name, source.source_package_version)
+            index.setdefault(key, []).append(source)
+
+        deletions = []
+        lookups = []
+        for package in packages:
+            ensure = package.get('ensure', 'present').lower()
+            if ensure not in ['present', 'absent']:
+                raise Exception("Permitted values for 'ensure' are 'present' or 'absent'")
+            entry = {'name': package['name'], 'version': package.get('version'), 'ensure': ensure,
+                     'source_changes': package.get('source_changes'), 'sources': [], 'messages': [],
+                     'missing': False, 'changed': False, 'existing': None}
+            matches = []
+            for key, sources in index.items():
+                if key[0] == entry['name'] and (entry['version'] is None or key[1] == entry['version']):
+                    matches.extend(sources)
+            if ensure == "absent":
+                for source in matches:
+                    if source.status.lower() != "deleted":
+                        deletions.append(source.self_link)
+                        entry['changed'] = True
+                    entry['sources'].append(self._build_entry_result(source))
+            else:
+                for source in matches:
+                    if source.status.lower() == "published":
+                        entry['sources'].append(self._build_entry_result(source))
+                if len(entry['sources']) == 0:
+                    entry['missing'] = True
+                    if skip_existing and entry['source_changes'] is not None and entry['version'] is not None:
+                        upstream = self._upstream_version(entry['version'])
+                        links = [source.self_link for key, sources in index.items() for source in sources
+                                 if key[0] == entry['name'] and self._upstream_version(key[1]) == upstream]
+                        lookups.append((entry, links))
+            result['packages'].append(entry)
+
+        def _delete(api_root, link):
+            api_root.load(link).requestDeletion()
+            return link
+
+        def _files(api_root, link):
+            files = {}
+            for url in api_root.load(link).sourceFileUrls(include_meta=True):
+                files[unquote(url['url'].split('/')[-1])] = url['sha256']
+            return files
+
+        self.map_concurrent(_delete, deletions, workers)
+        if len(deletions) > 0:
+            result['changed'] = True
+
+        links = sorted(set(link for entry, entry_links in lookups for link in entry_links))
+        files = dict(zip(links, self.map_concurrent(_files, links, workers)))
+        for entry, entry_links in lookups:
+            entry['existing'] = {}
+            for link in entry_links:
+                entry['existing'].update(files[link])
+
+        return result
+
+    def get_sources_since(self, project_name, ppa_name, since=None, ppa_link=None):
+        # List the publications created since a point in time (all of them if since is None). Given the link of
+        # the PPA from an earlier call, the PPA is loaded directly rather than looked up through the project.
+        if self.api_root is None:
+            self._login()
+
+        ppa = None
+        if ppa_link is not None:
+            try:
+                ppa = self.api_root.load(ppa_link)
+            except Exception:
+                ppa = None
+        if ppa is None:
+            try:
+                project = self._get_project(project_name)
+                ppa = self._get_ppa(project, ppa_name)
+            except LaunchPadLookupError as e:
+                raise Exception(e.args)
+
+        if since is None:
+            sources = ppa.getPublishedSources()
+        else:
+            sources = ppa.getPublishedSources(created_since_date=since.isoformat())
+        return {'ppa_link': ppa.self_link, 'sources': [self._build_entry_result(source) for source in sources]}
+
+    def get_published_versions(self, ppa_ref, status="Published", api_root=None):
+        # Map every source name in a PPA, given as ~owner/name or ~owner/ubuntu/name, to its versions (newest
+        # first) from a single listing. api_root can be a worker's own connection from map_concurrent().
+        if api_root is None:
+            if self.api_root is None:
+                self._login()
+            api_root = self.api_root
+
+        parts = ppa_ref.split("/")
+        if len(parts) < 2:
+            raise Exception("PPA '%s' should be given as ~owner/name" % ppa_ref)
+        try:
+            project = api_root.projects[parts[0]]
+            if project is None:
+                raise LaunchPadLookupError("Project '" + parts[0] + "' not found")
+            ppa = self._get_ppa(project, parts[-1])
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
+
+        versions = {}
+        params = {'order_by_date': True}
+        if status != '*':
+            params['status'] = status
+        for source in ppa.getPublishedSources(**params):
+            source_versions = versions.setdefault(source.source_package_name, [])
+            if source.source_package_version not in source_versions:
+                source_versions.append(source.source_package_version)
+        return versions
+
     def _check_recency(self, time_frame, entry_time):
         max_delta = datetime.now(tz=timezone(
             timedelta(0))) - timedelta(minutes=time_frame)
@@ -326,8 +1030,11 @@ class LPHandler(object):
             return False
         return True
 
-    def get_build_record_info(self, project_name, ppa_name, source_name, source_version, build_id, time_frame):
+    def get_build_record_info(self, project_name, ppa_name, source_name, source_version, build_id, time_frame,
+                              sink=None):
+        # Records are appended to sink if one is given (eg a JsonLinesWriter) rather than to the result
         result = {'records': []}
+        records = result['records'] if sink is None else sink
         if self.api_root is None:
             self._login()
 
@@ -346,18 +1053,155 @@ class LPHandler(object):
         for br in brs:
             if build_id is not None:
                 if br.self_link.endswith(str(build_id)):
-                    result['records'].append(self._build_entry_result(br))
+                    records.append(self._build_entry_result(br))
                     return result
             else:
                 if source_version is not None:
                     if br.source_package_version == source_version:
                         if self._check_recency(time_frame, br.datecreated):
-                            result['records'].append(
+                            records.append(
                                 self._build_entry_result(br))
                 else:
                     if self._check_recency(time_frame, br.datecreated):
-                        result['records'].append(self._build_entry_result(br))
+                        records.append(self._build_entry_result(br))
+
+        return result
+
+    def get_failed_builds(self, project_name, ppa_name, source_name=None, source_version=None, build_ids=None,
+                          states=None, time_frame=1440):
+        # The build records in any of the given states (Failed to build by default), newest first. Records are
+        # listed per state, so a PPA with many successful builds isn't walked in full.
+        builds = []
+        if self.api_root is None:
+            self._login()
+
+        try:
+            project = self._get_project(project_name)
+            ppa = self._get_ppa(project, ppa_name)
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
 
+        if build_ids is not None:
+            records = [self.api_root.load("%s/+build/%s" % (ppa.self_link, build_id)) for build_id in build_ids]
+        else:
+            records = []
+            for state in states or ['Failed to build']:
+                params = {'build_state': state}
+                if source_name is not None:
+                    params['source_name'] = source_name
+                # Listings filtered by state are ordered by the time builds finished, not when they were created, so
+                # we only stop at the first build finished before the time frame. A build finished inside it can
+                # still have been created before it (eg a retry), and is skipped.
+                for br in ppa.getBuildRecords(**params):
+                    finished = br.datebuilt if br.datebuilt is not None else br.datecreated
+                    if not self._check_recency(time_frame, finished):
+                        break
+                    if not self._check_recency(time_frame, br.datecreated):
+                        continue
+                    if source_version is None or br.source_package_version == source_version:
+                        records.append(br)
+            records.sort(key=lambda br: br.datecreated, reverse=True)
+
+        for br in records:
+            builds.append({'build_id': int(br.self_link.rstrip("/").rsplit("/", 1)[1]), 'title': br.title,
+                           'arch_tag': br.arch_tag, 'buildstate': br.buildstate,
+                           'source_package_name': br.source_package_name,
+                           'source_package_version': br.source_package_version,
+                           'datecreated': None if br.datecreated is None else str(br.datecreated),
+                           'build_log_url': br.build_log_url, 'web_link': br.web_link})
+        return builds
+
+    def _project_binary(self, binary, fields):
+        # Only the requested attributes are copied. arch_tag and distro_series are parsed from the
+        # distro_arch_series_link (.../ubuntu/<series>/<arch>), so they never cost a request.
+        entry = {}
+        for field in fields:
+            if field in ['arch_tag', 'distro_series']:
+                parts = str(binary.distro_arch_series_link).rstrip("/").split("/")
+                entry[field] = parts[-1] if field == 'arch_tag' else parts[-2]
+            else:
+                entry[field] = binary.lp_get_parameter(field)
+        return entry
+
+    def get_published_binaries(self, project_name, ppa_name, binary_name=None, version=None, match="exact",
+                               distro_series=None, arch_tag=None, status=None, created_since=None, fields=None,
+                               limit=None, include_files=False, workers=4, sink=None):
+        # Binaries are filtered by Launchpad and appended to sink (or the result) page by page as they arrive, so
+        # only one page is held at a time. The listing is unordered, which Launchpad returns more quickly, unless
+        # created_since is set. With include_files the file urls and sizes of each page are fetched concurrently.
+        result = {'binaries': [], 'count': 0, 'summary': {'status': {}, 'arch': {}}}
+        binaries = result['binaries'] if sink is None else sink
+        fields = BINARY_FIELDS if fields is None else fields
+        if self.api_root is None:
+            self._login()
+
+        try:
+            project = self._get_project(project_name)
+            ppa = self._get_ppa(project, ppa_name)
+        except LaunchPadLookupError as e:
+            raise Exception(e.args)
+
+        params = {'ordered': False}
+        regex = None
+        if binary_name is not None:
+            params['binary_name'] = binary_name
+            params['exact_match'] = match.lower() == "exact"
+            if match.lower() in ["starts_with", "ends_with"]:
+                regex = self._source_regex(binary_name, match)
+        if version is not None:
+            params['version'] = version
+        if status is not None and status != '*':
+            params['status'] = status
+        if created_since is not None:
+            params['created_since_date'] = created_since
+            params['ordered'] = True
+        if distro_series is not None or arch_tag is not None:
+            if distro_series is None or arch_tag is None:
+                raise Exception("distro_series and arch_tag must be given together")
+            series = ppa.distribution.getSeries(name_or_version=distro_series)
+            params['distro_arch_series'] = series.getDistroArchSeries(archtag=arch_tag)
+        if limit is not None and limit < 1:
+            limit = None
+
+        def _files(api_root, link):
+            return api_root.load(link).binaryFileUrls(include_meta=True)
+
+        def _flush(page, executor):
+            if include_files:
+                links = [entry['self_link'] for entry in page]
+                for entry, files in zip(page, self.map_concurrent(_files, links, workers, executor)):
+                    entry['files'] = [{'url': unquote(f['url']), 'size': f['size'], 'sha256': f.get('sha256')}
+                                      for f in files]
+                    entry['size'] = sum(f['size'] for f in files)
+            for entry in page:
+                if 'self_link' not in fields:
+                    entry.pop('self_link', None)
+                binaries.append(entry)
+
+        # One executor serves every page, and its threads borrow roots from the handler's pool, so the file
+        # requests of the whole stream share at most workers threads and logins
+        executor = ThreadPoolExecutor(max_workers=max(1, workers)) if include_files else None
+        try:
+            matches = (binary for binary in ppa.getPublishedBinaries(**params)
+                       if regex is None or re.search(regex, binary.binary_package_name) is not None)
+            page = []
+            for binary in (matches if limit is None else islice(matches, limit)):
+                entry = self._project_binary(binary, fields)
+                if include_files:
+                    entry['self_link'] = binary.self_link
+                page.append(entry)
+                result['count'] += 1
+                summary_status = result['summary']['status']
+                summary_status[binary.status] = summary_status.get(binary.status, 0) + 1
+                arch = str(binary.distro_arch_series_link).rstrip("/").rsplit("/", 1)[-1]
+                result['summary']['arch'][arch] = result['summary']['arch'].get(arch, 0) + 1
+                if len(page) >= BINARY_PAGE:
+                    _flush(page, executor)
+                    page = []
+            _flush(page, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
         return result
 
 
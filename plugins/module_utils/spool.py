@@ -0,0 +1,196 @@
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.ledger import UploadLedger, LEDGER_UPLOADED
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+import fcntl
+import json
+import os
+import tempfile
+import time
+import uuid
+
+SPOOL_QUEUE = 'queue'
+SPOOL_ACTIVE = 'active'
+SPOOL_DONE = 'done'
+SPOOL_FAILED = 'failed'
+SPOOL_STATES = [SPOOL_QUEUE, SPOOL_ACTIVE, SPOOL_DONE, SPOOL_FAILED]
+
+
+class UploadSpool(object):
+
+    # Jobs are JSON files which move between the queue, active, done and failed directories with rename(), so
+    # each step is atomic and a job can only be claimed by one worker. Job names start with the priority and the
+    # enqueue time, so a sorted listing of the queue is the order in which jobs are worked.
+    def __init__(self, directory):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        for state in SPOOL_STATES + ['tmp']:
+            os.makedirs(os.path.join(self.directory, state), exist_ok=True)
+        self._lock_path = os.path.join(self.directory, "worker.lock")
+
+    def _path(self, state, name):
+        return os.path.join(self.directory, state, name)
+
+    def _write(self, state, name, job):
+        fd, tmp = tempfile.mkstemp(prefix=".job-", dir=os.path.join(self.directory, 'tmp'))
+        with os.fdopen(fd, "w") as ofile:
+            json.dump(job, ofile, indent=1, sort_keys=True)
+        os.replace(tmp, self._path(state, name))
+
+    def _read(self, state, name):
+        try:
+            with open(self._path(state, name), "r") as ifile:
+                return json.load(ifile)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _list(self, state):
+        return sorted(name for name in os.listdir(os.path.join(self.directory, state)) if name.endswith(".json"))
+
+    def _move(self, name, src, dst, job=None):
+        if job is not None:
+            self._write(src, name, job)
+        os.rename(self._path(src, name), self._path(dst, name))
+
+    def jobs(self, state):
+        jobs = []
+        for name in self._list(state):
+            job = self._read(state, name)
+            if job is not None:
+                job['state'] = state
+                jobs.append(job)
+        return jobs
+
+    def enqueue(self, source_changes, ppa, priority=500, existing=None, ledger=None):
+        source_changes = os.path.abspath(source_changes)
+        if os.path.exists(source_changes) is False:
+            raise Exception("Failed to find Changes file for processing")
+        for state in [SPOOL_QUEUE, SPOOL_ACTIVE]:
+            for job in self.jobs(state):
+                if job['source_changes'] == source_changes and job['ppa'] == ppa:
+                    return job, False
+
+        priority = min(max(int(priority), 0), 999)
+        job = {'id': "%03d-%019d-%s" % (priority, time.time_ns(), uuid.uuid4().hex[:8]),
+               'source_changes': source_changes, 'ppa': ppa, 'priority': priority, 'existing': existing,
+               'ledger': ledger, 'attempts': 0, 'not_before': 0, 'error': None, 'result': None,
+               'enqueued': datetime.now(tz=timezone.utc).isoformat()}
+        self._write(SPOOL_QUEUE, job['id'] + ".json", job)
+        job['state'] = SPOOL_QUEUE
+        return job, True
+
+    def status(self, state=None):
+        result = {'directory': self.directory, 'worker': self.worker_running(), 'counts': {}, 'jobs': []}
+        for spool_state in SPOOL_STATES:
+            jobs = self.jobs(spool_state)
+            result['counts'][spool_state] = len(jobs)
+            if state is None or state == spool_state:
+                result['jobs'].extend(jobs)
+        return result
+
+    def _claim(self):
+        now = time.time()
+        for name in self._list(SPOOL_QUEUE):
+            job = self._read(SPOOL_QUEUE, name)
+            if job is None or job['not_before'] > now:
+                continue
+            try:
+                os.rename(self._path(SPOOL_QUEUE, name), self._path(SPOOL_ACTIVE, name))
+            except OSError:
+                continue
+            return name, job
+        return None
+
+    def _process(self, name, job, dput, retries):
+        job['attempts'] += 1
+        job['started'] = datetime.now(tz=timezone.utc).isoformat()
+        self._write(SPOOL_ACTIVE, name, job)
+        try:
+            job['result'] = dput.upload(job['source_changes'], job['ppa'], job.get('existing'))
+            job['error'] = None
+            job['finished'] = datetime.now(tz=timezone.utc).isoformat()
+            if job.get('ledger') is not None:
+                changes = dput.read_changes(job['source_changes'])
+                ledger = UploadLedger(job['ledger'])
+                ledger.record(ledger.key(job['source_changes'], job['ppa']), LEDGER_UPLOADED, ppa=job['ppa'],
+                              source=changes.source, version=changes.version, changes=job['source_changes'])
+            self._move(name, SPOOL_ACTIVE, SPOOL_DONE, job)
+        except Exception as e:
+            job['error'] = str(e)
+            if job['attempts'] > retries:
+                job['finished'] = datetime.now(tz=timezone.utc).isoformat()
+                self._move(name, SPOOL_ACTIVE, SPOOL_FAILED, job)
+            else:
+                job['not_before'] = time.time() + min(600, 30 * 2 ** (job['attempts'] - 1))
+                self._move(name, SPOOL_ACTIVE, SPOOL_QUEUE, job)
+
+    def _acquire_worker_lock(self):
+        lock = open(self._lock_path, "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except (IOError, OSError):
+            lock.close()
+            return None
+        return lock
+
+    def worker_running(self):
+        lock = self._acquire_worker_lock()
+        if lock is None:
+            return True
+        lock.close()
+        return False
+
+    def run(self, dput, concurrency=2, retries=3, poll=5):
+        # Only one worker drains a spool. Anything left in active belongs to a worker which died, so it
+        # goes back on the queue. The worker exits once the queue is empty, checking it again after giving
+        # up the lock in case a job was queued while it was finishing.
+        while True:
+            lock = self._acquire_worker_lock()
+            if lock is None:
+                return False
+            try:
+                for name in self._list(SPOOL_ACTIVE):
+                    self._move(name, SPOOL_ACTIVE, SPOOL_QUEUE)
+                self._drain(dput, concurrency, retries, poll)
+            finally:
+                lock.close()
+            if len(self._list(SPOOL_QUEUE)) == 0:
+                return True
+
+    def _drain(self, dput, concurrency, retries, poll):
+        running = set()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            while True:
+                while len(running) < concurrency:
+                    claimed = self._claim()
+                    if claimed is None:
+                        break
+                    running.add(executor.submit(self._process, claimed[0], claimed[1], dput, retries))
+                if len(running) == 0:
+                    queued = self.jobs(SPOOL_QUEUE)
+                    if len(queued) == 0:
+                        return
+                    delay = min(job['not_before'] for job in queued) - time.time()
+                    time.sleep(min(max(delay, 0.1), poll))
+                    continue
+                done, running = wait(running, timeout=poll, return_when=FIRST_COMPLETED)
+
+    def start_worker(self, dput, concurrency=2, retries=3):
+        # Double fork so the worker is re-parented to init and outlives the module, with its standard streams
+        # detached so Ansible isn't left waiting on the module's output.
+        if self.worker_running():
+            return False
+        pid = os.fork()
+        if pid > 0:
+            os.waitpid(pid, 0)
+            return True
+        try:
+            os.setsid()
+            if os.fork() > 0:
+                os._exit(0)
+            os.chdir("/")
+            devnull = os.open(os.devnull, os.O_RDWR)
+            for fd in [0, 1, 2]:
+                os.dup2(devnull, fd)
+            self.run(dput, concurrency, retries)
+        finally:
+            os._exit(0)
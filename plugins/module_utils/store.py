@@ -0,0 +1,68 @@
+from __future__ import (absolute_import, division, print_function)
+from contextlib import contextmanager
+from datetime import date, datetime
+import fcntl
+import json
+import os
+import tempfile
+
+
+def json_default(value):
+    # launchpadlib returns dates as datetime objects, store them (and anything else json can't) as strings
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+class JsonStore(object):
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self._lock_path = self.path + ".lock"
+
+    @contextmanager
+    def _lock(self, mode):
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as ifile:
+            try:
+                return json.load(ifile)
+            except ValueError:
+                raise Exception("Failed to parse JSON store: %s" % self.path)
+
+    def _write(self, data):
+        # Write to a temporary file in the same directory and rename it over the original, so readers
+        # only ever see a complete document, even if we are killed half way through.
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(self.path))
+        try:
+            with os.fdopen(fd, "w") as ofile:
+                json.dump(data, ofile, indent=1, sort_keys=True, default=json_default)
+                ofile.flush()
+                os.fsync(ofile.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def load(self):
+        with self._lock(fcntl.LOCK_SH):
+            return self._read()
+
+    @contextmanager
+    def update(self):
+        with self._lock(fcntl.LOCK_EX):
+            data = self._read()
+            yield data
+            self._write(data)
@@ -0,0 +1,266 @@
+#!/usr/bin/python
+
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler, BINARY_FIELDS, SOURCE_STATUSES
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.jsonl import run_info
+from ansible.module_utils.basic import AnsibleModule
+import os
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: binary_info
+
+short_description: Get info about the binary packages published in a PPA
+version_added: "1.1.0"
+
+description: List the binary package publications of a PPA, ie which .debs exist for each architecture and their
+             status. The binary_name, version, distro_series/arch_tag, status and created_since filters are applied
+             by Launchpad, so only matching publications are sent. The listing is read page by page, and only the
+             fields asked for are kept for each binary, so results stay small. With dest set the binaries are
+             streamed to a JSON Lines file instead of being returned. A count and a per status and per architecture
+             summary are always returned.
+
+options:
+    project:
+        description: The name of the project owning the PPA
+        required: true
+        type: str
+
+    ppa:
+        description: The name of the PPA
+        required: true
+        type: str
+
+    binary_name:
+        description: The name of the binary package
+        required: false
+        default: None
+        type: str
+
+    match:
+        description: How binary_name is matched, one of exact, contains, starts_with or ends_with
+        required: false
+        default: exact
+        choices: [ exact, contains, starts_with, ends_with ]
+        type: str
+
+    version:
+        description: The version of the binary package
+        required: false
+        default: None
+        type: str
+
+    distro_series:
+        description: Only list the binaries built for this series, eg jammy. Requires arch_tag
+        required: false
+        default: None
+        type: str
+
+    arch_tag:
+        description: Only list the binaries built for this architecture, eg amd64. Requires distro_series
+        required: false
+        default: None
+        type: str
+
+    status:
+        description: The publication status of the binaries, one of Pending, Published, Superseded, Deleted,
+                     Obsolete or '*' for all of them
+        required: false
+        default: Published
+        type: str
+
+    created_since:
+        description: Only list the binaries created since this date, in ISO 8601 format eg 2022-10-01 or
+                     2022-10-01T12:00:00+00:00
+        required: false
+        default: None
+        type: str
+
+    fields:
+        description: The attributes returned for each binary. arch_tag and distro_series are taken from the
+                     distro_arch_series_link, any other name must be an attribute of a binary package publication
+        required: false
+        default: [ binary_package_name, binary_package_version, arch_tag, distro_series, status, component_name,
+                   pocket, date_created, date_published ]
+        type: list
+        elements: str
+
+    limit:
+        description: The maximum number of binaries to list. The listing stops once this many have been read
+        required: false
+        default: None
+        type: int
+
+    include_files:
+        description: Add the files of each binary, with their urls, sizes and sha256, and the total size. This is
+                     one more request per binary, made concurrently
+        required: false
+        default: false
+        type: bool
+
+    workers:
+        description: The number of concurrent requests made for include_files
+        required: false
+        default: 4
+        type: int
+
+    dest:
+        description: Stream the binaries to a JSON Lines file at this path on the target, one JSON object per line,
+                     instead of returning them. The file is gzip compressed if the path ends in .gz.
+        required: false
+        default: None
+        type: path
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+# Which linux-image packages are published for jammy on arm64?
+- name: Get the arm64 kernel images
+  binary_info:
+    project: ~tuxinvader
+    ppa: lts-mainline
+    binary_name: linux-image
+    match: starts_with
+    distro_series: jammy
+    arch_tag: arm64
+  register: images
+
+# The sizes of the debs created since the start of October
+- name: Get the sizes of recent binaries
+  binary_info:
+    project: ~tuxinvader
+    ppa: lts-mainline
+    created_since: "2022-10-01"
+    fields:
+      - binary_package_name
+      - binary_package_version
+      - arch_tag
+    include_files: true
+    workers: 8
+
+# Save every binary ever published in the PPA
+- name: Save the binary listing
+  binary_info:
+    project: ~tuxinvader
+    ppa: lts-mainline
+    status: '*'
+    dest: /var/tmp/lts-mainline-binaries.jsonl.gz
+'''
+
+RETURN = r'''
+# Returns the matching binaries with the requested fields
+binaries:
+    description: The matching binary publications, empty if dest is set
+    type: list
+    returned: always
+    sample: [
+        {
+            "arch_tag": "arm64",
+            "binary_package_name": "linux-image-unsigned-5.19.14-051914-generic",
+            "binary_package_version": "5.19.14-051914.202210081234",
+            "component_name": "main",
+            "date_created": "2022-10-08T13:02:11.123456+00:00",
+            "date_published": "2022-10-08T14:10:42.654321+00:00",
+            "distro_series": "jammy",
+            "pocket": "Release",
+            "status": "Published"
+        }
+    ]
+count:
+    description: The number of binaries listed
+    type: int
+    returned: always
+    sample: 1
+summary:
+    description: The number of binaries listed in each status and for each architecture
+    type: dict
+    returned: always
+    sample: { "status": { "Published": 1 }, "arch": { "arm64": 1 } }
+dest:
+    description: The path of the JSON Lines file, the number of binaries written to it and whether it is compressed
+    type: dict
+    returned: when dest is set
+    sample: { "dest": "/var/tmp/lts-mainline-binaries.jsonl.gz", "count": 18230, "compressed": true }
+'''
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        project=dict(type='str', required=True),
+        ppa=dict(type='str', required=True),
+        binary_name=dict(type='str', required=False, default=None),
+        match=dict(type='str', required=False, default='exact',
+                   choices=['exact', 'contains', 'starts_with', 'ends_with']),
+        version=dict(type='str', required=False, default=None),
+        distro_series=dict(type='str', required=False, default=None),
+        arch_tag=dict(type='str', required=False, default=None),
+        status=dict(type='str', required=False, default='Published'),
+        created_since=dict(type='str', required=False, default=None),
+        fields=dict(type='list', elements='str', required=False, default=BINARY_FIELDS),
+        limit=dict(type='int', required=False, default=None),
+        include_files=dict(type='bool', required=False, default=False),
+        workers=dict(type='int', required=False, default=4),
+        dest=dict(type='path', required=False, default=None),
+    )
+
+    # seed the result dict in the object
+    # we primarily care about changed and state
+    # changed is if this module effectively modified the target
+    # state will include any data that you want your module to pass back
+    # for consumption, for example, in a subsequent task
+    result = dict(
+        changed=False,
+        binaries=[],
+        count=0,
+    )
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_together=[
+            ('distro_series', 'arch_tag'),
+        ],
+        supports_check_mode=True
+    )
+
+    # if the user is working with this module in only check mode we do not
+    # want to make any changes to the environment, just return the current
+    # state with no modifications
+    if module.check_mode:
+        module.exit_json(**result)
+
+    status = module.params['status'].capitalize()
+    if status not in ['*'] + SOURCE_STATUSES:
+        module.fail_json(msg="status should be one of Pending, Published, Superseded, Deleted, Obsolete or '*'",
+                         **result)
+
+    try:
+        auth = False
+        if os.environ.get('LP_ACCESS_TOKEN') is not None:
+            auth = True
+        launchpad = LPHandler(auth)
+        lp_result = run_info(module.params['dest'], lambda sink: launchpad.get_published_binaries(
+            module.params['project'], module.params['ppa'], module.params['binary_name'], module.params['version'],
+            module.params['match'], module.params['distro_series'], module.params['arch_tag'], status,
+            module.params['created_since'], module.params['fields'], module.params['limit'],
+            module.params['include_files'], module.params['workers'], sink))
+        result = {**result, **lp_result}
+    except Exception as e:
+        module.fail_json(msg=e.args, **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/python
+
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.buildlog import BuildLogScanner, DEFAULT_PATTERNS, LOG_CACHE
+from ansible.module_utils.basic import AnsibleModule
+import os
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: build_log_scan
+
+short_description: Scan the logs of failed builds in a PPA for error lines
+version_added: "1.1.0"
+
+description: Find the failed builds in a PPA, fetch their build logs and return only the lines matching a set of
+             regular expressions, with a few lines of context either side. The logs are fetched concurrently and
+             decompressed and scanned as they stream, so only the context lines and matches of each log are held in
+             memory, however large it is. Each log is saved to a cache directory as it's read, keyed by build id, so
+             scanning it again (eg with different patterns) doesn't download it again.
+             Builds are selected by state (Failed to build by default) within the time_frame, optionally filtered
+             by source_name and source_version, or given directly as build_ids. Logs are fetched anonymously, so
+             the logs of private PPAs can't be scanned.
+
+options:
+    project:
+        description: The name of the project owning the PPA
+        required: true
+        type: str
+
+    ppa:
+        description: The name of the PPA
+        required: true
+        type: str
+
+    source_name:
+        description: Only scan the builds of this source package
+        required: false
+        default: None
+        type: str
+
+    source_version:
+        description: Only scan the builds of this version of the source package
+        required: false
+        default: None
+        type: str
+
+    build_ids:
+        description: Scan the logs of these builds, whatever their state, rather than searching for failed builds
+        required: false
+        default: None
+        type: list
+        elements: int
+
+    states:
+        description: The build states to scan, eg "Failed to build", "Dependency wait", "Chroot problem" or
+                     "Failed to upload"
+        required: false
+        default: [ 'Failed to build' ]
+        type: list
+        elements: str
+
+    time_frame:
+        description: The time frame for builds in minutes. The default is 24 hours (1440 minutes).
+        required: false
+        default: 1440
+        type: int
+
+    patterns:
+        description: The regular expressions to search the logs for. The default matches compiler and make errors,
+                     dpkg errors, unmet build dependencies and full disks
+        required: false
+        type: list
+        elements: str
+
+    ignore_case:
+        description: Match the patterns without regard to case
+        required: false
+        default: false
+        type: bool
+
+    context:
+        description: The number of lines to return before and after each matching line
+        required: false
+        default: 3
+        type: int
+
+    max_matches:
+        description: The maximum number of matches to return for each log. Further matches are counted but not
+                     returned
+        required: false
+        default: 20
+        type: int
+
+    cache_dir:
+        description: The directory logs are cached in
+        required: false
+        default: ~/.cache/tuxinvader.launchpad/buildlogs
+        type: path
+
+    cache:
+        description: Cache the logs. Set to false to always download them and keep nothing on disk
+        required: false
+        default: true
+        type: bool
+
+    timeout:
+        description: The timeout in seconds for fetching each log
+        required: false
+        default: 60
+        type: int
+
+    workers:
+        description: The number of logs to fetch concurrently
+        required: false
+        default: 4
+        type: int
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+# Why did the linux-generic-5.19 builds fail today?
+- name: Scan the failed builds of linux-generic-5.19
+  build_log_scan:
+    project: ~tuxinvader
+    ppa: lts-mainline
+    source_name: linux-generic-5.19
+  register: scan
+
+- name: Show the errors
+  debug:
+    msg: "{{ item.title }}: {{ item.matches | map(attribute='line') | list }}"
+  loop: "{{ scan.builds }}"
+
+# Look for a specific problem in the last week's builds
+- name: Scan for missing firmware
+  build_log_scan:
+    project: ~tuxinvader
+    ppa: lts-mainline
+    time_frame: 10080
+    states:
+      - Failed to build
+      - Failed to upload
+    patterns:
+      - 'firmware: failed to load'
+      - 'W: Possible missing firmware'
+    ignore_case: true
+    context: 0
+'''
+
+RETURN = r'''
+# Returns the matching lines of each build log
+builds:
+    description: The scanned builds, newest first, each with its matches. error is set if the log couldn't be read
+    type: list
+    returned: always
+    sample: [
+        {
+            "arch_tag": "arm64",
+            "build_id": 24511076,
+            "build_log_url": "https://launchpad.net/~tuxinvader/+archive/ubuntu/lts-mainline/+build/24511076/+files/\
+                              buildlog_ubuntu-focal-arm64.linux-generic-5.19_5.19.12_BUILDING.txt.gz",
+            "buildstate": "Failed to build",
+            "cached": false,
+            "datecreated": "2022-09-30 23:48:11.715660+00:00",
+            "error": null,
+            "lines": 48213,
+            "match_count": 1,
+            "matches": [
+                {
+                    "after": [
+                        "   43 |         return 0;",
+                        "      |         ^",
+                        "make[3]: *** [scripts/Makefile.build:249: drivers/foo.o] Error 1"
+                    ],
+                    "before": [
+                        "  CC      drivers/foo.o",
+                        "drivers/foo.c: In function 'foo_probe':",
+                        "drivers/foo.c:42:9: warning: unused variable 'bar'"
+                    ],
+                    "line": "drivers/foo.c:43:16: error: 'baz' undeclared (first use in this function)",
+                    "line_number": 48102,
+                    "pattern": "\\berror:"
+                }
+            ],
+            "source_package_name": "linux-generic-5.19",
+            "source_package_version": "5.19.12",
+            "title": "arm64 build of linux-generic-5.19 5.19.12 in ubuntu focal RELEASE",
+            "truncated": false,
+            "web_link": "https://launchpad.net/~tuxinvader/+archive/ubuntu/lts-mainline/+build/24511076"
+        }
+    ]
+scanned:
+    description: The number of logs scanned
+    type: int
+    returned: always
+    sample: 1
+cached:
+    description: The number of logs read from the cache rather than downloaded
+    type: int
+    returned: always
+    sample: 0
+errors:
+    description: The number of builds whose log couldn't be read
+    type: int
+    returned: always
+    sample: 0
+'''
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        project=dict(type='str', required=True),
+        ppa=dict(type='str', required=True),
+        source_name=dict(type='str', required=False, default=None),
+        source_version=dict(type='str', required=False, default=None),
+        build_ids=dict(type='list', elements='int', required=False, default=None),
+        states=dict(type='list', elements='str', required=False, default=['Failed to build']),
+        time_frame=dict(type='int', required=False, default=1440),
+        patterns=dict(type='list', elements='str', required=False, default=DEFAULT_PATTERNS),
+        ignore_case=dict(type='bool', required=False, default=False),
+        context=dict(type='int', required=False, default=3),
+        max_matches=dict(type='int', required=False, default=20),
+        cache_dir=dict(type='path', required=False, default=LOG_CACHE),
+        cache=dict(type='bool', required=False, default=True),
+        timeout=dict(type='int', required=False, default=60),
+        workers=dict(type='int', required=False, default=4),
+    )
+
+    # seed the result dict in the object
+    # we primarily care about changed and state
+    # changed is if this module effectively modified the target
+    # state will include any data that you want your module to pass back
+    # for consumption, for example, in a subsequent task
+    result = dict(
+        changed=False,
+        builds=[],
+        scanned=0,
+        cached=0,
+        errors=0,
+    )
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=[
+            ('build_ids', 'source_name'),
+            ('build_ids', 'source_version'),
+        ],
+        supports_check_mode=True
+    )
+
+    # if the user is working with this module in only check mode we do not
+    # want to make any changes to the environment, just return the current
+    # state with no modifications
+    if module.check_mode:
+        module.exit_json(**result)
+
+    try:
+        auth = False
+        if os.environ.get('LP_ACCESS_TOKEN') is not None:
+            auth = True
+        launchpad = LPHandler(auth)
+        builds = launchpad.get_failed_builds(module.params['project'], module.params['ppa'],
+                                             module.params['source_name'], module.params['source_version'],
+                                             module.params['build_ids'], module.params['states'],
+                                             module.params['time_frame'])
+        scanner = BuildLogScanner(module.params['cache_dir'] if module.params['cache'] else None,
+                                  module.params['timeout'])
+        result['builds'] = scanner.scan_all(builds, module.params['patterns'], module.params['ignore_case'],
+                                            module.params['context'], module.params['max_matches'],
+                                            module.params['workers'])
+        result['scanned'] = len(result['builds'])
+        result['cached'] = len([build for build in result['builds'] if build['cached']])
+        result['errors'] = len([build for build in result['builds'] if build['error'] is not None])
+    except Exception as e:
+        module.fail_json(msg=e.args, **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 
 from __future__ import (absolute_import, division, print_function)
 from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.jsonl import run_info
 from ansible.module_utils.basic import AnsibleModule
 import os
 
@@ -59,6 +60,14 @@ options:
         default: None
         type: int
 
+    dest:
+        description: Stream the records to a JSON Lines file at this path on the target, one JSON object per line, instead
+                     of returning them. The file is gzip compressed if the path ends in .gz. Only the path and the number
+                     of records written are returned, so memory use stays flat however many there are.
+        required: false
+        default: None
+        type: path
+
 author:
     - Mark Boddington (@TuxInvader)
 '''
@@ -79,12 +88,20 @@ EXAMPLES = r'''
         project: ~tuxinvader
         ppa: my-random-ppa
         build_id: 1234567
+
+# Save every build record of the last 30 days to a compressed file
+- name: Save a month of build records
+      build_record_info:
+        project: ~tuxinvader
+        ppa: my-random-ppa
+        time_frame: 43200
+        dest: /var/tmp/my-random-ppa-builds.jsonl.gz
 '''
 
 RETURN = r'''
 # Returns a list containing matching build records
 records:
-    description: A list of matching build records
+    description: A list of matching build records, empty if dest is set
     type: list
     returned: always
     sample: [
@@ -115,6 +132,11 @@ records:
             "web_link": "https://launchpad.net/~tuxinvader/+archive/ubuntu/my-random-ppa/+build/24511076"
         }
     ]
+dest:
+    description: The path of the JSON Lines file, the number of records written to it and whether it is compressed
+    type: dict
+    returned: when dest is set
+    sample: { "dest": "/var/tmp/my-random-ppa-builds.jsonl.gz", "count": 3120, "compressed": true }
 '''
 
 
@@ -126,7 +148,8 @@ def run_module():
         source_name=dict(type='str', required=False, default=None),
         source_version=dict(type='str', required=False, default=None),
         build_id=dict(type='int', required=False, default=None),
-        time_frame=dict(type='int', Required=False, default=1440)
+        time_frame=dict(type='int', Required=False, default=1440),
+        dest=dict(type='path', required=False, default=None)
     )
 
     # seed the result dict in the object
@@ -159,9 +182,9 @@ def run_module():
         if os.environ.get('LP_ACCESS_TOKEN') is not None:
             auth = True
         launchpad = LPHandler(auth)
-        lp_result = launchpad.get_build_record_info(module.params['project'], module.params['ppa'],
-                                                    module.params['source_name'], module.params['source_version'],
-                                                    module.params['build_id'], module.params['time_frame'])
+        lp_result = run_info(module.params['dest'], lambda sink: launchpad.get_build_record_info(
+            module.params['project'], module.params['ppa'], module.params['source_name'],
+            module.params['source_version'], module.params['build_id'], module.params['time_frame'], sink))
         result = {**result, **lp_result}
     except Exception as e:
         module.fail_json(msg=e.args, **result)
@@ -1,7 +1,7 @@
 #!/usr/bin/python
 
 from __future__ import (absolute_import, division, print_function)
-from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler, RETURN_MODES
 from ansible.module_utils.basic import AnsibleModule
 __metaclass__ = type
 
@@ -22,9 +22,25 @@ options:
 
     name:
         description: The name of the PPA
-        required: true
+        required: false
         type: str
 
+    ppas:
+        description: A list of PPAs to reconcile in one task, each a dict with the keys name, displayname, description
+                     and ensure, which have the same meaning (and defaults) as the options above. The desired PPAs are
+                     compared with a single listing of the project's PPAs, and the creates, updates and deletes are
+                     applied concurrently. PPAs of the project which aren't in the list are left alone.
+        required: false
+        default: None
+        type: list
+        elements: dict
+
+    workers:
+        description: The number of PPAs to update concurrently when ppas is set
+        required: false
+        default: 4
+        type: int
+
     ensure:
         description: Ensure the PPA is present or absent
         required: false
@@ -43,9 +59,21 @@ options:
         default: "A PPA for <name>"
         type: str
 
+    return_mode:
+        description: What to return about the PPA's sources. none returns no sources, count returns the number of
+                     matching sources in source_count without listing them, summary returns the number of sources in
+                     each status and series in summary without listing them, and full returns every matching source
+                     in sources. This applies to every PPA when ppas is set. Listing sources can be slow on a large
+                     PPA, so the default is none.
+        aliases: [ return ]
+        required: false
+        default: none
+        choices: [ none, count, summary, full ]
+        type: str
+
     source_filter:
-        description: By default we return a list of source_packages which are published, you can choose to remove
-                     the filter by setting this to '*' or to use a different source status. The options for
+        description: When return is full we return a list of source_packages which are published, you can choose
+                     to remove the filter by setting this to '*' or to use a different source status. The options for
                      source_status are Pending, Published, Superseded, Deleted or Obsolete
         required: false
         default: Published
@@ -65,6 +93,20 @@ EXAMPLES = r'''
   environment:
     LP_ACCESS_TOKEN: kjaslkdjalksd
     LP_ACCESS_SECRET: alskjajsdlk
+
+# Reconcile a set of PPAs in a single task
+- name: Ensure the mainline PPAs exist
+  ppa:
+    project: ~tuxinvader
+    ppas:
+      - name: jammy-mainline
+      - name: focal-mainline
+        displayname: Focal Mainline
+      - name: bionic-mainline
+        ensure: absent
+  environment:
+    LP_ACCESS_TOKEN: kjaslkdjalksd
+    LP_ACCESS_SECRET: alskjajsdlk
 '''
 
 RETURN = r'''
@@ -81,7 +123,7 @@ details:
         "status": "Active", "suppress_subscription_notifications": false, "web_link": "https://launchpad.net/~project/+archive/ubuntu/foo" }
 
 sources:
-  description: List of source_packages published in this PPA
+  description: List of source_packages published in this PPA, empty unless return is full
   type: list
   returned: always
   sample: [ { "component_name": "main", "date_created": "2022-09-27T10:02:08.870234+00:00", "date_made_pending": null,
@@ -93,17 +135,60 @@ sources:
                 "self_link": "https://api.launchpad.net/devel/~project/+archive/ubuntu/foo/+sourcepub/nnnnnnn",
                 "source_package_name": "linux-5.19.11", "source_package_version": "5.19.11-051911.202209270958", "status": "Published"
             } ]
+
+source_count:
+  description: The number of matching sources
+  type: int
+  returned: when return is count
+  sample: 112
+
+summary:
+  description: The total number of matching sources, and the number in each status and in each series (sources
+               in series which are no longer supported are counted under other)
+  type: dict
+  returned: when return is summary
+  sample: { "total": 112, "status": { "Published": 12, "Superseded": 100 }, "series": { "jammy": 60, "focal": 50, "other": 2 } }
+
+ppas:
+  description: The result for each PPA in ppas, keyed by PPA name, with the action taken (create, update, delete or null),
+               whether it changed, its details and its sources (or source_count or summary, depending on return)
+  type: dict
+  returned: when ppas is set
+  sample: { "jammy-mainline": { "action": null, "changed": false, "details": {}, "sources": [] },
+            "focal-mainline": { "action": "update", "changed": true, "details": {}, "sources": [] },
+            "bionic-mainline": { "action": "delete", "changed": true, "details": {}, "sources": [] } }
+
+created:
+  description: The number of PPAs created
+  type: int
+  returned: when ppas is set
+  sample: 0
+
+updated:
+  description: The number of PPAs updated
+  type: int
+  returned: when ppas is set
+  sample: 1
+
+deleted:
+  description: The number of PPAs deleted
+  type: int
+  returned: when ppas is set
+  sample: 1
 '''
 
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
-        name=dict(type='str', required=True),
+        name=dict(type='str', required=False, default=None),
+        ppas=dict(type='list', elements='dict', required=False, default=None),
+        workers=dict(type='int', required=False, default=4),
         project=dict(type='str', required=True),
         ensure=dict(type='str', required=False, default="present"),
         displayname=dict(type='str', required=False, default=None),
         description=dict(type='str', required=False, default=None),
+        return_mode=dict(type='str', required=False, default='none', choices=RETURN_MODES, aliases=['return']),
         source_filter=dict(type='str', required=False, default='Published')
     )
 
@@ -124,6 +209,8 @@ def run_module():
     # supports check mode
     module = AnsibleModule(
         argument_spec=module_args,
+        required_one_of=[['name', 'ppas']],
+        mutually_exclusive=[['name', 'ppas'], ['ppas', 'displayname'], ['ppas', 'description']],
         supports_check_mode=True
     )
 
@@ -133,6 +220,27 @@ def run_module():
     if module.check_mode:
         module.exit_json(**result)
 
+    if module.params['ppas'] is not None:
+        ppas = []
+        for spec in module.params['ppas']:
+            if spec.get('name') is None:
+                module.fail_json(msg="Each entry of ppas needs a name", **result)
+            spec = dict(spec)
+            spec.setdefault('ensure', module.params['ensure'])
+            if spec.get('displayname') is None:
+                spec['displayname'] = spec['name']
+            if spec.get('description') is None:
+                spec['description'] = "A PPA Hosting packages related to " + spec['name']
+            ppas.append(spec)
+        try:
+            launchpad = LPHandler(True)
+            lp_result = launchpad.reconcile_ppas(module.params['project'], ppas, module.params['source_filter'],
+                                                 module.params['return_mode'], module.params['workers'])
+            result = {**result, **lp_result}
+        except Exception as e:
+            module.fail_json(msg=e.args, **result)
+        module.exit_json(**result)
+
     if module.params['displayname'] is None:
         module.params['displayname'] = module.params['name']
 
@@ -145,7 +253,8 @@ def run_module():
         lp_result = launchpad.upsert_ppa(module.params['project'], module.params['name'],
                                          module.params['ensure'], module.params['source_filter'],
                                          displayname=module.params['displayname'],
-                                         description=module.params['description'])
+                                         description=module.params['description'],
+                                         return_mode=module.params['return_mode'])
         result = {**result, **lp_result}
     except Exception as e:
         module.fail_json(msg=e.args, **result)
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.feed import ChangeFeed, FEED_STATE
+from ansible.module_utils.basic import AnsibleModule
+import os
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: ppa_changes
+
+short_description: Return the publications added to or updated in a PPA since the last call
+version_added: "1.1.0"
+
+description: An incremental change feed for a PPA. The module keeps a high-water mark for each PPA in a local state
+             file (the newest date_created it has seen) along with the etags of the recent publications. Each call
+             lists only the publications created since the high-water mark, less a revalidation window, and returns
+             the new ones in added and the ones whose etag changed (eg Pending to Published) in updated. A steady
+             state poll is a single small listing rather than a listing of the whole PPA. Status changes to
+             publications older than the revalidation window are not reported.
+             The module reports changed when there is something in added or updated.
+
+options:
+    project:
+        description: The name of the project owning the PPA
+        required: true
+        type: str
+
+    ppa:
+        description: The name of the PPA
+        required: true
+        type: str
+
+    state_file:
+        description: The path of the state file. One file can hold the state of many PPAs
+        required: false
+        default: ~/.cache/tuxinvader.launchpad/changes.json
+        type: path
+
+    revalidate:
+        description: The revalidation window in seconds. Publications created this long before the high-water mark
+                     are listed again, so their status changes are picked up
+        required: false
+        default: 3600
+        type: int
+
+    baseline:
+        description: On the first call for a PPA, only record the high-water mark and return nothing. Set to false
+                     to return every publication in the PPA as added on the first call
+        required: false
+        default: true
+        type: bool
+
+    reset:
+        description: Forget the state of the PPA before polling, so this call is treated as the first
+        required: false
+        default: false
+        type: bool
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+# Report new and updated publications in ~tuxinvader/lts-mainline
+- name: Poll lts-mainline for changes
+  ppa_changes:
+    project: ~tuxinvader
+    ppa: lts-mainline
+  register: lts_changes
+
+- name: Show new uploads
+  debug:
+    msg: "{{ item.display_name }} is {{ item.status }}"
+  loop: "{{ lts_changes.added + lts_changes.updated }}"
+'''
+
+RETURN = r'''
+# Returns the publications which changed since the last call
+added:
+    description: Publications which weren't seen by an earlier call
+    type: list
+    returned: always
+    sample: [
+        {
+            "date_created": "2022-10-09T21:33:54.567890+00:00",
+            "display_name": "linux-generic-5.15 5.15.72 in focal",
+            "http_etag": "\"dbbf1a487b52f75b2609734117fa4c4fb202240f-d03b23f6284e5b10e67438443fe111b7f5e65ab3\"",
+            "self_link": "https://api.launchpad.net/devel/~tuxinvader/+archive/ubuntu/lts-mainline/+sourcepub/13973912",
+            "source_package_name": "linux-generic-5.15",
+            "source_package_version": "5.15.72",
+            "status": "Pending"
+        }
+    ]
+updated:
+    description: Publications seen by an earlier call which have changed since (eg their status)
+    type: list
+    returned: always
+    sample: []
+first_run:
+    description: Whether there was no state for the PPA before this call
+    type: bool
+    returned: always
+    sample: false
+since:
+    description: The created_since_date used for the listing, null if the whole PPA was listed
+    type: str
+    returned: always
+    sample: "2022-10-09T20:33:54.567890+00:00"
+high_water:
+    description: The newest date_created seen, saved for the next call
+    type: str
+    returned: always
+    sample: "2022-10-09T21:33:54.567890+00:00"
+'''
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        project=dict(type='str', required=True),
+        ppa=dict(type='str', required=True),
+        state_file=dict(type='path', required=False, default=FEED_STATE),
+        revalidate=dict(type='int', required=False, default=3600),
+        baseline=dict(type='bool', required=False, default=True),
+        reset=dict(type='bool', required=False, default=False),
+    )
+
+    # seed the result dict in the object
+    # we primarily care about changed and state
+    # changed is if this module effectively modified the target
+    # state will include any data that you want your module to pass back
+    # for consumption, for example, in a subsequent task
+    result = dict(
+        changed=False,
+        added=[],
+        updated=[],
+    )
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    # if the user is working with this module in only check mode we do not
+    # want to make any changes to the environment, just return the current
+    # state with no modifications
+    if module.check_mode:
+        module.exit_json(**result)
+
+    try:
+        auth = False
+        if os.environ.get('LP_ACCESS_TOKEN') is not None:
+            auth = True
+        launchpad = LPHandler(auth)
+        feed = ChangeFeed(module.params['state_file'])
+        if module.params['reset']:
+            feed.reset(module.params['project'], module.params['ppa'])
+        feed_result = feed.poll(launchpad, module.params['project'], module.params['ppa'],
+                                module.params['revalidate'], module.params['baseline'])
+        result = {**result, **feed_result}
+        result['changed'] = len(result['added']) + len(result['updated']) > 0
+    except Exception as e:
+        module.fail_json(msg=e.args, **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
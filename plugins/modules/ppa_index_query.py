@@ -0,0 +1,159 @@
+#!/usr/bin/python
+
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.index import PPAIndex, INDEX_DB
+from ansible.module_utils.basic import AnsibleModule
+import os
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: ppa_index_query
+
+short_description: Query the local SQLite index of PPA sources and builds
+version_added: "1.1.0"
+
+description: Run a SQL query against the index built by the ppa_index_sync module. No requests are made to
+             Launchpad. The database is opened read only, so the query can't change the index, and it can run while
+             a sync is in progress. The sources table has the columns link, ppa, name, version, series, component,
+             pocket, status, date_created, date_published, date_superseded and date_removed. The builds table has
+             the columns link, ppa, source_name, source_version, series, arch_tag, buildstate, datecreated,
+             date_started, datebuilt, duration, build_log_url and title. The ppas table has the high-water marks
+             and the time of the last sync of each PPA. Dates are UTC ISO 8601 strings, so they compare as text.
+
+options:
+    database:
+        description: The path of the SQLite database
+        required: false
+        default: ~/.cache/tuxinvader.launchpad/index.db
+        type: path
+
+    sql:
+        description: The SQL query to run. Use ? placeholders for the params
+        required: true
+        type: str
+
+    params:
+        description: The values of the ? placeholders in the query
+        required: false
+        default: []
+        type: list
+        elements: raw
+
+    limit:
+        description: The maximum number of rows to return, 0 for no limit
+        required: false
+        default: 1000
+        type: int
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+# Which PPAs have version 5.19.14 of linux-generic-5.19?
+- name: Find 5.19.14
+  ppa_index_query:
+    sql: "SELECT ppa, series, status FROM sources WHERE name = ? AND version = ?"
+    params:
+      - linux-generic-5.19
+      - 5.19.14
+  register: found
+
+# Count the failed builds of each series in the last week
+- name: Failed builds
+  ppa_index_query:
+    sql: "SELECT series, count(*) AS failures FROM builds WHERE buildstate = 'Failed to build'
+          AND datecreated > ? GROUP BY series"
+    params:
+      - "{{ '%Y-%m-%dT%H:%M:%S' | strftime(ansible_date_time.epoch | int - 604800) }}"
+'''
+
+RETURN = r'''
+# Returns the rows of the query
+columns:
+    description: The names of the columns of the result
+    type: list
+    returned: always
+    sample: [ "ppa", "series", "status" ]
+rows:
+    description: The rows of the result, each a dict keyed by column name
+    type: list
+    returned: always
+    sample: [
+        {
+            "ppa": "~tuxinvader/jammy-mainline",
+            "series": "jammy",
+            "status": "Published"
+        }
+    ]
+count:
+    description: The number of rows returned
+    type: int
+    returned: always
+    sample: 1
+truncated:
+    description: Whether the query had more rows than the limit
+    type: bool
+    returned: always
+    sample: false
+elapsed_ms:
+    description: The time the query took in milliseconds
+    type: float
+    returned: always
+    sample: 0.412
+'''
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        database=dict(type='path', required=False, default=INDEX_DB),
+        sql=dict(type='str', required=True),
+        params=dict(type='list', elements='raw', required=False, default=[]),
+        limit=dict(type='int', required=False, default=1000),
+    )
+
+    # seed the result dict in the object
+    # we primarily care about changed and state
+    # changed is if this module effectively modified the target
+    # state will include any data that you want your module to pass back
+    # for consumption, for example, in a subsequent task
+    result = dict(
+        changed=False,
+        columns=[],
+        rows=[],
+        count=0,
+        truncated=False,
+    )
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    # The query is read only, so it runs in check mode as well
+    if not os.path.exists(os.path.expanduser(module.params['database'])):
+        module.fail_json(msg="The index %s doesn't exist, run ppa_index_sync first" % module.params['database'],
+                         **result)
+
+    try:
+        index = PPAIndex(module.params['database'], readonly=True)
+        query_result = index.query(module.params['sql'], module.params['params'], module.params['limit'])
+        result = {**result, **query_result}
+    except Exception as e:
+        module.fail_json(msg=e.args, **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/python
+
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.index import PPAIndex, INDEX_DB
+from ansible.module_utils.basic import AnsibleModule
+import os
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: ppa_index_sync
+
+short_description: Sync the sources and builds of PPAs into a local SQLite index
+version_added: "1.1.0"
+
+description: Mirror the source publications and build records of a project's PPAs into a local SQLite database,
+             which can then be queried with the ppa_index_query module without any more requests to Launchpad.
+             The index keeps a high-water mark for each PPA (the newest date created it has seen), and each sync
+             only lists the records created since then, less a revalidation window so recent status changes are
+             picked up. Rows are written in batches, one transaction per batch, and the PPAs are synced
+             concurrently. The module reports changed when any rows were written.
+
+options:
+    database:
+        description: The path of the SQLite database. It's created if it doesn't exist
+        required: false
+        default: ~/.cache/tuxinvader.launchpad/index.db
+        type: path
+
+    project:
+        description: The name of the project owning the PPAs
+        required: true
+        type: str
+
+    ppas:
+        description: The names of the PPAs to sync, or '*' for every active PPA of the project
+        required: false
+        default: [ '*' ]
+        type: list
+        elements: str
+
+    builds:
+        description: Sync the build records as well as the source publications
+        required: false
+        default: true
+        type: bool
+
+    full:
+        description: Ignore the high-water marks and list every record again
+        required: false
+        default: false
+        type: bool
+
+    revalidate:
+        description: The revalidation window in seconds. Records created this long before the high-water mark are
+                     listed again, so their status changes are picked up
+        required: false
+        default: 86400
+        type: int
+
+    batch_size:
+        description: The number of rows written in each transaction
+        required: false
+        default: 500
+        type: int
+
+    workers:
+        description: The number of PPAs to sync concurrently
+        required: false
+        default: 4
+        type: int
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+# Sync every PPA of ~tuxinvader into the default index
+- name: Sync the index
+  ppa_index_sync:
+    project: ~tuxinvader
+
+# Rebuild the index of two PPAs, without their builds
+- name: Full sync of the mainline PPAs
+  ppa_index_sync:
+    project: ~tuxinvader
+    ppas:
+      - lts-mainline
+      - jammy-mainline
+    builds: false
+    full: true
+'''
+
+RETURN = r'''
+# Returns the number of rows written for each PPA
+ppas:
+    description: For each PPA, the dates the listings started from (null for a full listing) and the number of
+                 rows written
+    type: dict
+    returned: always
+    sample: {
+        "lts-mainline": {
+            "builds": 12,
+            "builds_since": "2022-10-08T21:33:54.567890+00:00",
+            "sources": 4,
+            "sources_since": "2022-10-08T21:33:54.567890+00:00"
+        }
+    }
+sources:
+    description: The total number of source rows written
+    type: int
+    returned: always
+    sample: 4
+builds:
+    description: The total number of build rows written
+    type: int
+    returned: always
+    sample: 12
+elapsed:
+    description: The time the sync took in seconds
+    type: float
+    returned: always
+    sample: 3.412
+database:
+    description: The path of the database
+    type: str
+    returned: always
+    sample: /home/mark/.cache/tuxinvader.launchpad/index.db
+'''
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        database=dict(type='path', required=False, default=INDEX_DB),
+        project=dict(type='str', required=True),
+        ppas=dict(type='list', elements='str', required=False, default=['*']),
+        builds=dict(type='bool', required=False, default=True),
+        full=dict(type='bool', required=False, default=False),
+        revalidate=dict(type='int', required=False, default=86400),
+        batch_size=dict(type='int', required=False, default=500),
+        workers=dict(type='int', required=False, default=4),
+    )
+
+    # seed the result dict in the object
+    # we primarily care about changed and state
+    # changed is if this module effectively modified the target
+    # state will include any data that you want your module to pass back
+    # for consumption, for example, in a subsequent task
+    result = dict(
+        changed=False,
+        ppas={},
+        sources=0,
+        builds=0,
+    )
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    # if the user is working with this module in only check mode we do not
+    # want to make any changes to the environment, just return the current
+    # state with no modifications
+    if module.check_mode:
+        module.exit_json(**result)
+
+    try:
+        auth = False
+        if os.environ.get('LP_ACCESS_TOKEN') is not None:
+            auth = True
+        launchpad = LPHandler(auth)
+        index = PPAIndex(module.params['database'])
+        sync_result = index.sync(launchpad, module.params['project'], module.params['ppas'],
+                                 module.params['builds'], module.params['full'], module.params['revalidate'],
+                                 module.params['batch_size'], module.params['workers'])
+        result = {**result, **sync_result}
+        result['database'] = index.path
+        result['changed'] = result['sources'] + result['builds'] > 0
+    except Exception as e:
+        module.fail_json(msg=e.args, **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,8 @@
 #!/usr/bin/python
 
 from __future__ import (absolute_import, division, print_function)
-from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler, RETURN_MODES
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.jsonl import run_info
 from ansible.module_utils.basic import AnsibleModule
 import os
 __metaclass__ = type
@@ -17,7 +18,9 @@ description: Retrieve facts about a Launchpad PPA and its source_packages.
              Facts about the PPA are returned in a dictionary called 'details', and a list of published source_packages
              is returned in a list called 'sources'. By default we return source packages which are in the 'Published'
              state, but you can apply a source_filter of '*' to see all packages, or one of 'Pending', 'Published',
-             'Superseded', 'Deleted' or 'Obsolete'
+             'Superseded', 'Deleted' or 'Obsolete'.
+             Set names instead of name to fetch several PPAs (or '*' for every active PPA of the project) in one task.
+             They are fetched concurrently and returned in a dictionary called 'ppas', keyed by PPA name.
 
 options:
     project:
@@ -28,10 +31,23 @@ options:
 
     name:
         description: The name of the PPA
-        required: true
+        required: false
         default: None
         type: str
 
+    names:
+        description: A list of PPA names, or '*' for every active PPA of the project
+        required: false
+        default: None
+        type: list
+        elements: str
+
+    workers:
+        description: The number of PPAs to fetch concurrently when names is set
+        required: false
+        default: 4
+        type: int
+
     source_filter:
         description: By default we return a list of source_packages which are published, you can choose to remove
                      the filter by setting this to '*' or to use a different source status. The options for
@@ -40,6 +56,55 @@ options:
         default: Published
         type: str
 
+    source_name:
+        description: Only return sources of this name, when return is full
+        required: false
+        default: None
+        type: str
+
+    match:
+        description: How source_name is matched, one of exact, starts_with, ends_with, contains or regex
+        required: false
+        default: exact
+        type: str
+
+    limit:
+        description: Return at most this many sources, when return is full. With order set to date (or no order)
+                     pages stop being fetched once limit sources have been found, so the cost grows with the limit
+                     rather than with the size of the PPA
+        required: false
+        default: None
+        type: int
+
+    order:
+        description: The order of the sources. date returns the newest first, and is done by Launchpad. version
+                     returns the highest Debian version first, which has to read every matching source, but only
+                     keeps the best limit in memory. The default is Launchpad's order
+        required: false
+        default: None
+        choices: [ date, version ]
+        type: str
+
+    return_mode:
+        description: What to return about the PPA's sources. none returns no sources, count returns the number of
+                     matching sources in source_count without listing them, summary returns the number of sources in
+                     each status and series in summary without listing them, and full returns every matching source
+                     in sources. With names, this applies to every PPA.
+        aliases: [ return ]
+        required: false
+        default: full
+        choices: [ none, count, summary, full ]
+        type: str
+
+    dest:
+        description: Stream the sources to a JSON Lines file at this path on the target, one JSON object per line, instead
+                     of returning them. The file is gzip compressed if the path ends in .gz. Only the path and the number
+                     of sources written are returned, so memory use stays flat however many there are. Can't be used
+                     with names.
+        required: false
+        default: None
+        type: path
+
 author:
     - Mark Boddington (@TuxInvader)
 '''
@@ -60,6 +125,32 @@ EXAMPLES = r'''
     project: ~tuxinvader
     name: lts-mainline
   register: ppa_mainline
+
+# Get facts about every active PPA of ~tuxinvader, including all of their sources
+- name: Get all of ~tuxinvaders PPAs
+  ppa_info:
+    project: ~tuxinvader
+    names: '*'
+    source_filter: '*'
+    workers: 8
+  register: tuxinvader_ppas
+
+# Save every source package of ~tuxinvader/lts-mainline to a compressed file
+- name: Save the lts-mainline sources
+  ppa_info:
+    project: ~tuxinvader
+    name: lts-mainline
+    source_filter: '*'
+    dest: /var/tmp/lts-mainline.jsonl.gz
+
+# Get the 3 newest published versions of linux-generic-5.19
+- name: Get the latest linux-generic-5.19 uploads
+  ppa_info:
+    project: ~tuxinvader
+    name: lts-mainline
+    source_name: linux-generic-5.19
+    limit: 3
+    order: date
 '''
 
 RETURN = r'''
@@ -76,7 +167,7 @@ details:
         "status": "Active", "suppress_subscription_notifications": false, "web_link": "https://launchpad.net/~project/+archive/ubuntu/foo" }
 
 sources:
-  description: List of source_packages published in this PPA
+  description: List of source_packages published in this PPA, empty if dest is set or return isn't full
   type: list
   returned: always
   sample: [ { "component_name": "main", "date_created": "2022-09-27T10:02:08.870234+00:00", "date_made_pending": null,
@@ -88,13 +179,46 @@ sources:
                 "self_link": "https://api.launchpad.net/devel/~project/+archive/ubuntu/foo/+sourcepub/nnnnnnn",
                 "source_package_name": "linux-5.19.11", "source_package_version": "5.19.11-051911.202209270958", "status": "Published"
             } ]
+
+source_count:
+  description: The number of matching sources
+  type: int
+  returned: when return is count
+  sample: 112
+
+summary:
+  description: The total number of matching sources, and the number in each status and in each series (sources
+               in series which are no longer supported are counted under other)
+  type: dict
+  returned: when return is summary
+  sample: { "total": 112, "status": { "Published": 12, "Superseded": 100 }, "series": { "jammy": 60, "focal": 50, "other": 2 } }
+
+ppas:
+  description: The details and sources of each PPA, keyed by PPA name
+  type: dict
+  returned: when names is set
+  sample: { "lts-mainline": { "details": {}, "sources": [] }, "jammy-mainline": { "details": {}, "sources": [] } }
+
+dest:
+  description: The path of the JSON Lines file, the number of sources written to it and whether it is compressed
+  type: dict
+  returned: when dest is set
+  sample: { "dest": "/var/tmp/lts-mainline.jsonl.gz", "count": 24113, "compressed": true }
 '''
 
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
-        name=dict(type='str', required=True),
+        name=dict(type='str', required=False, default=None),
+        names=dict(type='list', elements='str', required=False, default=None),
+        workers=dict(type='int', required=False, default=4),
+        dest=dict(type='path', required=False, default=None),
+        return_mode=dict(type='str', required=False, default='full', choices=RETURN_MODES, aliases=['return']),
+        source_name=dict(type='str', required=False, default=None),
+        match=dict(type='str', required=False, default="exact"),
+        limit=dict(type='int', required=False, default=None),
+        order=dict(type='str', required=False, default=None, choices=['date', 'version']),
         project=dict(type='str', required=True),
         source_filter=dict(type='str', required=False, default='Published')
     )
@@ -116,6 +240,8 @@ def run_module():
     # supports check mode
     module = AnsibleModule(
         argument_spec=module_args,
+        required_one_of=[['name', 'names']],
+        mutually_exclusive=[['name', 'names'], ['names', 'dest']],
         supports_check_mode=True
     )
 
@@ -131,8 +257,16 @@ def run_module():
             auth = True
         launchpad = LPHandler(auth)
 
-        lp_result = launchpad.get_ppa_info(
-            module.params['project'], module.params['name'], module.params['source_filter'])
+        if module.params['names'] is not None:
+            lp_result = launchpad.get_ppas_info(module.params['project'], module.params['names'],
+                                                module.params['source_filter'], module.params['workers'],
+                                                module.params['return_mode'], module.params['source_name'],
+                                                module.params['match'], module.params['limit'], module.params['order'])
+        else:
+            lp_result = run_info(module.params['dest'], lambda sink: launchpad.get_ppa_info(
+                module.params['project'], module.params['name'], module.params['source_filter'], sink,
+                module.params['return_mode'], module.params['source_name'], module.params['match'],
+                module.params['limit'], module.params['order']))
         result = {**result, **lp_result}
     except Exception as e:
         module.fail_json(msg=e.args, **result)
@@ -1,8 +1,16 @@
 #!/usr/bin/python
 
 from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.checksum import HASH_CACHE
 from ansible_collections.tuxinvader.launchpad.plugins.module_utils.dput import Dput
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.ledger import UploadLedger, LEDGER_UPLOADED
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.spool import UploadSpool
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.jobs import JobStatus, JOB_DIR, JOB_FAILED, JOB_FINISHED
 from ansible.module_utils.basic import AnsibleModule
+import glob
+import os
+import threading
 __metaclass__ = type
 
 DOCUMENTATION = r'''
@@ -12,17 +20,136 @@ module: ppa_upload_package
 short_description: Upload source packages to a PPA for building
 version_added: "1.0.0"
 
-description: Upload source packages to a PPA for building
+description: Upload source packages to a PPA for building. Several changes files can be sent in one task, either as a
+             list (or glob) of source_changes for one ppa, or as a list of uploads for different PPAs. FTP sessions are
+             shared by all the changes files going to the same PPA, and the work is spread over a small pool of workers.
 
 options:
     source_changes:
-        description: The name of the source package changes file to process
-        required: true
-        type: str
+        description: The name of the source package changes file to process. This can also be a list of changes files,
+                     and each entry may be a glob pattern (eg /usr/local/src/debs/*/*_source.changes)
+        required: false
+        type: list
+        elements: str
 
     ppa:
-        description: The name of the PPA (eg ~tuxinvader/lts-mainline)
-        required: true
+        description: The name of the PPA (eg ~tuxinvader/lts-mainline). Required with source_changes
+        required: false
+        type: str
+
+    uploads:
+        description: A list of dictionaries, each with a source_changes (file or glob) and a ppa, to upload changes files
+                     to several PPAs in one go. Mutually exclusive with source_changes and ppa
+        required: false
+        type: list
+        elements: dict
+
+    workers:
+        description: The number of concurrent upload workers. Each worker opens at most one FTP session per PPA.
+        required: false
+        default: 4
+        type: int
+
+    retries:
+        description: The number of times to reconnect and resume a file transfer after a connection failure.
+                     Resumed transfers continue from the size already held by the server.
+        required: false
+        default: 3
+        type: int
+
+    skip_existing:
+        description: Look up the source files already held by the PPA for the same upstream version, and check that
+                     the files the .dsc references but the changes file leaves out (eg the orig tarball of a source
+                     built with -sd) are there with the same sha256. Every file the changes file lists is still sent,
+                     and the upload fails before anything is sent if the PPA already holds one of them. This needs
+                     access to the Launchpad API, and an authenticated connection if the PPA is private.
+        required: false
+        default: false
+        type: bool
+
+    block_size:
+        description: The block size in bytes used when sending files over FTP
+        required: false
+        default: 8192
+        type: int
+
+    bandwidth_limit:
+        description: Cap the upload rate to this many KiB per second, shared across all concurrent transfers.
+                     The default of 0 leaves uploads unthrottled.
+        required: false
+        default: 0
+        type: int
+
+    verify:
+        description: Check that every file referenced by the changes file exists and matches its declared size and
+                     sha256 before anything is sent. Files are hashed in parallel.
+        required: false
+        default: true
+        type: bool
+
+    hash_cache:
+        description: The path to a cache of file hashes keyed on path, mtime and size, so that a retried upload doesn't
+                     hash the same files again
+        required: false
+        default: ~/.cache/tuxinvader.launchpad/hashes.json
+        type: path
+
+    ledger:
+        description: The path to a local upload ledger. Each upload is recorded under the sha256 of the changes file and
+                     the target PPA, and a changes file already recorded as uploaded or accepted is not sent again.
+                     The ledger is disabled by default.
+        required: false
+        default: None
+        type: str
+
+    reconcile:
+        description: Check unconfirmed ledger entries against the archive, marking them accepted if Launchpad has the
+                     source package, or missing (to be sent again) if it doesn't. The entries for the current changes
+                     files are checked first, the rest are checked in the background during the upload.
+        required: false
+        default: false
+        type: bool
+
+    spool:
+        description: The path to a local upload spool directory. When set, the changes files are queued in the spool
+                     and the task returns straight away. A background worker is started if one isn't already running,
+                     and it sends the queued uploads, retrying failures with a back off. Use the upload_spool_info
+                     module to follow progress.
+        required: false
+        default: None
+        type: str
+
+    spool_priority:
+        description: The priority of spooled uploads, jobs with a lower number are sent first, then in the order
+                     they were queued
+        required: false
+        default: 500
+        type: int
+
+    spool_concurrency:
+        description: The number of uploads the spool worker runs at the same time, if this task starts the worker
+        required: false
+        default: 2
+        type: int
+
+    spool_retries:
+        description: The number of times the spool worker retries a failed upload before moving it to failed
+        required: false
+        default: 3
+        type: int
+
+    job_id:
+        description: Run as a resumable job. Progress is written to a job status file after every item, and a task
+                     re-run with the same job_id carries on from the last checkpoint, skipping the items already
+                     completed. This is intended for use with async and poll
+        required: false
+        default: None
+        type: str
+
+    job_dir:
+        description: The directory holding job status files
+        required: false
+        default: ~/.cache/tuxinvader.launchpad/jobs
         type: str
 
 author:
@@ -35,6 +162,24 @@ EXAMPLES = r'''
   ppa_upload_package:
     source_changes: /usr/local/src/deb/v5.19.11/linux-5.19.11_5.19.11-051911.202209251059_source.changes
     ppa: ~tuxinvader/lts-mainline
+
+# Upload a source package unless the ledger says it has already been sent
+- name: Upload new kernel package once
+  ppa_upload_package:
+    source_changes: /usr/local/src/deb/v5.19.11/linux-5.19.11_5.19.11-051911.202209251059_source.changes
+    ppa: ~tuxinvader/lts-mainline
+    ledger: ~/.cache/tuxinvader.launchpad/uploads.json
+    reconcile: true
+
+# Upload every changes file for a release over shared FTP sessions
+- name: Upload release packages
+  ppa_upload_package:
+    uploads:
+      - source_changes: /usr/local/src/deb/v5.19.11/*_source.changes
+        ppa: ~tuxinvader/lts-mainline
+      - source_changes: /usr/local/src/deb/v5.15.70/*_source.changes
+        ppa: ~tuxinvader/lts-mainline-longterm
+    workers: 4
 '''
 
 RETURN = r'''
@@ -51,18 +196,162 @@ uploads:
     sample: [
         "linux-generic-5.15_5.15.71_source.changes",
         "linux-generic-5.15_5.15.71.dsc",
-        "linux-generic-5.15_5.15.71.orig.tar.gz",
         "linux-generic-5.15_5.15.71.debian.tar.xz",
         "linux-generic-5.15_5.15.71_source.buildinfo"
     ]
+skipped:
+    description: The files referenced by the .dsc but not by the changes file, which the PPA already holds
+    type: list
+    returned: always
+    sample: [
+        "linux-generic-5.15_5.15.71.orig.tar.gz"
+    ]
+verified:
+    description: The filenames which were checked against the changes file before the upload started
+    type: list
+    returned: when verify is true
+    sample: [
+        "linux-generic-5.15_5.15.71.dsc",
+        "linux-generic-5.15_5.15.71.orig.tar.gz"
+    ]
+resumed:
+    description: The filenames which were resumed from a partial upload rather than sent from the start
+    type: list
+    returned: always
+    sample: [
+        "linux-generic-5.15_5.15.71.orig.tar.gz"
+    ]
+metrics:
+    description: Transfer metrics for each file sent. The rate is in MB (10^6 bytes) per second, and the duration
+                 includes any reconnects.
+    type: list
+    returned: always
+    sample: [
+        {
+            "file": "linux-generic-5.15_5.15.71.orig.tar.gz",
+            "size": 134217728,
+            "bytes": 134217728,
+            "offset": 0,
+            "attempts": 1,
+            "duration": 27.481,
+            "mb_per_sec": 4.884
+        }
+    ]
+changes:
+    description: The result for each changes file processed
+    type: list
+    returned: always
+    sample: [
+        {
+            "source_changes": "/usr/local/src/cod/debs/v5.15.71/linux-generic-5.15_5.15.71_source.changes",
+            "ppa": "~tuxinvader/lts-mainline",
+            "count": 4,
+            "uploads": [
+                "linux-generic-5.15_5.15.71_source.changes",
+                "linux-generic-5.15_5.15.71.dsc",
+                "linux-generic-5.15_5.15.71.debian.tar.xz",
+                "linux-generic-5.15_5.15.71_source.buildinfo"
+            ],
+            "skipped": ["linux-generic-5.15_5.15.71.orig.tar.gz"],
+            "resumed": [],
+            "verified": ["linux-generic-5.15_5.15.71.dsc", "linux-generic-5.15_5.15.71.debian.tar.xz"],
+            "metrics": [],
+            "ledger": null,
+            "failed": false,
+            "msg": null
+        }
+    ]
+failed:
+    description: The number of changes files which failed to upload
+    type: int
+    returned: always
+    sample: 0
+spool:
+    description: The spool directory, the jobs queued by this task, and whether a new worker was started
+    type: dict
+    returned: when spool is set
+    sample: {
+        "directory": "/home/tux/.cache/tuxinvader.launchpad/spool",
+        "worker_started": true,
+        "jobs": [
+            {
+                "id": "500-1665351234567890123-1a2b3c4d",
+                "source_changes": "/usr/local/src/cod/debs/v5.15.71/linux-generic-5.15_5.15.71_source.changes",
+                "ppa": "~tuxinvader/lts-mainline",
+                "state": "queue",
+                "queued": true
+            }
+        ]
+    }
+job:
+    description: The job status, including the path of the job status file, the number of times the job has run, and
+                 the number of items planned and completed
+    type: dict
+    returned: when job_id is set
+    sample: {
+        "id": "release-5.19",
+        "path": "/home/tux/.cache/tuxinvader.launchpad/jobs/release-5.19.json",
+        "state": "finished",
+        "runs": 2,
+        "total": 30,
+        "completed": 30
+    }
+ledger:
+    description: The ledger location, and the new status of any entries which were reconciled. The ledger status of
+                 each changes file is reported in its entry in changes.
+    type: dict
+    returned: when ledger is set
+    sample: {
+        "path": "/home/tux/.cache/tuxinvader.launchpad/uploads.json",
+        "reconciled": {
+            "9d5ed678fe57bcca610140957afab571e6a4c5a1ab9e3b8a7ec1ea4a0f6a9c43@~tuxinvader/lts-mainline": "accepted"
+        }
+    }
 '''
 
 
+def expand_uploads(module):
+    items = []
+    uploads = module.params['uploads']
+    if uploads is None:
+        uploads = [{'source_changes': module.params['source_changes'], 'ppa': module.params['ppa']}]
+    for upload in uploads:
+        if upload.get('source_changes') is None or upload.get('ppa') is None:
+            raise Exception("Each upload needs both source_changes and ppa")
+        patterns = upload['source_changes']
+        if not isinstance(patterns, list):
+            patterns = [patterns]
+        for pattern in patterns:
+            matches = sorted(glob.glob(os.path.expanduser(pattern)))
+            if len(matches) == 0:
+                raise Exception("Failed to find Changes file for processing: %s" % pattern)
+            for source_changes in matches:
+                if (source_changes, upload['ppa']) not in items:
+                    items.append((source_changes, upload['ppa']))
+    return items
+
+
 def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
-        source_changes=dict(type='str', required=True),
-        ppa=dict(type='str', required=True),
+        source_changes=dict(type='list', elements='str', required=False, default=None),
+        ppa=dict(type='str', required=False, default=None),
+        uploads=dict(type='list', elements='dict', required=False, default=None),
+        workers=dict(type='int', required=False, default=4),
+        retries=dict(type='int', required=False, default=3),
+        block_size=dict(type='int', required=False, default=8192),
+        bandwidth_limit=dict(type='int', required=False, default=0),
+        skip_existing=dict(type='bool', required=False, default=False),
+        verify=dict(type='bool', required=False, default=True),
+        hash_cache=dict(type='path', required=False, default=HASH_CACHE),
+        ledger=dict(type='str', required=False, default=None),
+        reconcile=dict(type='bool', required=False, default=False),
+        spool=dict(type='str', required=False, default=None),
+        spool_priority=dict(type='int', required=False, default=500),
+        spool_concurrency=dict(type='int', required=False, default=2),
+        spool_retries=dict(type='int', required=False, default=3),
+        job_id=dict(type='str', required=False, default=None),
+        job_dir=dict(type='str', required=False, default=JOB_DIR),
     )
 
     # seed the result dict in the object
@@ -73,6 +362,11 @@ def run_module():
     result = dict(
         count=0,
         uploads=[],
+        resumed=[],
+        skipped=[],
+        metrics=[],
+        changes=[],
+        failed=0,
         changed=False,
     )
 
@@ -82,6 +376,9 @@ def run_module():
     # supports check mode
     module = AnsibleModule(
         argument_spec=module_args,
+        mutually_exclusive=[['uploads', 'source_changes'], ['uploads', 'ppa']],
+        required_one_of=[['uploads', 'source_changes']],
+        required_together=[['source_changes', 'ppa']],
         supports_check_mode=True
     )
 
@@ -91,16 +388,117 @@ def run_module():
     if module.check_mode:
         module.exit_json(**result)
 
+    auth = False
+    if os.environ.get('LP_ACCESS_TOKEN') is not None:
+        auth = True
+
+    ledger = None
+    reconciler = None
+    job = None
+    keys = {}
     try:
-        dput = Dput()
-        dput_result = dput.upload(
-            module.params['source_changes'], module.params['ppa'])
-        result = {**result, **dput_result}
+        items = expand_uploads(module)
+        if module.params['job_id'] is not None and module.params['spool'] is None:
+            # A resumed job works through the plan saved by its first run rather than the current matches of the
+            # globs, and the changes files it already uploaded are reported from their checkpoints
+            job = JobStatus(module.params['job_id'], module.params['job_dir'])
+            plan = job.begin('ppa_upload_package', ["%s@%s" % item for item in items])
+            items = [tuple(key.rsplit("@", 1)) for key in plan]
+            for item in [item for item in items if job.is_done("%s@%s" % item)]:
+                items.remove(item)
+                saved = job.result("%s@%s" % item)
+                result['changes'].append(saved)
+                for key in ['uploads', 'resumed', 'skipped', 'metrics']:
+                    result[key] += saved[key]
+                result['count'] += saved['count']
+        dput = Dput(retries=module.params['retries'], verify=module.params['verify'],
+                    workers=module.params['workers'], hash_cache=module.params['hash_cache'],
+                    block_size=module.params['block_size'], bandwidth_limit=module.params['bandwidth_limit'] * 1024)
+
+        skipped = []
+        if module.params['ledger'] is not None:
+            ledger = UploadLedger(module.params['ledger'])
+            result['ledger'] = {'path': ledger.path, 'reconciled': {}}
+            for item in items:
+                keys[item] = ledger.key(item[0], item[1])
+            if module.params['reconcile']:
+                current = [keys[item] for item in items if (ledger.get(keys[item]) or {}).get('status') == LEDGER_UPLOADED]
+                if len(current) > 0:
+                    result['ledger']['reconciled'].update(ledger.reconcile(LPHandler(auth), keys=current))
+                reconciler = threading.Thread(target=lambda: result['ledger']['reconciled'].update(
+                    ledger.reconcile(LPHandler(auth), exclude=list(keys.values()))))
+                reconciler.start()
+            for item in items:
+                entry = ledger.get(keys[item])
+                if entry is not None and entry['status'] in ledger.skip_states:
+                    skipped.append(item)
+                    change = {'source_changes': item[0], 'ppa': item[1], 'count': 0, 'uploads': [], 'resumed': [],
+                              'skipped': [], 'metrics': [], 'ledger': entry['status'], 'failed': False,
+                              'msg': "already recorded in the ledger"}
+                    result['changes'].append(change)
+                    if job is not None:
+                        job.complete("%s@%s" % item, change)
+
+        items = [item for item in items if item not in skipped]
+        existing = {}
+        if module.params['skip_existing'] and len(items) > 0:
+            launchpad = LPHandler(auth)
+            for item in items:
+                changes = dput.read_changes(item[0])
+                ppa_path = item[1].split('/')
+                existing[item] = launchpad.get_archive_files(ppa_path[0], ppa_path[-1], changes.source,
+                                                             changes.version)
+
+        if module.params['spool'] is not None:
+            spool = UploadSpool(module.params['spool'])
+            result['spool'] = {'directory': spool.directory, 'worker_started': False, 'jobs': []}
+            for item in items:
+                spooled, queued = spool.enqueue(item[0], item[1], module.params['spool_priority'],
+                                                existing.get(item), None if ledger is None else ledger.path)
+                result['spool']['jobs'].append({'id': spooled['id'], 'source_changes': spooled['source_changes'],
+                                                'ppa': spooled['ppa'], 'state': spooled['state'], 'queued': queued})
+                if queued:
+                    result['changed'] = True
+            if reconciler is not None:
+                reconciler.join()
+            result['spool']['worker_started'] = spool.start_worker(dput, module.params['spool_concurrency'],
+                                                                   module.params['spool_retries'])
+            module.exit_json(**result)
+
+        def progress(entry):
+            if not entry['failed']:
+                job.complete("%s@%s" % (entry['source_changes'], entry['ppa']), entry)
+
+        dput_result = dput.upload_batch(items, existing, progress if job is not None else None)
+        for entry in dput_result['changes']:
+            entry['ledger'] = None
+            if ledger is not None and not entry['failed']:
+                changes = dput.read_changes(entry['source_changes'])
+                entry['ledger'] = ledger.record(keys[(entry['source_changes'], entry['ppa'])], LEDGER_UPLOADED,
+                                                ppa=entry['ppa'], source=changes.source, version=changes.version,
+                                                changes=os.path.abspath(entry['source_changes']))['status']
+            result['changes'].append(entry)
+        for key in ['count', 'uploads', 'resumed', 'skipped', 'metrics', 'failed']:
+            result[key] += dput_result[key]
         if result['count'] > 0:
             result['changed'] = True
+
+        if reconciler is not None:
+            reconciler.join()
+        if job is not None:
+            job.finish(JOB_FAILED if result['failed'] > 0 else JOB_FINISHED,
+                       None if result['failed'] == 0 else "%d changes files failed to upload" % result['failed'])
+            result['job'] = job.summary()
     except Exception as e:
+        if job is not None:
+            job.finish(JOB_FAILED, str(e))
+            result['job'] = job.summary()
         module.fail_json(msg=e.args, **result)
 
+    if result['failed'] > 0:
+        module.fail_json(msg="%d of %d changes files failed to upload" % (result['failed'], len(result['changes'])),
+                         **result)
+
     module.exit_json(**result)
 
 
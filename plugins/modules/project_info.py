@@ -29,6 +29,13 @@ options:
         default: Active
         type: str
 
+    expand_ppas:
+        description: Return the attributes of each PPA in ppas. By default only the names of the PPAs are returned,
+                     in ppa_names. The attributes come with the listing of the PPAs, so this costs no more requests
+        required: false
+        default: false
+        type: bool
+
 author:
     - Mark Boddington (@TuxInvader)
 '''
@@ -41,6 +48,13 @@ EXAMPLES = r'''
   environment:
     LP_ACCESS_TOKEN: kjaslkdjalksd
     LP_ACCESS_SECRET: alskjajsdlk
+
+# Get facts about project ~tuxinvader and all of its PPAs, including deleted ones
+- name: Get ~tuxinvaders details and PPAs
+  project_info:
+    name: ~tuxinvader
+    ppa_filter: '*'
+    expand_ppas: true
 '''
 
 RETURN = r'''
@@ -57,8 +71,14 @@ details:
         "self_link": "https://api.launchpad.net/devel/~tuxinvader", "time_zone": "Europe/London", "visibility": "Public",
         "web_link": "https://launchpad.net/~tuxinvader" }
 
+ppa_names:
+  description: The names of the PPAs owned by this project which match ppa_filter
+  type: list
+  returned: always
+  sample: [ "lts-mainline", "jammy-mainline" ]
+
 ppas:
-  description: List of PPAs owned by this project
+  description: List of PPAs owned by this project which match ppa_filter, empty unless expand_ppas is set
   type: list
   returned: always
   sample: [ { "authorized_size": 2048, "build_debug_symbols": false, "description": "Ubuntu mainline kernels",
@@ -78,7 +98,8 @@ def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
         name=dict(type='str', required=True),
-        ppa_filter=dict(type='str', required=False, default="Active")
+        ppa_filter=dict(type='str', required=False, default="Active"),
+        expand_ppas=dict(type='bool', required=False, default=False)
     )
 
     # seed the result dict in the object
@@ -89,6 +110,7 @@ def run_module():
     result = dict(
         changed=False,
         details={},
+        ppa_names=[],
         ppas=[]
     )
 
@@ -113,7 +135,7 @@ def run_module():
             auth = True
         launchpad = LPHandler(auth)
         lp_result = launchpad.get_project_info(
-            module.params['name'], module.params['ppa_filter'])
+            module.params['name'], module.params['ppa_filter'], module.params['expand_ppas'])
         result = {**result, **lp_result}
     except Exception as e:
         module.fail_json(msg=e.args, **result)
@@ -2,6 +2,7 @@
 
 from __future__ import (absolute_import, division, print_function)
 from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.jobs import JobStatus, JOB_DIR, JOB_FAILED
 from ansible.module_utils.basic import AnsibleModule
 __metaclass__ = type
 
@@ -49,6 +50,20 @@ options:
         type: string
         default: date
 
+    job_id:
+        description: Run as a resumable job. Progress is written to a job status file after every item, and a task
+                     re-run with the same job_id carries on from the last checkpoint, skipping the items already
+                     completed. This is intended for use with async and poll
+        required: false
+        default: None
+        type: str
+
+    job_dir:
+        description: The directory holding job status files
+        required: false
+        default: ~/.cache/tuxinvader.launchpad/jobs
+        type: str
+
 author:
     - Mark Boddington (@TuxInvader)
 '''
@@ -73,6 +88,16 @@ EXAMPLES = r'''
     match: regex
     prune_by: version
     max_sources: 4
+
+# Prune a large PPA in the background, resuming from the last checkpoint if the task is re-run
+- name: Prune lts-mainline PPA as a resumable job
+  prune_ppa:
+    name: lts-mainline
+    project: ~tuxinvader
+    max_sources: 2
+    job_id: prune-lts-mainline
+  async: 3600
+  poll: 0
 '''
 
 RETURN = r'''
@@ -92,6 +117,24 @@ remaining:
   type: dict
   returned: always
   sample: { "linux-5.19.10": "2022-09-21T14:28:54.544426+00:00" }
+checkpointed:
+    description: The number of pruned packages which were deleted by an earlier run of the same job
+    type: int
+    returned: always
+    sample: 0
+job:
+    description: The job status, including the path of the job status file, the number of times the job has run, and
+                 the number of items planned and completed
+    type: dict
+    returned: when job_id is set
+    sample: {
+        "id": "prune-lts-mainline",
+        "path": "/home/tux/.cache/tuxinvader.launchpad/jobs/prune-lts-mainline.json",
+        "state": "finished",
+        "runs": 2,
+        "total": 4,
+        "completed": 4
+    }
 '''
 
 
@@ -104,6 +147,8 @@ def run_module():
         source_name=dict(type='str', required=False, default=None),
         match=dict(type='str', required=False, default="exact"),
         prune_by=dict(type='str', required=False, default="date"),
+        job_id=dict(type='str', required=False, default=None),
+        job_dir=dict(type='str', required=False, default=JOB_DIR),
     )
 
     # seed the result dict in the object
@@ -130,15 +175,27 @@ def run_module():
     if module.check_mode:
         module.exit_json(**result)
 
+    job = None
     try:
+        if module.params['job_id'] is not None:
+            job = JobStatus(module.params['job_id'], module.params['job_dir'])
         launchpad = LPHandler(True)
         lp_result = launchpad.prune_ppa(
-            module.params['project'], module.params['name'], module.params['max_sources'], module.params['source_name'], 
-            module.params['match'], module.params['prune_by'])
+            module.params['project'], module.params['name'], module.params['max_sources'], module.params['source_name'],
+            module.params['match'], module.params['prune_by'], job)
         result = {**result, **lp_result}
-        if result['count'] > 0:
+        if result['count'] - result['checkpointed'] > 0:
             result['changed'] = True
+        if job is not None:
+            job.finish()
+            result['job'] = job.summary()
     except Exception as e:
+        if job is not None:
+            job.finish(JOB_FAILED, str(e))
+            result['job'] = job.summary()
+            result['pruned'] = job.results()
+            result['count'] = len(result['pruned'])
+            result['changed'] = result['count'] > 0
         module.fail_json(msg=e.args, **result)
 
     module.exit_json(**result)
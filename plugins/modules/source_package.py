@@ -1,8 +1,10 @@
 #!/usr/bin/python
 
 from __future__ import (absolute_import, division, print_function)
-from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler, RETURN_MODES
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.checksum import HASH_CACHE
 from ansible_collections.tuxinvader.launchpad.plugins.module_utils.dput import Dput
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.spool import UploadSpool
 from ansible.module_utils.basic import AnsibleModule
 
 __metaclass__ = type
@@ -28,12 +30,13 @@ options:
         type: str
 
     name:
-        description: The name of the Source Package
-        required: true
+        description: The name of the Source Package. Read from the Source field of source_changes if not set
+        required: false
         type: str
 
     version:
-        description: The version of source package, the default is None (all versions)
+        description: The version of source package, the default is None (all versions). If source_changes is set, the
+                     default is the Version field of the changes file
         required: false
         default: None
         type: str
@@ -57,6 +60,99 @@ options:
         required: false
         type: str
 
+    packages:
+        description: A list of source packages to manage in one task, each a dict with the keys name, version, ensure
+                     and source_changes, which have the same meaning as the options above. name and version are read
+                     from source_changes if they're not set, and ensure defaults to the ensure option. The PPA is
+                     looked up once and its publications listed once for the whole batch, deletions are made
+                     concurrently, and missing packages are uploaded together over one FTP session. Packages are
+                     matched exactly, the match option only applies to a single package.
+        required: false
+        default: None
+        type: list
+        elements: dict
+
+    return_mode:
+        description: What to return about the matching sources. none returns no sources, count returns the number
+                     of matching sources in source_count, summary returns the number of matching sources in each
+                     status and series in summary, and full returns every matching source in sources. With packages,
+                     this applies to each entry as well.
+        aliases: [ return ]
+        required: false
+        default: full
+        choices: [ none, count, summary, full ]
+        type: str
+
+    workers:
+        description: The number of concurrent Launchpad requests and FTP transfers used when processing packages
+        required: false
+        default: 4
+        type: int
+
+    block_size:
+        description: The block size in bytes used when sending files over FTP
+        required: false
+        default: 8192
+        type: int
+
+    bandwidth_limit:
+        description: Cap the upload rate to this many KiB per second, shared across all concurrent transfers.
+                     The default of 0 leaves uploads unthrottled.
+        required: false
+        default: 0
+        type: int
+
+    verify:
+        description: Check that every file referenced by the changes file exists and matches its declared size and
+                     sha256 before anything is sent. Files are hashed in parallel.
+        required: false
+        default: true
+        type: bool
+
+    hash_cache:
+        description: The path to a cache of file hashes keyed on path, mtime and size, so that a retried upload doesn't
+                     hash the same files again
+        required: false
+        default: ~/.cache/tuxinvader.launchpad/hashes.json
+        type: path
+
+    skip_existing:
+        description: When uploading, check that the files the .dsc references but the changes file leaves out (eg the
+                     orig tarball of a source built with -sd) are held by the PPA for the same upstream version, with
+                     the same sha256. Every file the changes file lists is still sent, and the upload fails before
+                     anything is sent if the PPA already holds one of them.
+        required: false
+        default: false
+        type: bool
+
+    spool:
+        description: The path to a local upload spool directory. When set, a missing package's changes file is queued in the spool
+                     and the task returns straight away. A background worker is started if one isn't already running,
+                     and it sends the queued uploads, retrying failures with a back off. Use the upload_spool_info
+                     module to follow progress.
+        required: false
+        default: None
+        type: str
+
+    spool_priority:
+        description: The priority of spooled uploads, jobs with a lower number are sent first, then in the order
+                     they were queued
+        required: false
+        default: 500
+        type: int
+
+    spool_concurrency:
+        description: The number of uploads the spool worker runs at the same time, if this task starts the worker
+        required: false
+        default: 2
+        type: int
+
+    spool_retries:
+        description: The number of times the spool worker retries a failed upload before moving it to failed
+        required: false
+        default: 3
+        type: int
+
 author:
     - Mark Boddington (@TuxInvader)
 '''
@@ -83,6 +179,25 @@ EXAMPLES = r'''
         version: 5.19.12-051912.202209281927
         ensure: present
         source_changes: /usr/local/src/cod/debs/v5.19.12/linux-5.19.12_5.19.12-051912.202209281927_source.changes
+
+# Ensure the package described by a changes file is published, reading the name and version from the changes file
+-   name: Ensure kernel 5.19.12 is added
+    source_package:
+        project: ~tuxinvader
+        ppa: my-random-ppa
+        source_changes: /usr/local/src/cod/debs/v5.19.12/linux-5.19.12_5.19.12-051912.202209281927_source.changes
+
+# Ensure a batch of kernels is published, and remove an old one, in a single task
+-   name: Manage the lts-mainline kernels
+    source_package:
+        project: ~tuxinvader
+        ppa: lts-mainline
+        packages:
+            - source_changes: /usr/local/src/cod/debs/v5.15.71/linux-generic-5.15_5.15.71_source.changes
+            - source_changes: /usr/local/src/cod/debs/v5.15.72/linux-generic-5.15_5.15.72_source.changes
+            - name: linux-generic-5.15
+              version: 5.15.60
+              ensure: absent
 '''
 
 RETURN = r'''
@@ -112,6 +227,16 @@ sources:
             "status": "Published"
         }
     ]
+source_count:
+    description: The number of matching sources
+    type: int
+    returned: when return is count
+    sample: 1
+summary:
+    description: The total number of matching sources, and the number in each status and in each series
+    type: dict
+    returned: when return is summary
+    sample: { "total": 2, "status": { "Published": 2 }, "series": { "jammy": 1, "focal": 1 } }
 messages:
     description: Information about each package that was processed
     type: list
@@ -120,11 +245,24 @@ messages:
         "package unchanged, version mismatch: '5.19.12' not '6.0-rc7', regex: '^linux-generic.*', result: 'linux-generic-5.19'"
     ]
 dput:
-    description: Information about any uploads which may have taken place (if source_changes was set and package was missing)
+    description: Information about any uploads which may have taken place (if source_changes was set and package was missing),
+                 including transfer metrics (bytes, duration and MB/s) for each file sent
     type: dict
     returned: always
     sample: {
         "count": 4,
+        "skipped": [],
+        "metrics": [
+            {
+                "file": "linux-5.19.12_5.19.12-051912.202209281927.tar.gz",
+                "size": 1048576,
+                "bytes": 1048576,
+                "offset": 0,
+                "attempts": 1,
+                "duration": 0.412,
+                "mb_per_sec": 2.545
+            }
+        ],
         "uploads": [
             "linux-5.19.12_5.19.12-051912.202209281927_source.changes",
             "linux-5.19.12_5.19.12-051912.202209281927.dsc",
@@ -132,19 +270,149 @@ dput:
             "linux-5.19.12_5.19.12-051912.202209281927_source.buildinfo"
         ]
     }
+packages:
+    description: The result for each entry of packages, with the sources found or deleted, whether an upload was
+                 needed, and the upload (or spool job) for it
+    type: list
+    returned: when packages is set
+    sample: [
+        {
+            "name": "linux-generic-5.15",
+            "version": "5.15.71",
+            "ensure": "present",
+            "source_changes": "/usr/local/src/cod/debs/v5.15.71/linux-generic-5.15_5.15.71_source.changes",
+            "changed": true,
+            "missing": true,
+            "failed": false,
+            "sources": [],
+            "messages": ["No matching sources. Attempting upload"],
+            "dput": { "count": 4, "uploads": [], "resumed": [], "skipped": [], "metrics": [] }
+        }
+    ]
+spool:
+    description: The spool directory, the job queued by this task, and whether a new worker was started
+    type: dict
+    returned: when spool is set and an upload was needed
+    sample: {
+        "directory": "/home/tux/.cache/tuxinvader.launchpad/spool",
+        "worker_started": true,
+        "jobs": [
+            {
+                "id": "500-1665351234567890123-1a2b3c4d",
+                "source_changes": "/usr/local/src/cod/debs/v5.15.71/linux-generic-5.15_5.15.71_source.changes",
+                "ppa": "~tuxinvader/lts-mainline",
+                "state": "queue",
+                "queued": true
+            }
+        ]
+    }
 '''
 
 
+def run_batch(module, result):
+    # Check every package against one listing of the PPA, then upload the missing ones together
+    ppa_name = "%s/%s" % (module.params['project'], module.params['ppa'])
+    dput = Dput(workers=module.params['workers'], verify=module.params['verify'],
+                hash_cache=module.params['hash_cache'], block_size=module.params['block_size'],
+                bandwidth_limit=module.params['bandwidth_limit'] * 1024)
+    try:
+        packages = []
+        for package in module.params['packages']:
+            package = dict(package)
+            package.setdefault('ensure', module.params['ensure'])
+            if package.get('source_changes') is not None:
+                changes = dput.read_changes(package['source_changes'])
+                if package.get('name') is None:
+                    package['name'] = changes.source
+                if package.get('version') is None:
+                    package['version'] = changes.version
+            if package.get('name') is None:
+                raise Exception("Each package needs a name or a source_changes file with a Source field")
+            packages.append(package)
+
+        launchpad = LPHandler(True)
+        lp_result = launchpad.check_source_packages(module.params['project'], module.params['ppa'], packages,
+                                                    module.params['skip_existing'], module.params['workers'])
+        result['packages'] = lp_result['packages']
+        result['changed'] = lp_result['changed']
+
+        uploads = []
+        existing = {}
+        for entry in result['packages']:
+            result['sources'].extend(entry['sources'])
+            entry['failed'] = False
+            if entry['missing'] is False:
+                continue
+            if entry['source_changes'] is None:
+                entry['failed'] = True
+                entry['messages'].append(
+                    "FAIL - The source package is not present on PPA and we have no source_changes file to upload")
+                continue
+            entry['messages'].append("No matching sources. Attempting upload")
+            entry['changed'] = True
+            item = (entry['source_changes'], ppa_name)
+            uploads.append(item)
+            existing[item] = entry.pop('existing')
+
+        if len(uploads) > 0:
+            result['changed'] = True
+            by_changes = dict((entry['source_changes'], entry) for entry in result['packages'] if entry['missing'])
+            if module.params['spool'] is not None:
+                spool = UploadSpool(module.params['spool'])
+                result['spool'] = {'directory': spool.directory, 'jobs': []}
+                for item in uploads:
+                    job, queued = spool.enqueue(item[0], ppa_name, module.params['spool_priority'], existing[item])
+                    by_changes[item[0]]['messages'].append(
+                        "Upload queued in spool %s as %s" % (spool.directory, job['id']))
+                    result['spool']['jobs'].append({'id': job['id'], 'source_changes': job['source_changes'],
+                                                    'ppa': job['ppa'], 'state': job['state'], 'queued': queued})
+                result['spool']['worker_started'] = spool.start_worker(
+                    dput, module.params['spool_concurrency'], module.params['spool_retries'])
+            else:
+                result['dput'] = dput.upload_batch(uploads, existing)
+                for upload in result['dput']['changes']:
+                    entry = by_changes[upload['source_changes']]
+                    entry['dput'] = upload
+                    if upload['failed']:
+                        entry['failed'] = True
+                        entry['messages'].append("FAIL - %s" % upload['msg'])
+        for entry in result['packages']:
+            entry.pop('existing', None)
+            result['messages'].extend(entry['messages'])
+            launchpad.apply_return_mode(entry, module.params['return_mode'])
+        launchpad.apply_return_mode(result, module.params['return_mode'])
+    except Exception as e:
+        module.fail_json(msg=e.args, **result)
+
+    failed = [entry['name'] for entry in result['packages'] if entry['failed']]
+    if len(failed) > 0:
+        module.fail_json(msg="FAIL - %d of %d packages failed: %s" % (len(failed), len(result['packages']),
+                                                                      ", ".join(failed)), **result)
+    module.exit_json(**result)
+
+
 def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
-        name=dict(type='str', required=True),
+        name=dict(type='str', required=False, default=None),
         version=dict(type='str', required=False, default=None),
         project=dict(type='str', required=True),
         ppa=dict(type='str', required=True),
+        packages=dict(type='list', elements='dict', required=False, default=None),
+        workers=dict(type='int', required=False, default=4),
+        return_mode=dict(type='str', required=False, default='full', choices=RETURN_MODES, aliases=['return']),
         ensure=dict(type='str', required=False, default="present"),
         match=dict(type='str', required=False, default="exact"),
-        source_changes=dict(type='str', required=False, default=None)
+        source_changes=dict(type='str', required=False, default=None),
+        skip_existing=dict(type='bool', required=False, default=False),
+        block_size=dict(type='int', required=False, default=8192),
+        bandwidth_limit=dict(type='int', required=False, default=0),
+        verify=dict(type='bool', required=False, default=True),
+        hash_cache=dict(type='path', required=False, default=HASH_CACHE),
+        spool=dict(type='str', required=False, default=None),
+        spool_priority=dict(type='int', required=False, default=500),
+        spool_concurrency=dict(type='int', required=False, default=2),
+        spool_retries=dict(type='int', required=False, default=3)
     )
 
     # seed the result dict in the object
@@ -165,6 +433,8 @@ def run_module():
     # supports check mode
     module = AnsibleModule(
         argument_spec=module_args,
+        required_one_of=[['name', 'source_changes', 'packages']],
+        mutually_exclusive=[['packages', 'name'], ['packages', 'source_changes']],
         supports_check_mode=True
     )
 
@@ -174,7 +444,19 @@ def run_module():
     if module.check_mode:
         module.exit_json(**result)
 
+    if module.params['packages'] is not None:
+        run_batch(module, result)
+
     try:
+        if module.params['source_changes'] is not None:
+            changes = Dput().read_changes(module.params['source_changes'])
+            if module.params['name'] is None:
+                module.params['name'] = changes.source
+            if module.params['version'] is None:
+                module.params['version'] = changes.version
+            if module.params['name'] is None:
+                raise Exception("The changes file has no Source field, please provide a name")
+
         launchpad = LPHandler(True)
         lp_result = launchpad.check_source_package(module.params['project'], module.params['ppa'],
                                                    module.params['name'], module.params['version'],
@@ -186,14 +468,32 @@ def run_module():
                     result['messages'].append(
                         "No matching sources. Attempting upload")
                     result['changed'] = True
-                    dput = Dput()
+                    dput = Dput(verify=module.params['verify'], hash_cache=module.params['hash_cache'],
+                                block_size=module.params['block_size'],
+                                bandwidth_limit=module.params['bandwidth_limit'] * 1024)
                     ppa_name = "%s/%s" % (module.params['project'],
                                           module.params['ppa'])
-                    result['dput'] = dput.upload(
-                        module.params['source_changes'], ppa_name)
+                    existing = None
+                    if module.params['skip_existing']:
+                        existing = launchpad.get_archive_files(module.params['project'], module.params['ppa'],
+                                                               changes.source, changes.version)
+                    if module.params['spool'] is not None:
+                        spool = UploadSpool(module.params['spool'])
+                        job, queued = spool.enqueue(module.params['source_changes'], ppa_name,
+                                                    module.params['spool_priority'], existing)
+                        result['messages'].append("Upload queued in spool %s as %s" % (spool.directory, job['id']))
+                        result['spool'] = {'directory': spool.directory, 'jobs': [
+                            {'id': job['id'], 'source_changes': job['source_changes'], 'ppa': job['ppa'],
+                             'state': job['state'], 'queued': queued}]}
+                        result['spool']['worker_started'] = spool.start_worker(
+                            dput, module.params['spool_concurrency'], module.params['spool_retries'])
+                    else:
+                        result['dput'] = dput.upload(
+                            module.params['source_changes'], ppa_name, existing)
                 else:
                     module.fail_json(
                         msg="FAIL - The source package is not present on PPA and we have no source_changes file to upload", **result)
+        launchpad.apply_return_mode(result, module.params['return_mode'])
     except Exception as e:
         module.fail_json(msg=e.args, **result)
 
@@ -0,0 +1,133 @@
+#!/usr/bin/python
+
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.spool import UploadSpool, SPOOL_STATES
+from ansible.module_utils.basic import AnsibleModule
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: upload_spool_info
+
+short_description: Report the progress of uploads queued in a local upload spool
+version_added: "1.1.0"
+
+description: Report the progress of uploads queued in a local upload spool by the ppa_upload_package or source_package
+             modules. The module returns the number of jobs in each state (queue, active, done and failed), whether
+             a spool worker is running, and the jobs themselves.
+
+options:
+    spool:
+        description: The path to the upload spool directory
+        required: true
+        type: str
+
+    state:
+        description: Only return jobs in this state, one of queue, active, done or failed. Counts are always
+                     returned for every state
+        required: false
+        default: None
+        type: str
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+# Wait for the spool to finish sending our uploads
+- name: Wait for spooled uploads
+  upload_spool_info:
+    spool: ~/.cache/tuxinvader.launchpad/spool
+  register: spool
+  until: spool.counts.queue == 0 and spool.counts.active == 0
+  delay: 30
+  retries: 60
+
+# List failed uploads
+- name: Get failed uploads
+  upload_spool_info:
+    spool: ~/.cache/tuxinvader.launchpad/spool
+    state: failed
+'''
+
+RETURN = r'''
+# Returns the state of the spool
+directory:
+    description: The spool directory
+    type: str
+    returned: always
+    sample: "/home/tux/.cache/tuxinvader.launchpad/spool"
+worker:
+    description: Whether a spool worker is currently running
+    type: bool
+    returned: always
+    sample: true
+counts:
+    description: The number of jobs in each state
+    type: dict
+    returned: always
+    sample: { "queue": 2, "active": 1, "done": 12, "failed": 0 }
+jobs:
+    description: The jobs in the spool, in the order they will be (or were) worked
+    type: list
+    returned: always
+    sample: [
+        {
+            "id": "500-1665351234567890123-1a2b3c4d",
+            "source_changes": "/usr/local/src/cod/debs/v5.15.71/linux-generic-5.15_5.15.71_source.changes",
+            "ppa": "~tuxinvader/lts-mainline",
+            "priority": 500,
+            "state": "done",
+            "attempts": 1,
+            "error": null,
+            "enqueued": "2022-10-09T21:33:54.567890+00:00",
+            "started": "2022-10-09T21:33:55.012345+00:00",
+            "finished": "2022-10-09T21:35:12.345678+00:00",
+            "result": { "count": 4, "uploads": [], "resumed": [], "skipped": [], "metrics": [] }
+        }
+    ]
+'''
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        spool=dict(type='str', required=True),
+        state=dict(type='str', required=False, default=None, choices=SPOOL_STATES),
+    )
+
+    # seed the result dict in the object
+    # we primarily care about changed and state
+    # changed is if this module effectively modified the target
+    # state will include any data that you want your module to pass back
+    # for consumption, for example, in a subsequent task
+    result = dict(
+        changed=False,
+        counts={},
+        jobs=[],
+    )
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    try:
+        spool = UploadSpool(module.params['spool'])
+        result = {**result, **spool.status(module.params['state'])}
+    except Exception as e:
+        module.fail_json(msg=e.args, **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
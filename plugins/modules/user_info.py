@@ -10,17 +10,44 @@ DOCUMENTATION = r'''
 ---
 module: user_info
 
-short_description: Retrieve facts about a Launchpad user
+short_description: Retrieve facts about Launchpad users
 version_added: "1.0.0"
 
-description: Retrieve facts about a Launchpad user
+description: Retrieve facts about one or more Launchpad users. Usernames are looked up directly, and the full text
+             search of people is only used when search is set and the username isn't found.
 
 options:
     name:
         description: The name of the user to retrieve
-        required: true
+        required: false
         type: str
 
+    names:
+        description: A list of user names to retrieve. They are looked up concurrently and returned in users, keyed
+                     by name, with any names which weren't found listed in missing
+        required: false
+        type: list
+        elements: str
+
+    search:
+        description: If a name isn't an exact username, fall back to a full text search of people (matching names,
+                     display names and email addresses) and return the hits in matches
+        required: false
+        default: false
+        type: bool
+
+    search_limit:
+        description: The maximum number of search hits returned for each name
+        required: false
+        default: 25
+        type: int
+
+    workers:
+        description: The number of users to look up concurrently when names is set
+        required: false
+        default: 4
+        type: int
+
     authorize:
         description: Use an Authenticated connection to launchpad. You need to set LP_ACCESS_[TOKEN|SECRET] env vars for authentication
         required: false
@@ -39,27 +66,60 @@ EXAMPLES = r'''
   environment:
     LP_ACCESS_TOKEN: kjaslkdjalksd
     LP_ACCESS_SECRET: alskjajsdlk
+
+# Get facts about the members of a team
+- name: Get the details of the team members
+  user_info:
+    names: "{{ team_members }}"
+    workers: 8
+  register: members
 '''
 
 RETURN = r'''
-# These are examples of possible return values, and in general should use other names for return values.
-original_message:
-    description: The original name param that was passed in.
-    type: str
-    returned: always
-    sample: 'hello world'
-message:
-    description: The output message that the test module generates.
+# Returns a dictionary containing the user information
+user:
+    description: The name param that was passed in
     type: str
-    returned: always
-    sample: 'goodbye'
+    returned: when name is set
+    sample: 'tuxinvader'
+details:
+    description: Facts about the user
+    type: dict
+    returned: when name is set
+    sample: { "display_name": "TuxInvader", "is_team": false, "is_valid": true, "karma": 0, "name": "tuxinvader",
+              "self_link": "https://api.launchpad.net/devel/~tuxinvader", "web_link": "https://launchpad.net/~tuxinvader" }
+found:
+    description: Whether the user was found
+    type: bool
+    returned: when name is set
+    sample: true
+users:
+    description: Facts about each user which was found, keyed by name
+    type: dict
+    returned: when names is set
+    sample: { "tuxinvader": { "display_name": "TuxInvader", "name": "tuxinvader" } }
+missing:
+    description: The names which weren't found
+    type: list
+    returned: when names is set
+    sample: [ "tux" ]
+matches:
+    description: The search hits for names which weren't found, a list when name is set or a dict of lists keyed by
+                 name when names is set
+    type: raw
+    returned: when search is set
+    sample: [ { "display_name": "TuxInvader", "name": "tuxinvader" } ]
 '''
 
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
     module_args = dict(
-        name=dict(type='str', required=True)
+        name=dict(type='str', required=False, default=None),
+        names=dict(type='list', elements='str', required=False, default=None),
+        search=dict(type='bool', required=False, default=False),
+        search_limit=dict(type='int', required=False, default=25),
+        workers=dict(type='int', required=False, default=4)
     )
 
     # seed the result dict in the object
@@ -79,6 +139,8 @@ def run_module():
     # supports check mode
     module = AnsibleModule(
         argument_spec=module_args,
+        required_one_of=[['name', 'names']],
+        mutually_exclusive=[['name', 'names']],
         supports_check_mode=True
     )
 
@@ -95,7 +157,12 @@ def run_module():
         if os.environ.get('LP_ACCESS_TOKEN') is not None:
             auth = True
         launchpad = LPHandler(auth)
-        lp_result = launchpad.get_user_info(module.params['name'])
+        if module.params['names'] is not None:
+            lp_result = launchpad.get_users_info(module.params['names'], module.params['search'],
+                                                 module.params['search_limit'], module.params['workers'])
+        else:
+            lp_result = launchpad.get_user_info(module.params['name'], module.params['search'],
+                                                module.params['search_limit'])
         result = {**result, **lp_result}
     except Exception as e:
         module.fail_json(msg=e.args, **result)
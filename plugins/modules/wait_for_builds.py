@@ -0,0 +1,216 @@
+#!/usr/bin/python
+
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible.module_utils.basic import AnsibleModule
+import os
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: wait_for_builds
+
+short_description: Wait for the builds of a source package in a PPA to finish
+version_added: "1.1.0"
+
+description: Wait in a single task until every build of a source package (or a set of known builds) has reached a
+             terminal state, one of "Successfully built", "Failed to build", "Dependency wait", "Chroot problem",
+             "Build for superseded Source", "Failed to upload" or "Cancelled build". The builds are discovered once,
+             and then the unfinished builds are polled concurrently, backing off up to max_interval while nothing
+             changes. The module fails if any build doesn't succeed, and with fail_fast it returns as soon as the
+             first build fails.
+
+options:
+    project:
+        description: The name of the project owning the PPA
+        required: true
+        type: str
+
+    ppa:
+        description: The name of the PPA
+        required: true
+        type: str
+
+    source_name:
+        description: The name of the Source Package whose builds should be watched
+        required: false
+        default: None
+        type: str
+
+    source_version:
+        description: The version of the Source Package, the default is None (the most recent publication)
+        required: false
+        default: None
+        type: str
+
+    build_ids:
+        description: A list of build ids to watch instead of discovering the builds of a source package
+        required: false
+        default: None
+        type: list
+        elements: int
+
+    fail_fast:
+        description: Stop waiting as soon as any build fails
+        required: false
+        default: false
+        type: bool
+
+    timeout:
+        description: The maximum time to wait in seconds
+        required: false
+        default: 7200
+        type: int
+
+    interval:
+        description: The initial polling interval in seconds
+        required: false
+        default: 30
+        type: int
+
+    max_interval:
+        description: The maximum polling interval in seconds
+        required: false
+        default: 300
+        type: int
+
+    workers:
+        description: The number of builds to poll concurrently
+        required: false
+        default: 4
+        type: int
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+# Wait for every architecture of linux-generic-5.19 5.19.14 to build
+- name: Wait for linux-generic-5.19 builds
+  wait_for_builds:
+    project: ~tuxinvader
+    ppa: my-random-ppa
+    source_name: linux-generic-5.19
+    source_version: 5.19.14
+    fail_fast: true
+    timeout: 14400
+'''
+
+RETURN = r'''
+# Returns the final state of each build
+builds:
+    description: The final state of each build, with its log urls, the build duration, and the number of seconds
+                 the module waited before it saw the build finish (null if it didn't)
+    type: list
+    returned: always
+    sample: [
+        {
+            "arch_tag": "amd64",
+            "buildstate": "Successfully built",
+            "title": "amd64 build of linux-generic-5.19 5.19.14 in ubuntu focal RELEASE",
+            "build_log_url": "https://launchpad.net/~tuxinvader/+archive/ubuntu/my-random-ppa/+build/24511076/+files/buildlog.txt.gz",
+            "upload_log_url": null,
+            "web_link": "https://launchpad.net/~tuxinvader/+archive/ubuntu/my-random-ppa/+build/24511076",
+            "self_link": "https://api.launchpad.net/devel/~tuxinvader/+archive/ubuntu/my-random-ppa/+build/24511076",
+            "duration": "1:02:16.171034",
+            "datebuilt": "2022-10-09 23:49:28.308409+00:00",
+            "waited": 3841.204
+        }
+    ]
+succeeded:
+    description: The number of builds which succeeded
+    type: int
+    returned: always
+    sample: 4
+failures:
+    description: The number of builds which finished without succeeding
+    type: int
+    returned: always
+    sample: 0
+pending:
+    description: The number of builds which had not finished when the module returned
+    type: int
+    returned: always
+    sample: 0
+polls:
+    description: The number of polling rounds made
+    type: int
+    returned: always
+    sample: 17
+elapsed:
+    description: The total time spent waiting in seconds
+    type: float
+    returned: always
+    sample: 3841.204
+timed_out:
+    description: Whether the timeout expired before all builds finished
+    type: bool
+    returned: always
+    sample: false
+'''
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        project=dict(type='str', required=True),
+        ppa=dict(type='str', required=True),
+        source_name=dict(type='str', required=False, default=None),
+        source_version=dict(type='str', required=False, default=None),
+        build_ids=dict(type='list', elements='int', required=False, default=None),
+        fail_fast=dict(type='bool', required=False, default=False),
+        timeout=dict(type='int', required=False, default=7200),
+        interval=dict(type='int', required=False, default=30),
+        max_interval=dict(type='int', required=False, default=300),
+        workers=dict(type='int', required=False, default=4),
+    )
+
+    # seed the result dict in the object
+    # we primarily care about changed and state
+    # changed is if this module effectively modified the target
+    # state will include any data that you want your module to pass back
+    # for consumption, for example, in a subsequent task
+    result = dict(
+        changed=False,
+        builds=[],
+    )
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        required_one_of=[['source_name', 'build_ids']],
+        mutually_exclusive=[['source_name', 'build_ids']],
+        supports_check_mode=True
+    )
+
+    try:
+        auth = False
+        if os.environ.get('LP_ACCESS_TOKEN') is not None:
+            auth = True
+        launchpad = LPHandler(auth)
+        lp_result = launchpad.wait_for_builds(module.params['project'], module.params['ppa'],
+                                              module.params['source_name'], module.params['source_version'],
+                                              module.params['build_ids'], module.params['fail_fast'],
+                                              module.params['timeout'], module.params['interval'],
+                                              module.params['max_interval'], module.params['workers'])
+        result = {**result, **lp_result}
+    except Exception as e:
+        module.fail_json(msg=e.args, **result)
+
+    if result['failures'] > 0:
+        module.fail_json(msg="%d of %d builds failed" % (result['failures'], len(result['builds'])), **result)
+    if result['timed_out']:
+        module.fail_json(msg="Timed out waiting for %d builds" % result['pending'], **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
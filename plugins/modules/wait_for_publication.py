@@ -0,0 +1,192 @@
+#!/usr/bin/python
+
+from __future__ import (absolute_import, division, print_function)
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+from ansible.module_utils.basic import AnsibleModule
+import os
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+module: wait_for_publication
+
+short_description: Wait for a source package to be published in a PPA
+version_added: "1.1.0"
+
+description: Wait in a single task until a source package reaches the Pending or Published state in a PPA, or until it
+             is deleted or superseded, or the timeout expires. The PPA is resolved once, and each poll is a single
+             getPublishedSources query for the name and version. Polling starts at the given interval and backs off
+             up to max_interval while nothing changes, dropping back to the fast interval whenever the publication
+             changes. The time spent in each state is returned. An upload which Launchpad rejects never gets a
+             publication, so it stays "Missing" until the timeout.
+
+options:
+    project:
+        description: The name of the project owning the PPA
+        required: true
+        type: str
+
+    ppa:
+        description: The name of the PPA
+        required: true
+        type: str
+
+    name:
+        description: The name of the Source Package
+        required: true
+        type: str
+
+    version:
+        description: The version of the Source Package, the default is None (the most recent publication)
+        required: false
+        default: None
+        type: str
+
+    wait_for:
+        description: The state to wait for, either Pending (Pending or Published) or Published
+        required: false
+        default: Published
+        type: str
+
+    timeout:
+        description: The maximum time to wait in seconds
+        required: false
+        default: 1800
+        type: int
+
+    interval:
+        description: The initial polling interval in seconds
+        required: false
+        default: 5
+        type: int
+
+    max_interval:
+        description: The maximum polling interval in seconds
+        required: false
+        default: 60
+        type: int
+
+author:
+    - Mark Boddington (@TuxInvader)
+'''
+
+EXAMPLES = r'''
+# Wait for a freshly uploaded kernel to be published
+- name: Wait for linux-generic-5.19 5.19.14 to be published
+  wait_for_publication:
+    project: ~tuxinvader
+    ppa: my-random-ppa
+    name: linux-generic-5.19
+    version: 5.19.14
+    timeout: 3600
+'''
+
+RETURN = r'''
+# Returns the final state of the publication
+status:
+    description: The last state seen, one of Missing, Pending, Published, Superseded, Deleted or Obsolete
+    type: str
+    returned: always
+    sample: "Published"
+source:
+    description: The publication record of the source package, if one was found
+    type: dict
+    returned: always
+    sample: {
+        "component_name": "main",
+        "date_created": "2022-09-27T20:28:09.672351+00:00",
+        "date_published": "2022-09-27T21:21:45.001015+00:00",
+        "display_name": "linux-generic-5.19 5.19.14 in focal",
+        "source_package_name": "linux-generic-5.19",
+        "source_package_version": "5.19.14",
+        "status": "Published"
+    }
+durations:
+    description: The number of seconds spent in each state while waiting
+    type: dict
+    returned: always
+    sample: { "Missing": 182.31, "Pending": 1630.402, "Published": 0 }
+polls:
+    description: The number of queries made
+    type: int
+    returned: always
+    sample: 31
+elapsed:
+    description: The total time spent waiting in seconds
+    type: float
+    returned: always
+    sample: 1812.712
+removed:
+    description: Whether the publication was deleted, superseded or obsoleted while waiting
+    type: bool
+    returned: always
+    sample: false
+timed_out:
+    description: Whether the timeout expired before the source package reached the requested state
+    type: bool
+    returned: always
+    sample: false
+'''
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = dict(
+        project=dict(type='str', required=True),
+        ppa=dict(type='str', required=True),
+        name=dict(type='str', required=True),
+        version=dict(type='str', required=False, default=None),
+        wait_for=dict(type='str', required=False, default="Published"),
+        timeout=dict(type='int', required=False, default=1800),
+        interval=dict(type='int', required=False, default=5),
+        max_interval=dict(type='int', required=False, default=60),
+    )
+
+    # seed the result dict in the object
+    # we primarily care about changed and state
+    # changed is if this module effectively modified the target
+    # state will include any data that you want your module to pass back
+    # for consumption, for example, in a subsequent task
+    result = dict(
+        changed=False,
+        status=None,
+        source={},
+        durations={},
+    )
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    try:
+        auth = False
+        if os.environ.get('LP_ACCESS_TOKEN') is not None:
+            auth = True
+        launchpad = LPHandler(auth)
+        lp_result = launchpad.wait_for_publication(module.params['project'], module.params['ppa'],
+                                                   module.params['name'], module.params['version'],
+                                                   module.params['wait_for'], module.params['timeout'],
+                                                   module.params['interval'], module.params['max_interval'])
+        result = {**result, **lp_result}
+    except Exception as e:
+        module.fail_json(msg=e.args, **result)
+
+    if result['removed']:
+        module.fail_json(msg="The source package is %s" % result['status'], **result)
+    if result['timed_out']:
+        module.fail_json(msg="Timed out waiting for the source package, last status: %s" % result['status'], **result)
+
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == '__main__':
+    main()
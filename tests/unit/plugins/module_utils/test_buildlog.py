@@ -0,0 +1,98 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import gzip
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.buildlog import BuildLogScanner, DEFAULT_PATTERNS, MAX_LINE
+
+LOG = "buildlog_ubuntu-jammy-amd64.hello_1.0-1_BUILDING.txt.gz"
+
+
+class CountingHandler(SimpleHTTPRequestHandler):
+
+    # Serves the log directory, counting the requests made
+    requests = 0
+
+    def do_GET(self):
+        CountingHandler.requests += 1
+        return super(CountingHandler, self).do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _log(lines):
+    return gzip.compress(("\n".join(lines) + "\n").encode())
+
+
+@pytest.fixture
+def http(tmp_path):
+    root = tmp_path / "www"
+    root.mkdir()
+    CountingHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.1})
+    thread.daemon = True
+    thread.start()
+    yield root, "http://127.0.0.1:%d/" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    thread.join(5)
+
+
+def _build(url):
+    return {'build_id': 1000, 'title': "amd64 build of hello 1.0-1", 'build_log_url': url + LOG}
+
+
+def _scan(scanner, build, **kwargs):
+    return scanner.scan_all([build], kwargs.pop('patterns', DEFAULT_PATTERNS), **kwargs)[0]
+
+
+def test_scan_returns_matches_with_context(http, tmp_path):
+    root, url = http
+    lines = ["line %d" % number for number in range(1, 101)]
+    lines[49] = "hello.c:12:5: error: 'world' undeclared"
+    (root / LOG).write_bytes(_log(lines))
+    entry = _scan(BuildLogScanner(None), _build(url), context=2)
+    assert entry['error'] is None
+    assert entry['lines'] == 100
+    assert entry['match_count'] == 1
+    assert entry['matches'] == [{'line_number': 50, 'pattern': r'\berror:', 'line': lines[49],
+                                 'before': ["line 48", "line 49"], 'after': ["line 51", "line 52"]}]
+    assert entry['truncated'] is False
+
+
+def test_scan_truncates_at_max_matches(http):
+    root, url = http
+    (root / LOG).write_bytes(_log(["E: failure %d" % number for number in range(50)]))
+    entry = _scan(BuildLogScanner(None), _build(url), context=0, max_matches=5)
+    assert entry['match_count'] == 50
+    assert [match['line'] for match in entry['matches']] == ["E: failure %d" % number for number in range(5)]
+    assert entry['truncated'] is True
+
+
+def test_scan_bounds_the_line_length(http):
+    root, url = http
+    (root / LOG).write_bytes(_log(["x" * (MAX_LINE * 3) + " error: too long", "E: after"]))
+    entry = _scan(BuildLogScanner(None), _build(url), context=1)
+    assert entry['error'] is None
+    assert all(len(match['line']) <= MAX_LINE for match in entry['matches'])
+    assert all(len(line) <= MAX_LINE for match in entry['matches'] for line in match['before'] + match['after'])
+    assert entry['matches'][-1]['line'] == "E: after"
+
+
+def test_scan_reads_the_log_from_the_cache(http, tmp_path):
+    root, url = http
+    (root / LOG).write_bytes(_log(["E: failure"]))
+    scanner = BuildLogScanner(str(tmp_path / "cache"))
+    first = _scan(scanner, _build(url))
+    second = _scan(scanner, _build(url), patterns=[r'failure'])
+    assert CountingHandler.requests == 1
+    assert (first['cached'], second['cached']) == (False, True)
+    assert second['match_count'] == 1
+    assert second['matches'][0]['pattern'] == "failure"
@@ -0,0 +1,218 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import hashlib
+import os
+import threading
+
+import pytest
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import FTPHandler
+from pyftpdlib.servers import FTPServer
+
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.checksum import verify_files
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.deb822 import read_control
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.dput import Dput
+
+PPA = "~tuxinvader/ubuntu/test-ppa"
+SOURCE = "hello_1.0-1"
+
+
+class NoRestHandler(FTPHandler):
+
+    # A server which refuses REST, so the upload has to fall back to APPE
+    def ftp_REST(self, line):
+        self.respond("550 REST not allowed.")
+
+
+class TruncatingHandler(FTPHandler):
+
+    # A server which loses the second half of every file it receives
+    def on_file_received(self, file):
+        with open(file, "r+b") as ifile:
+            ifile.truncate(os.path.getsize(file) // 2)
+
+
+class CountingHandler(FTPHandler):
+
+    # Counts the logins made to the server
+    logins = 0
+
+    def on_login(self, username):
+        CountingHandler.logins += 1
+
+
+def _serve(root, handler_class):
+    authorizer = DummyAuthorizer()
+    authorizer.add_anonymous(str(root), perm="elradfmwMT")
+    handler = type("Handler", (handler_class,), {"authorizer": authorizer})
+    server = FTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"timeout": 0.1, "handle_exit": False})
+    thread.daemon = True
+    thread.start()
+    return server, thread
+
+
+@pytest.fixture
+def ftp(tmp_path, request):
+    root = tmp_path / "ftp"
+    (root / PPA).mkdir(parents=True)
+    server, thread = _serve(root, getattr(request, "param", FTPHandler))
+    yield server.address[1], root / PPA
+    server.close_all()
+    thread.join(5)
+
+
+def _sums(files):
+    return [" %s %d %s" % (hashlib.sha256(data).hexdigest(), len(data), name) for name, data in files.items()]
+
+
+def _write_changes(upload, source, files):
+    lines = ["Format: 1.8", "Source: hello", "Version: 1.0-1", "Distribution: jammy", "Files:"]
+    for name, data in files.items():
+        (upload / name).write_bytes(data)
+        lines.append(" %s %d devel optional %s" % (hashlib.md5(data).hexdigest(), len(data), name))
+    path = upload / (source + "_source.changes")
+    path.write_text("\n".join(lines + ["Checksums-Sha256:"] + _sums(files)) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def changes(tmp_path):
+    # A changes file referencing a dsc and a tarball large enough to need several blocks
+    upload = tmp_path / "upload"
+    upload.mkdir()
+    files = {
+        SOURCE + ".dsc": b"Format: 3.0 (quilt)\nSource: hello\n",
+        SOURCE + ".tar.xz": os.urandom(200000),
+    }
+    return _write_changes(upload, SOURCE, files), files
+
+
+@pytest.fixture
+def sd_changes(tmp_path):
+    # A -sd build, whose changes file leaves out the orig tarball the dsc references
+    upload = tmp_path / "upload"
+    upload.mkdir()
+    orig = {"hello_1.0.orig.tar.gz": os.urandom(1000)}
+    debian = {SOURCE + ".debian.tar.xz": os.urandom(1000)}
+    dsc = "\n".join(["Format: 3.0 (quilt)", "Source: hello", "Checksums-Sha256:"] + _sums(orig) + _sums(debian))
+    files = dict(debian)
+    files[SOURCE + ".dsc"] = (dsc + "\n").encode()
+    return _write_changes(upload, SOURCE, files), orig
+
+
+def _dput(port, **kwargs):
+    kwargs.setdefault('hash_cache', None)
+    return Dput(host="127.0.0.1", port=port, timeout=10, retries=1, block_size=4096, **kwargs)
+
+
+def test_upload_sends_every_file(ftp, changes):
+    port, remote = ftp
+    path, files = changes
+    result = _dput(port).upload(path, PPA)
+    assert result['count'] == 3
+    assert sorted(result['uploads']) == sorted([os.path.basename(path)] + list(files))
+    assert result['resumed'] == []
+    for name, data in files.items():
+        assert (remote / name).read_bytes() == data
+
+
+def test_upload_resumes_with_rest(ftp, changes):
+    port, remote = ftp
+    path, files = changes
+    tarball = SOURCE + ".tar.xz"
+    (remote / tarball).write_bytes(files[tarball][:75000])
+    result = _dput(port).upload(path, PPA)
+    metrics = dict((entry['file'], entry) for entry in result['metrics'])
+    assert result['resumed'] == [tarball]
+    assert metrics[tarball]['offset'] == 75000
+    assert metrics[tarball]['bytes'] == len(files[tarball]) - 75000
+    assert (remote / tarball).read_bytes() == files[tarball]
+
+
+@pytest.mark.parametrize("ftp", [NoRestHandler], indirect=True)
+def test_upload_falls_back_to_appe(ftp, changes):
+    port, remote = ftp
+    path, files = changes
+    tarball = SOURCE + ".tar.xz"
+    (remote / tarball).write_bytes(files[tarball][:75000])
+    result = _dput(port).upload(path, PPA)
+    metrics = dict((entry['file'], entry) for entry in result['metrics'])
+    assert metrics[tarball]['offset'] == 75000
+    assert metrics[tarball]['bytes'] == len(files[tarball]) - 75000
+    assert (remote / tarball).read_bytes() == files[tarball]
+
+
+def test_upload_skips_complete_files(ftp, changes):
+    port, remote = ftp
+    path, files = changes
+    tarball = SOURCE + ".tar.xz"
+    (remote / tarball).write_bytes(files[tarball])
+    result = _dput(port).upload(path, PPA)
+    metrics = dict((entry['file'], entry) for entry in result['metrics'])
+    assert metrics[tarball]['offset'] == len(files[tarball])
+    assert metrics[tarball]['bytes'] == 0
+
+
+@pytest.mark.parametrize("ftp", [TruncatingHandler], indirect=True)
+def test_upload_checks_the_remote_size(ftp, changes):
+    port, remote = ftp
+    path, files = changes
+    with pytest.raises(Exception, match="Size mismatch after uploading"):
+        _dput(port).upload(path, PPA)
+
+
+@pytest.mark.parametrize("ftp", [CountingHandler], indirect=True)
+def test_upload_batch_reuses_one_session_per_target(ftp, changes, tmp_path):
+    port, remote = ftp
+    path, files = changes
+    items = [(path, PPA)]
+    for revision in [2, 3]:
+        source = "hello_1.0-%d" % revision
+        items.append((_write_changes(tmp_path / "upload", source, {source + ".dsc": os.urandom(100)}), PPA))
+    CountingHandler.logins = 0
+    result = _dput(port, workers=1).upload_batch(items)
+    assert result['failed'] == 0
+    assert result['count'] == 7
+    assert CountingHandler.logins == 1
+    assert (remote / (SOURCE + ".tar.xz")).read_bytes() == files[SOURCE + ".tar.xz"]
+
+
+def test_upload_refuses_listed_files_the_ppa_holds(ftp, changes):
+    port, remote = ftp
+    path, files = changes
+    tarball = SOURCE + ".tar.xz"
+    existing = {tarball: hashlib.sha256(files[tarball]).hexdigest()}
+    with pytest.raises(Exception, match="which the PPA already holds"):
+        _dput(port).upload(path, PPA, existing)
+    assert list(remote.iterdir()) == []
+
+
+def test_upload_resolves_unlisted_files_from_the_ppa(ftp, sd_changes):
+    port, remote = ftp
+    path, orig = sd_changes
+    name, data = list(orig.items())[0]
+    result = _dput(port).upload(path, PPA, {name: hashlib.sha256(data).hexdigest()})
+    assert result['skipped'] == [name]
+    assert result['count'] == 3
+    assert not (remote / name).exists()
+
+
+@pytest.mark.parametrize("existing", [{}, {"hello_1.0.orig.tar.gz": "0" * 64}])
+def test_upload_fails_when_unlisted_files_are_not_in_the_ppa(ftp, sd_changes, existing):
+    port, remote = ftp
+    path, orig = sd_changes
+    with pytest.raises(Exception, match="hello_1.0.orig.tar.gz"):
+        _dput(port).upload(path, PPA, existing)
+    assert list(remote.iterdir()) == []
+
+
+def test_hashes_are_kept_between_runs(ftp, changes, tmp_path):
+    port, remote = ftp
+    path, files = changes
+    hash_cache = str(tmp_path / "hashes.json")
+    _dput(port, hash_cache=hash_cache).upload(path, PPA)
+    cache = _dput(port, hash_cache=hash_cache).hash_cache
+    result = verify_files(os.path.dirname(path), read_control(path).files, cache=cache)
+    assert sorted(result['cached']) == sorted(files)
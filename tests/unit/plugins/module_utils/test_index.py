@@ -0,0 +1,29 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import sqlite3
+
+import pytest
+
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.index import PPAIndex
+
+
+def test_readonly_index_does_not_create_the_database(tmp_path):
+    path = tmp_path / "cache" / "index.db"
+    index = PPAIndex(str(path), readonly=True)
+    with pytest.raises(sqlite3.OperationalError):
+        index.query("SELECT * FROM sources")
+    assert not path.parent.exists()
+
+
+def test_readonly_index_queries_without_writing(tmp_path):
+    path = str(tmp_path / "index.db")
+    PPAIndex(path)
+    index = PPAIndex(path, readonly=True)
+    assert index.query("SELECT count(*) AS count FROM sources")['rows'] == [{'count': 0}]
+    conn = index.connect()
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("CREATE TABLE extra (name TEXT)")
+    finally:
+        conn.close()
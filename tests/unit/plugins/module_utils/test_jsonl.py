@@ -0,0 +1,50 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from datetime import datetime, timezone
+import gzip
+import json
+import os
+
+import pytest
+
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.jsonl import run_info
+
+CREATED = datetime(2022, 10, 9, 21, 33, 54, tzinfo=timezone.utc)
+
+
+def _fetch(sink):
+    result = {'sources': []}
+    entries = result['sources'] if sink is None else sink
+    for number in range(3):
+        entries.append({'number': number, 'date_created': CREATED})
+    return result
+
+
+def test_run_info_returns_entries_without_dest():
+    result = run_info(None, _fetch)
+    assert len(result['sources']) == 3
+    assert 'dest' not in result
+
+
+@pytest.mark.parametrize("name", ["sources.jsonl", "sources.jsonl.gz"])
+def test_run_info_streams_entries_to_dest(tmp_path, name):
+    path = tmp_path / name
+    result = run_info(str(path), _fetch)
+    assert result['sources'] == []
+    assert result['dest'] == {'dest': str(path), 'count': 3, 'compressed': name.endswith(".gz")}
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(str(path), "rt") as ifile:
+        lines = [json.loads(line) for line in ifile]
+    assert [line['number'] for line in lines] == [0, 1, 2]
+    assert lines[0]['date_created'] == CREATED.isoformat()
+
+
+def test_run_info_leaves_nothing_behind_on_failure(tmp_path):
+    def _fail(sink):
+        sink.append({'number': 0})
+        raise Exception("listing failed")
+
+    with pytest.raises(Exception, match="listing failed"):
+        run_info(str(tmp_path / "sources.jsonl"), _fail)
+    assert os.listdir(str(tmp_path)) == []
@@ -0,0 +1,244 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+
+import pytest
+
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+
+PPA_LINK = "https://api.launchpad.net/devel/~tuxinvader/+archive/ubuntu/test-ppa"
+
+
+class CountingHandler(LPHandler):
+
+    # Counts logins instead of making them
+    def __init__(self):
+        super(CountingHandler, self).__init__()
+        self.logins = 0
+        self._logins_lock = threading.Lock()
+
+    def _new_root(self):
+        with self._logins_lock:
+            self.logins += 1
+            return object()
+
+
+@pytest.fixture
+def launchpad():
+    return CountingHandler()
+
+
+def test_map_concurrent_reuses_roots_across_calls(launchpad):
+    barrier = threading.Barrier(4)
+
+    def _task(api_root, item):
+        barrier.wait(5)
+        return item, api_root
+
+    roots = set()
+    for poll in range(7):
+        results = launchpad.map_concurrent(_task, list(range(4)), 4)
+        assert [item for item, api_root in results] == list(range(4))
+        roots.update(id(api_root) for item, api_root in results)
+    assert launchpad.logins == 4
+    assert len(roots) == 4
+
+
+def test_map_concurrent_never_shares_a_root_between_running_tasks(launchpad):
+    in_use = set()
+    lock = threading.Lock()
+
+    def _task(api_root, item):
+        with lock:
+            assert id(api_root) not in in_use
+            in_use.add(id(api_root))
+        time.sleep(0.001)
+        with lock:
+            in_use.discard(id(api_root))
+        return item
+
+    for poll in range(3):
+        assert launchpad.map_concurrent(_task, list(range(50)), 8) == list(range(50))
+    assert launchpad.logins <= 8
+
+
+class FakeEntry(object):
+
+    def __init__(self, **attributes):
+        self.lp_attributes = sorted(attributes)
+        self.__dict__.update(attributes)
+
+    def lp_get_parameter(self, name):
+        return getattr(self, name)
+
+
+def test_expand_ppas_builds_entries_from_the_listing(launchpad):
+    ppas = [FakeEntry(name="ppa-%d" % number, status="Deleted" if number == 1 else "Active",
+                      self_link="https://api.launchpad.net/devel/~tux/+archive/ubuntu/ppa-%d" % number)
+            for number in range(3)]
+    project = FakeEntry(name="tux", display_name="Tux")
+    project.ppas = ppas
+    result = launchpad._build_project_result(project, 'Active', expand_ppas=True)
+    assert launchpad.logins == 0
+    assert result['ppa_names'] == ['ppa-0', 'ppa-2']
+    assert [ppa['self_link'] for ppa in result['ppas']] == [ppas[0].self_link, ppas[2].self_link]
+
+
+class FakeCollection(list):
+
+    @property
+    def total_size(self):
+        return len(self)
+
+
+class FakeSeries(object):
+
+    def __init__(self, name, active=True):
+        self.name = name
+        self.active = active
+
+
+class FakeSourceArchive(FakeEntry):
+
+    def __init__(self, sources):
+        super(FakeSourceArchive, self).__init__(name="test-ppa")
+        self.sources = sources
+        self.distribution = FakeEntry(name="ubuntu")
+        self.distribution.series = [FakeSeries("jammy"), FakeSeries("focal")]
+
+    def getPublishedSources(self, status=None, distro_series=None, source_name=None, exact_match=False,
+                            order_by_date=False):
+        matched = FakeCollection()
+        for source in self.sources:
+            if status is not None and source.status != status:
+                continue
+            if distro_series is not None and source.series != distro_series.name:
+                continue
+            if source_name is not None and (source.source_package_name != source_name if exact_match
+                                            else source_name not in source.source_package_name):
+                continue
+            matched.append(source)
+        return matched
+
+
+@pytest.fixture
+def archive():
+    sources = []
+    for number, name in enumerate(["foo", "foo", "foo-extra", "bar", "bar", "libfoo"]):
+        sources.append(FakeEntry(source_package_name=name, source_package_version="1.%d" % number,
+                                 status="Superseded" if number == 0 else "Published",
+                                 series="focal" if number % 2 else "jammy",
+                                 display_name="%s 1.%d in %s" % (name, number, "focal" if number % 2 else "jammy")))
+    return FakeSourceArchive(sources)
+
+
+@pytest.mark.parametrize("match,expected", [("exact", 2), ("contains", 4), ("starts_with", 3), ("ends_with", 3)])
+def test_count_honours_source_name(launchpad, archive, match, expected):
+    result = launchpad._build_ppa_result(archive, '*', return_mode='count', source_name="foo", match=match)
+    assert result['source_count'] == expected
+    assert result['sources'] == []
+
+
+@pytest.mark.parametrize("match", ["exact", "starts_with"])
+def test_summary_honours_source_name(launchpad, archive, match):
+    result = launchpad._build_ppa_result(archive, 'Published', return_mode='summary', source_name="foo", match=match)
+    expected = 1 if match == "exact" else 2
+    assert result['summary']['total'] == expected
+    assert result['summary']['status'] == {'Published': expected}
+    assert sum(result['summary']['series'].values()) == expected
+
+
+class FakeBuildArchive(FakeEntry):
+
+    def __init__(self, count):
+        super(FakeBuildArchive, self).__init__(name="test-ppa")
+        now = datetime.now(tz=timezone.utc)
+        self.read = 0
+        self.builds = [FakeEntry(self_link="%s/+build/%d" % (PPA_LINK, 1000 - hours), buildstate="Successfully built",
+                                 datecreated=now - timedelta(hours=hours), datebuilt=now - timedelta(hours=hours))
+                       for hours in range(count)]
+
+    def getBuildRecords(self, **kwargs):
+        for build in self.builds:
+            self.read += 1
+            yield build
+
+
+def test_recent_builds_stop_at_the_time_frame(launchpad):
+    archive = FakeBuildArchive(1000)
+    since = datetime.now(tz=timezone.utc) - timedelta(hours=5, minutes=30)
+    builds = list(launchpad._builds_since(archive, since))
+    assert len(builds) == 6
+    assert archive.read == 7
+
+
+class FakeFailedArchive(FakeBuildArchive):
+
+    def __init__(self):
+        super(FakeFailedArchive, self).__init__(0)
+        now = datetime.now(tz=timezone.utc)
+        # (created, finished) hours ago, in the order Launchpad lists failed builds: latest finished first
+        self.builds = [FakeEntry(self_link="%s/+build/%d" % (PPA_LINK, build_id), title="build %d" % build_id,
+                                 arch_tag="amd64", buildstate="Failed to build", source_package_name="linux",
+                                 source_package_version="5.19", build_log_url=None, web_link=None,
+                                 datecreated=now - timedelta(hours=created), datebuilt=now - timedelta(hours=finished))
+                       for build_id, created, finished in [(1, 30, 1), (2, 3, 2), (3, 5, 4), (4, 48, 47), (5, 6, 5)]]
+
+
+def test_failed_builds_stop_at_the_first_build_finished_before_the_time_frame(launchpad):
+    archive = FakeFailedArchive()
+    launchpad.api_root = object()
+    launchpad._get_project = lambda name: None
+    launchpad._get_ppa = lambda project, name: archive
+    builds = launchpad.get_failed_builds("~tuxinvader", "test-ppa", time_frame=24 * 60)
+    assert [build['build_id'] for build in builds] == [2, 3]
+    assert archive.read == 4
+
+
+class FakeFilesRoot(object):
+
+    def __init__(self, threads):
+        self.threads = threads
+
+    def load(self, link):
+        self.threads.add(threading.current_thread().name)
+        return FakeEntry(binaryFileUrls=lambda include_meta: [{'url': link + "/file.deb", 'size': 10, 'sha256': None}])
+
+
+class FilesHandler(CountingHandler):
+
+    def __init__(self):
+        super(FilesHandler, self).__init__()
+        self.threads = set()
+
+    def _new_root(self):
+        super(FilesHandler, self)._new_root()
+        return FakeFilesRoot(self.threads)
+
+
+class FakeBinaryArchive(FakeEntry):
+
+    def __init__(self, count):
+        super(FakeBinaryArchive, self).__init__(name="test-ppa")
+        self.binaries = [FakeEntry(self_link="%s/+binarypub/%d" % (PPA_LINK, number), status="Published",
+                                   binary_package_name="linux-image", distro_arch_series_link="ubuntu/jammy/amd64")
+                         for number in range(count)]
+
+    def getPublishedBinaries(self, **kwargs):
+        return iter(self.binaries)
+
+
+def test_binary_files_share_one_pool_across_pages():
+    launchpad = FilesHandler()
+    launchpad.api_root = object()
+    launchpad._get_project = lambda name: None
+    launchpad._get_ppa = lambda project, name: FakeBinaryArchive(400)
+    result = launchpad.get_published_binaries("~tuxinvader", "test-ppa", fields=['arch_tag'], include_files=True,
+                                              workers=4)
+    assert result['count'] == 400
+    assert all(binary['size'] == 10 for binary in result['binaries'])
+    assert launchpad.logins <= 4
+    assert len(launchpad.threads) <= 4
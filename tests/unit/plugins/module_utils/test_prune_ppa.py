@@ -0,0 +1,100 @@
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from datetime import datetime, timedelta, timezone
+import json
+
+import pytest
+
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.jobs import JobStatus
+from ansible_collections.tuxinvader.launchpad.plugins.module_utils.lpad import LPHandler
+
+PPA_LINK = "https://api.launchpad.net/devel/~tuxinvader/+archive/ubuntu/test-ppa"
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FakeSource(object):
+
+    lp_attributes = ['self_link', 'source_package_name', 'source_package_version', 'status', 'date_published']
+
+    def __init__(self, archive, number, published):
+        self.archive = archive
+        self.self_link = "%s/+sourcepub/%d" % (PPA_LINK, number)
+        self.source_package_name = "hello"
+        self.source_package_version = "1.0-%d" % number
+        self.status = "Published"
+        self.date_published = published
+
+    def lp_get_parameter(self, name):
+        return getattr(self, name)
+
+    def requestDeletion(self):
+        if self.archive.fail_after is not None and len(self.archive.deleted) >= self.archive.fail_after:
+            raise Interrupted("connection lost")
+        self.archive.deleted.append(self.self_link)
+        self.status = "Deleted"
+
+
+class FakeArchive(object):
+
+    def __init__(self, count):
+        now = datetime.now(tz=timezone.utc)
+        self.name = "test-ppa"
+        self.self_link = PPA_LINK
+        self.deleted = []
+        self.fail_after = None
+        self.sources = [FakeSource(self, number, now - timedelta(days=count - number)) for number in range(count)]
+
+    def getPublishedSources(self, status=None, **kwargs):
+        return [source for source in self.sources if status is None or source.status == status]
+
+
+class FakeRoot(object):
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.projects = {'~tuxinvader': type('FakeProject', (object,), {'ppas': [archive]})()}
+
+    def load(self, link):
+        return [source for source in self.archive.sources if source.self_link == link][0]
+
+
+@pytest.fixture
+def launchpad():
+    handler = LPHandler()
+    handler.api_root = FakeRoot(FakeArchive(5))
+    return handler
+
+
+def test_prune_job_resumes_after_interruption(launchpad, tmp_path):
+    archive = launchpad.api_root.archive
+    archive.fail_after = 1
+    with pytest.raises(Interrupted):
+        launchpad.prune_ppa('~tuxinvader', 'test-ppa', 2, job=JobStatus('prune', str(tmp_path)))
+
+    # The first deletion was checkpointed, with its dates saved as strings
+    saved = json.loads((tmp_path / "prune.json").read_text())
+    assert list(saved['completed']) == [archive.sources[0].self_link]
+    assert saved['completed'][archive.sources[0].self_link]['date_published'] == \
+        archive.sources[0].date_published.isoformat()
+
+    archive.fail_after = None
+    result = launchpad.prune_ppa('~tuxinvader', 'test-ppa', 2, job=JobStatus('prune', str(tmp_path)))
+    assert archive.deleted == [source.self_link for source in archive.sources[:3]]
+    assert result['count'] == 3
+    assert result['checkpointed'] == 1
+    assert [entry['source_package_version'] for entry in result['pruned']] == ['1.0-0', '1.0-1', '1.0-2']
+    assert [entry['source_package_version'] for entry in result['remaining']] == ['1.0-3', '1.0-4']
+
+
+def test_finished_prune_job_is_not_repeated(launchpad, tmp_path):
+    archive = launchpad.api_root.archive
+    first = launchpad.prune_ppa('~tuxinvader', 'test-ppa', 2, job=JobStatus('prune', str(tmp_path)))
+    second = launchpad.prune_ppa('~tuxinvader', 'test-ppa', 2, job=JobStatus('prune', str(tmp_path)))
+    assert len(archive.deleted) == 3
+    assert first['count'] == second['count'] == 3
+    assert second['checkpointed'] == 3
+    assert [entry['self_link'] for entry in second['pruned']] == archive.deleted